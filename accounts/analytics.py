@@ -1,129 +1,153 @@
 # accounts/analytics.py
-from django.db.models import Sum, Count, Avg, F
-from django.db.models.functions import TruncMonth, TruncWeek
+from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 from decimal import Decimal
-from collections import defaultdict
+
+# Orders that count towards spending: paid AND completed/delivered
+SPEND_FILTER = Q(payment_status='paid', status__in=['completed', 'delivered'])
+
+RECENT_ORDERS = 5
+
+
+def recent_orders(user, limit=RECENT_ORDERS):
+    """
+    A user's latest orders with their products (shared by the dashboard and
+    analytics so it is fetched once).
+    """
+    return list(user.orders.select_related('product').order_by('-created_at', '-id')[:limit])
+
+
+def _month_buckets(since, now):
+    """
+    (label, start, end) for each calendar month (current time zone) from
+    ``since`` to ``now``; the first starts at ``since`` itself.
+    """
+    tz = timezone.get_current_timezone()
+    local = timezone.localtime(since, tz)
+    month = datetime(local.year, local.month, 1)
+    buckets = []
+    while True:
+        start = timezone.make_aware(month, tz)
+        if start > now:
+            return buckets
+        following = (month + timedelta(days=32)).replace(day=1)
+        buckets.append((month.strftime('%b %Y'), max(start, since), timezone.make_aware(following, tz)))
+        month = following
+
+
+def _order_metrics(user, months):
+    """
+    Every per-order figure in one query, using conditional aggregates.
+    """
+    from products.models import Order
+
+    aggregates = {
+        'total_orders': Count('id'),
+        'total_spent': Sum('total_price', filter=SPEND_FILTER),
+        'avg_order_value': Avg('total_price', filter=SPEND_FILTER),
+        'total_discounts': Sum('discount_amount', filter=SPEND_FILTER),
+    }
+    for status in Order.Status.values:
+        aggregates[f'status_{status}'] = Count('id', filter=Q(status=status))
+    for index, (label, start, end) in enumerate(months):
+        in_month = SPEND_FILTER & Q(created_at__gte=start, created_at__lt=end)
+        aggregates[f'month_{index}_total'] = Sum('total_price', filter=in_month)
+        aggregates[f'month_{index}_count'] = Count('id', filter=in_month)
+    return Order.objects.filter(user=user).aggregate(**aggregates)
+
 
 def get_user_analytics(user):
     """
-    Generate comprehensive analytics for a user
+    Generate comprehensive analytics for a user: order metrics in one
+    query, design metrics in another, plus popular products and recent
+    orders (four queries however many orders the user has).
     """
     from products.models import Order
     from designs.models import DesignRequest
-    
-    # Get all user orders
-    orders = Order.objects.filter(user=user)
-    # Only count spending for paid AND completed/delivered orders
-    completed_paid_orders = orders.filter(
-        payment_status='paid',
-        status__in=['completed', 'delivered']
-    )
-    
-    # Overall statistics
-    total_orders = orders.count()
-    total_spent = completed_paid_orders.aggregate(total=Sum('total_price'))['total'] or Decimal('0.00')
-    avg_order_value = completed_paid_orders.aggregate(avg=Avg('total_price'))['avg'] or Decimal('0.00')
-    
-    # Orders by status
-    orders_by_status = orders.values('status').annotate(count=Count('id'))
-    status_breakdown = {item['status']: item['count'] for item in orders_by_status}
-    
+
     # Monthly spending (last 12 months) - only completed & paid orders
-    twelve_months_ago = timezone.now() - timedelta(days=365)
-    monthly_spending = completed_paid_orders.filter(
-        created_at__gte=twelve_months_ago
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        total=Sum('total_price'),
-        count=Count('id')
-    ).order_by('month')
-    
-    # Format monthly data
-    monthly_data = {
-        'labels': [item['month'].strftime('%b %Y') for item in monthly_spending],
-        'spending': [float(item['total']) for item in monthly_spending],
-        'orders': [item['count'] for item in monthly_spending]
+    now = timezone.now()
+    months = _month_buckets(now - timedelta(days=365), now)
+    metrics = _order_metrics(user, months)
+
+    status_breakdown = {
+        status: metrics[f'status_{status}'] for status in Order.Status.values if metrics[f'status_{status}']
     }
-    
+
+    monthly_data = {'labels': [], 'spending': [], 'orders': []}
+    for index, (label, start, end) in enumerate(months):
+        if metrics[f'month_{index}_count']:
+            monthly_data['labels'].append(label)
+            monthly_data['spending'].append(float(metrics[f'month_{index}_total']))
+            monthly_data['orders'].append(metrics[f'month_{index}_count'])
+
     # Popular products - only from completed & paid orders
-    popular_products = completed_paid_orders.values(
+    popular_products = Order.objects.filter(SPEND_FILTER, user=user).values(
         'product__name'
     ).annotate(
         count=Count('id'),
         total_spent=Sum('total_price')
     ).order_by('-count')[:5]
-    
-    # Design requests
-    design_requests = DesignRequest.objects.filter(user=user)
-    total_design_requests = design_requests.count()
-    # Only count design spending for paid design requests
-    paid_design_requests = design_requests.filter(status='paid')
-    design_spending = paid_design_requests.aggregate(
-        total=Sum(F('packages__price'))
-    )['total'] or Decimal('0.00')
-    
-    # Recent activity
-    recent_orders = orders.order_by('-created_at')[:5]
-    
-    # Savings from discounts - only from completed & paid orders
-    total_discounts = completed_paid_orders.aggregate(total=Sum('discount_amount'))['total'] or Decimal('0.00')
-    
+
+    # Design requests; only paid ones count towards spending
+    designs = DesignRequest.objects.filter(user=user).aggregate(
+        total=Count('id', distinct=True),
+        spending=Sum('packages__price', filter=Q(status='paid')),
+    )
+
+    total_spent = metrics['total_spent'] or Decimal('0.00')
+    design_spending = designs['spending'] or Decimal('0.00')
     return {
-        'total_orders': total_orders,
+        'total_orders': metrics['total_orders'],
         'total_spent': total_spent,
-        'avg_order_value': avg_order_value,
+        'avg_order_value': metrics['avg_order_value'] or Decimal('0.00'),
         'status_breakdown': status_breakdown,
         'monthly_data': monthly_data,
         'popular_products': list(popular_products),
-        'total_design_requests': total_design_requests,
+        'total_design_requests': designs['total'],
         'design_spending': design_spending,
-        'recent_orders': recent_orders,
-        'total_discounts': total_discounts,
+        'recent_orders': recent_orders(user),
+        'total_discounts': metrics['total_discounts'] or Decimal('0.00'),
         'total_all_spending': total_spent + design_spending,
     }
 
 
 def get_platform_analytics():
     """
-    Generate platform-wide analytics (for admin/reporting)
+    Generate platform-wide analytics (for admin/reporting). Order figures
+    come from the daily rollups (see products.rollups), so they are as
+    current as the last ``manage.py rollup_orders`` run.
     """
-    from products.models import Order, Product
-    from designs.models import DesignRequest
+    from products.models import DailyOrderRollup, DailyProductRollup
     from accounts.models import NewsletterSubscriber
     from django.contrib.auth.models import User
-    
-    # Overall metrics
-    total_users = User.objects.count()
-    total_orders = Order.objects.count()
-    total_revenue = Order.objects.filter(
-        payment_status='paid'
-    ).aggregate(total=Sum('total_price'))['total'] or Decimal('0.00')
-    
+
     # Recent growth (last 30 days)
     thirty_days_ago = timezone.now() - timedelta(days=30)
     new_users = User.objects.filter(date_joined__gte=thirty_days_ago).count()
-    new_orders = Order.objects.filter(created_at__gte=thirty_days_ago).count()
-    
+
+    # Overall order metrics
+    orders = DailyOrderRollup.objects.aggregate(
+        total=Sum('orders'),
+        revenue=Sum('revenue', filter=Q(payment_status='paid')),
+        new=Sum('orders', filter=Q(day__gte=timezone.localdate(thirty_days_ago))),  # whole days
+    )
+
     # Product performance
-    top_products = Order.objects.values(
+    top_products = DailyProductRollup.objects.values(
         'product__name'
     ).annotate(
-        total_orders=Count('id'),
-        revenue=Sum('total_price')
+        total_orders=Sum('orders'),
+        revenue=Sum('revenue')
     ).order_by('-total_orders')[:10]
-    
-    # Newsletter stats
-    newsletter_subs = NewsletterSubscriber.objects.count()
-    
+
     return {
-        'total_users': total_users,
-        'total_orders': total_orders,
-        'total_revenue': total_revenue,
+        'total_users': User.objects.count(),
+        'total_orders': orders['total'] or 0,
+        'total_revenue': orders['revenue'] or Decimal('0.00'),
         'new_users_30d': new_users,
-        'new_orders_30d': new_orders,
+        'new_orders_30d': orders['new'] or 0,
         'top_products': list(top_products),
-        'newsletter_subscribers': newsletter_subs,
+        'newsletter_subscribers': NewsletterSubscriber.objects.count(),
     }
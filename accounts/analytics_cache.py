@@ -0,0 +1,151 @@
+"""
+Per-user analytics cache.
+
+get_user_analytics costs a handful of aggregate queries, but a user's
+figures only change when one of their orders or design requests does. Each
+user has a version number in the database (AnalyticsVersion, like
+CatalogVersion for the catalog) that the Order/DesignRequest signals bump
+once the change commits, from whichever process made it: web workers,
+reconcile_payments, the admin. Payloads are cached under that version, so
+reading the version (one primary-key lookup) is enough to know whether a
+cached payload is current, and nothing ever needs deleting.
+
+Payloads live in the Django cache and, for the most recently used users, in
+a bounded per-worker LRU. With the default per-process cache each worker
+computes a user's figures once per version; configure a shared CACHES
+backend to share them between workers. A refresh is single-flight within
+whatever the cache is shared by: the first request takes a cache.add()
+lock and the rest poll for its result, computing it themselves (without
+caching) only if that takes longer than ANALYTICS_CACHE_LOCK_WAIT.
+
+Payloads are shared between requests and threads: treat them as read-only.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .analytics import get_user_analytics
+from .models import AnalyticsVersion
+
+# Seconds a refresh may hold the lock before another process may take over
+LOCK_TIMEOUT = 30
+# Seconds between checks for the lock holder's result
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_timeout():
+    # Upper bound on staleness from things no signal covers (month rollover,
+    # product renames)
+    return _setting('ANALYTICS_CACHE_TIMEOUT', 3600)
+
+
+def _payload_key(user_id, version):
+    return f'accounts:analytics:{user_id}:{version}'
+
+
+class _LRU:
+    """
+    Thread-safe mapping holding at most ``max_entries``, least recently
+    used evicted first.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = _LRU(_setting('ANALYTICS_CACHE_MAX_USERS', 1000))
+
+
+def current_version(user_id):
+    version = AnalyticsVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def invalidate(user_ids):
+    """
+    Expire the cached analytics of ``user_ids`` in every process.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    AnalyticsVersion.objects.bulk_create(
+        [AnalyticsVersion(user_id=user_id) for user_id in user_ids], ignore_conflicts=True,
+    )
+    AnalyticsVersion.objects.filter(user_id__in=user_ids).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def invalidate_on_commit(user_ids):
+    """
+    invalidate() once the current transaction commits, so a refresh cannot
+    cache figures read before the change was visible.
+    """
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: invalidate(user_ids))
+
+
+def _refresh(user, version):
+    key = _payload_key(user.pk, version)
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + _setting('ANALYTICS_CACHE_LOCK_WAIT', 2.0)
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL_INTERVAL)
+        analytics = cache.get(key)
+        if analytics is not None:
+            return analytics
+        if time.monotonic() >= deadline:
+            return get_user_analytics(user)
+    try:
+        analytics = get_user_analytics(user)
+        cache.set(key, analytics, cache_timeout())
+    finally:
+        cache.delete(lock_key)
+    return analytics
+
+
+def cached_user_analytics(user):
+    """
+    get_user_analytics(user), served from cache while the user's orders and
+    design requests are unchanged.
+    """
+    version = current_version(user.pk)
+    entry = _local.get(user.pk)
+    if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+        return entry[2]
+
+    analytics = cache.get(_payload_key(user.pk, version))
+    if analytics is None:
+        analytics = _refresh(user, version)
+    _local.set(user.pk, (version, time.monotonic() + cache_timeout(), analytics))
+    return analytics
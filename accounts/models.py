@@ -137,3 +137,17 @@ class LoyaltyTransaction(models.Model):
     def __str__(self):
         action = "earned" if self.points > 0 else "redeemed"
         return f"{self.user.username} {action} {abs(self.points)} points"
+
+# Dashboard analytics cache version
+class AnalyticsVersion(models.Model):
+    """
+    Per-user counter bumped whenever the user's orders or design requests
+    change, so every process can tell its cached analytics are stale (see
+    accounts/analytics_cache.py).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='analytics_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} analytics v{self.version}"
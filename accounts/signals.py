@@ -1,9 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from designs.models import DesignRequest
+from products.models import Order
 from .models import CustomerProfile
+from . import analytics_cache
 
 @receiver(post_save, sender=User)
 def create_customer_profile(sender, instance, created, **kwargs):
     if created and not hasattr(instance, 'profile'):
         CustomerProfile.objects.create(user=instance)
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=DesignRequest)
+@receiver(post_delete, sender=DesignRequest)
+def invalidate_user_analytics(sender, instance, **kwargs):
+    """
+    The owner's dashboard figures changed (see accounts.analytics_cache).
+    """
+    if instance.user_id:
+        analytics_cache.invalidate_on_commit([instance.user_id])
+
+@receiver(m2m_changed, sender=DesignRequest.packages.through)
+def invalidate_design_packages_analytics(sender, instance, action, reverse, **kwargs):
+    """
+    Design spending is the sum of the request's package prices.
+    """
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear') and instance.user_id:
+        analytics_cache.invalidate_on_commit([instance.user_id])
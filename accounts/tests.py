@@ -1,3 +1,119 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from designs.models import DesignPackage, DesignRequest
+from products.models import Order, Product
+from products.reconciliation import apply_matches
+
+from . import analytics_cache
+from .analytics import get_user_analytics
+
+
+def make_order(user, product, total, **kwargs):
+    kwargs.setdefault('status', Order.Status.COMPLETED)
+    kwargs.setdefault('payment_status', Order.PaymentStatus.PAID)
+    return Order.objects.create(
+        user=user, product=product, quantity=100, base_price=total, total_price=total, options={},
+        shipping_price=Decimal('0.00'), discount_amount=kwargs.pop('discount_amount', Decimal('0.00')), **kwargs,
+    )
+
+
+# ==========================
+# User analytics
+# ==========================
+
+class UserAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', password='pw')
+        self.cards = Product.objects.create(name='Business Cards', image='product_images/cards.png')
+        self.flyers = Product.objects.create(name='Flyers', image='product_images/flyers.png')
+
+    def test_figures(self):
+        make_order(self.user, self.cards, Decimal('100.00'), discount_amount=Decimal('10.00'))
+        make_order(self.user, self.cards, Decimal('300.00'))
+        make_order(self.user, self.flyers, Decimal('50.00'), payment_status=Order.PaymentStatus.PENDING)
+        make_order(self.user, self.flyers, Decimal('70.00'), status=Order.Status.RECEIVED)
+        old = make_order(self.user, self.flyers, Decimal('999.00'))
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        # Someone else's orders never count
+        make_order(User.objects.create_user('other'), self.cards, Decimal('500.00'))
+
+        design = DesignRequest.objects.create(user=self.user, email='client@example.com', status='paid')
+        design.packages.add(DesignPackage.objects.create(title='Logo', description='', price=Decimal('450.00')))
+
+        analytics = get_user_analytics(self.user)
+        self.assertEqual(analytics['total_orders'], 5)
+        self.assertEqual(analytics['total_spent'], Decimal('1399.00'))
+        self.assertAlmostEqual(analytics['avg_order_value'], Decimal('466.33'), places=2)
+        self.assertEqual(analytics['total_discounts'], Decimal('10.00'))
+        self.assertEqual(analytics['status_breakdown'], {'completed': 4, 'received': 1})
+        # Only the last 12 months are charted
+        self.assertEqual(sum(analytics['monthly_data']['spending']), 400.0)
+        self.assertEqual(analytics['popular_products'][0]['product__name'], 'Business Cards')
+        self.assertEqual((analytics['total_design_requests'], analytics['design_spending']), (1, Decimal('450.00')))
+        self.assertEqual(analytics['total_all_spending'], Decimal('1849.00'))
+
+    def test_query_count_does_not_grow(self):
+        for _ in range(20):
+            make_order(self.user, self.cards, Decimal('100.00'))
+        with self.assertNumQueries(4):
+            get_user_analytics(self.user)
+
+    def test_no_orders(self):
+        analytics = get_user_analytics(self.user)
+        self.assertEqual((analytics['total_orders'], analytics['total_spent']), (0, Decimal('0.00')))
+        self.assertEqual(analytics['monthly_data'], {'labels': [], 'spending': [], 'orders': []})
+
+
+# ==========================
+# Analytics cache
+# ==========================
+
+class AnalyticsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        analytics_cache._local.clear()
+        self.user = User.objects.create_user('client', password='pw')
+        self.product = Product.objects.create(name='Business Cards', image='product_images/cards.png')
+
+    def order(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_order(self.user, self.product, Decimal('100.00'), **kwargs)
+
+    def test_served_from_cache_until_changed(self):
+        self.order()
+        first = analytics_cache.cached_user_analytics(self.user)
+        with self.assertNumQueries(1):  # the version check
+            self.assertIs(analytics_cache.cached_user_analytics(self.user), first)
+
+        self.order()
+        self.assertEqual(analytics_cache.cached_user_analytics(self.user)['total_orders'], 2)
+
+    def test_payment_change_invalidates(self):
+        order = self.order(payment_status=Order.PaymentStatus.PENDING)
+        self.assertEqual(analytics_cache.cached_user_analytics(self.user)['total_spent'], Decimal('0.00'))
+
+        # Bulk payment matching bypasses post_save and invalidates itself
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_matches([order.pk], [])
+        self.assertEqual(analytics_cache.cached_user_analytics(self.user)['total_spent'], Decimal('100.00'))
+
+    def test_design_packages_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            design = DesignRequest.objects.create(user=self.user, email='client@example.com', status='paid')
+        self.assertEqual(analytics_cache.cached_user_analytics(self.user)['design_spending'], Decimal('0.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            design.packages.add(DesignPackage.objects.create(title='Logo', description='', price=Decimal('450.00')))
+        self.assertEqual(analytics_cache.cached_user_analytics(self.user)['design_spending'], Decimal('450.00'))
 
-# Create your tests here.
+    def test_other_users_are_untouched(self):
+        other = User.objects.create_user('other')
+        analytics_cache.cached_user_analytics(other)
+        version = analytics_cache.current_version(other.pk)
+        self.order()
+        self.assertEqual(analytics_cache.current_version(other.pk), version)
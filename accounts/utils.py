@@ -3,10 +3,11 @@ from django.template.loader import render_to_string
 from django.conf import settings
 from decimal import Decimal
 
-def send_order_confirmation_email(order):
-    subject = f"Your BizPrint Order #{str(order.uuid)[:8]} Confirmation"
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to_email = [order.email]
+def render_order_confirmation_email(order):
+    """
+    Subject and HTML body of the order confirmation (queued via products.outbox).
+    """
+    subject = f"Your BizPrint Order #{order.short_ref} Confirmation"
 
     shipping_raw = getattr(order, "shipping_price", Decimal("0.00"))
     shipping = shipping_raw if isinstance(shipping_raw, Decimal) else Decimal(str(shipping_raw))
@@ -21,14 +22,21 @@ def send_order_confirmation_email(order):
         "vat": vat,
     }
 
-    html_body = render_to_string("emails/order_confirmation.html", context)
+    return subject, render_to_string("emails/order_confirmation.html", context)
+
+
+def send_order_confirmation_email(order):
+    subject, html_body = render_order_confirmation_email(order)
+    from_email = settings.DEFAULT_FROM_EMAIL
+    to_email = [order.email]
+
     email = EmailMultiAlternatives(subject, '', from_email, to_email)
     email.attach_alternative(html_body, "text/html")
     email.send()
 
 
 def send_payment_received_email(order):
-    subject = f"Payment Received for Order #{str(order.uuid)[:8]}"
+    subject = f"Payment Received for Order #{order.short_ref}"
     from_email = settings.DEFAULT_FROM_EMAIL
     to_email = [order.email]
 
@@ -40,7 +48,7 @@ def send_payment_received_email(order):
 
 
 def send_order_status_update_email(order):
-    subject = f"Order #{str(order.uuid)[:8]} Status Update"
+    subject = f"Order #{order.short_ref} Status Update"
     from_email = settings.DEFAULT_FROM_EMAIL
     to_email = [order.email]
 
@@ -8,7 +8,7 @@ from decimal import Decimal
 from .forms import UserRegistrationForm, CustomerProfileForm, ProfileUpdateForm, NewsletterSignupForm
 from .models import CustomerProfile, NewsletterSubscriber
 from accounts.utils import send_newsletter_discount_email
-from .analytics import get_user_analytics
+from .analytics_cache import cached_user_analytics
 
 def logout_view(request):
     logout(request)
@@ -62,19 +62,16 @@ def profile_view(request):
 
 @login_required
 def dashboard_view(request):
-    # Fetch recent orders (limit 5)
-    recent_orders = request.user.orders.all().order_by('-created_at')[:5]
-    
+    # Recent orders (limit 5), fetched once and shared with the analytics
+    analytics = cached_user_analytics(request.user)
+
     # Fetch recent design requests (limit 5)
     # Note: We need to make sure the related_name 'design_requests' is set on the DesignRequest model
     # Based on previous context, it is: related_name='design_requests'
     recent_designs = request.user.design_requests.all().order_by('-created_at')[:5]
-    
-    # Get analytics data
-    analytics = get_user_analytics(request.user)
 
     context = {
-        'recent_orders': recent_orders,
+        'recent_orders': analytics['recent_orders'],
         'recent_designs': recent_designs,
         'analytics': analytics,
     }
@@ -129,7 +126,7 @@ def validate_discount_code(request):
 @login_required
 def analytics_view(request):
     """Dedicated analytics dashboard with detailed charts and insights"""
-    analytics = get_user_analytics(request.user)
+    analytics = cached_user_analytics(request.user)
     
     context = {
         'analytics': analytics,
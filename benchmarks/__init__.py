@@ -0,0 +1,8 @@
+"""
+Performance benchmarks (run with ``python manage.py run_benchmarks``).
+
+Each suite builds its own synthetic data inside a transaction that is
+rolled back afterwards, so it can be pointed at any database. Results are
+written as JSON so runs can be compared (``--compare``) and regressions
+caught.
+"""
@@ -0,0 +1,112 @@
+"""
+Synthetic orders, design requests and customers for benchmarks.
+
+Rows are bulk-created (no signals, so nothing is queued or reindexed) and
+only live as long as the surrounding rolled-back transaction.
+"""
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from designs.models import DesignPackage, DesignRequest
+from products.models import Order, Product
+
+OPTION_NAMES = ['Paper', 'Finish', 'Corners', 'Sides', 'Lamination', 'Foil', 'Fold', 'Size']
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run the block in a transaction that is always rolled back.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+def make_customer(name='bench'):
+    user = User(username=f"{name}-{uuid.uuid4().hex[:8]}", first_name='Bench', last_name='Customer', email='bench@example.com')
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+def make_product(name='Benchmark Business Cards'):
+    return Product.objects.bulk_create([
+        Product(name=name, slug=f"bench-{uuid.uuid4().hex[:12]}", image='product_images/bench.png', description='Synthetic'),
+    ])[0]
+
+
+def _order(product, user, index, options=0, services=0, **fields):
+    values = dict(
+        user=user,
+        product=product,
+        short_ref=uuid.uuid4().hex.upper(),
+        full_name='Bench Customer',
+        email='bench@example.com',
+        phone='0820000000',
+        address='1 Benchmark Road, Cape Town',
+        quantity=100 + index % 900,
+        base_price=Decimal('250.00'),
+        options={f"{OPTION_NAMES[i % len(OPTION_NAMES)]} {i}": f"Choice {i}" for i in range(options)},
+        services=[f"Service {i}" for i in range(services)],
+        shipping_price=Decimal('80.00'),
+        discount_amount=Decimal('10.00'),
+        total_price=Decimal('320.00') + index % 50,
+        file='orders/bench.pdf',
+    )
+    values.update(fields)
+    return Order(**values)
+
+
+def make_orders(count, options=0, services=0, user=None, product=None):
+    """
+    ``count`` saved orders, each with ``options`` options and ``services``
+    services, returned with their product loaded.
+    """
+    product = product or make_product()
+    # Received orders print banking details, so the first one is the largest invoice
+    statuses = [Order.Status.RECEIVED, Order.Status.COMPLETED, Order.Status.SHIPPED, Order.Status.CANCELLED]
+    orders = [
+        _order(product, user, i, options, services,
+               status=statuses[i % len(statuses)],
+               payment_status=Order.PaymentStatus.PAID if i % 3 else Order.PaymentStatus.PENDING)
+        for i in range(count)
+    ]
+    Order.objects.bulk_create(orders, batch_size=1000)
+    refs = [order.short_ref for order in orders]
+    return list(Order.objects.select_related('product').filter(short_ref__in=refs).order_by('id'))
+
+
+def make_design_requests(count, packages=1, timeline='rush'):
+    """
+    ``count`` saved guest design requests with ``packages`` packages each,
+    returned with the packages prefetched.
+    """
+    package_objs = DesignPackage.objects.bulk_create([
+        DesignPackage(title=f"Design Package {i}", description='Synthetic', price=Decimal('450.00') + i)
+        for i in range(packages)
+    ])
+    requests_ = DesignRequest.objects.bulk_create([
+        DesignRequest(full_name='Bench Guest', email='bench@example.com', phone='0820000000',
+                      quote_token=uuid.uuid4().hex, timeline_preference=timeline)
+        for _ in range(count)
+    ])
+    Through = DesignRequest.packages.through
+    Through.objects.bulk_create([
+        Through(designrequest_id=dr.pk, designpackage_id=pkg.pk) for dr in requests_ for pkg in package_objs
+    ], batch_size=2000)
+    return list(
+        DesignRequest.objects.select_related('user__profile').prefetch_related('packages')
+        .filter(pk__in=[dr.pk for dr in requests_]).order_by('id')
+    )
@@ -0,0 +1,109 @@
+"""
+Timing, throughput and allocation measurement for one benchmark case.
+"""
+import gc
+import re
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+PAGE_RE = re.compile(rb'/Type /Page\b(?!s)')
+
+
+def count_pages(pdf) -> int:
+    return len(PAGE_RE.findall(pdf))
+
+
+@dataclass
+class Result:
+    suite: str
+    case: str
+    params: dict = field(default_factory=dict)
+    repeat: int = 0
+    first_ms: float = 0.0      # first call, includes any lazy setup
+    min_ms: float = 0.0
+    median_ms: float = 0.0
+    p95_ms: float = 0.0
+    mean_ms: float = 0.0
+    pages: int = 0             # per document
+    bytes: int = 0             # per document
+    pages_per_sec: float = 0.0
+    docs_per_sec: float = 0.0
+    peak_kb: float = 0.0       # tracemalloc peak for one document
+    queries: int = 0           # per document
+
+    @property
+    def key(self):
+        return f"{self.suite}:{self.case}"
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def measure(suite, case, func, params=None, repeat=20):
+    """
+    Benchmark ``func()`` (returning PDF bytes): one cold call (also counting
+    queries), ``repeat`` timed calls, then one call under tracemalloc.
+    """
+    result = Result(suite=suite, case=case, params=params or {}, repeat=repeat)
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        pdf = func()
+        result.first_ms = _ms(time.perf_counter() - start)
+    result.queries = len(queries)
+    result.pages = count_pages(pdf)
+    result.bytes = len(pdf)
+    del pdf
+
+    timings = []
+    gc.collect()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = statistics.median(timings)
+    result.min_ms = _ms(timings[0])
+    result.median_ms = _ms(median)
+    result.p95_ms = _ms(timings[min(len(timings) - 1, int(len(timings) * 0.95))])
+    result.mean_ms = _ms(statistics.fmean(timings))
+    result.docs_per_sec = round(1 / median, 2) if median else 0.0
+    result.pages_per_sec = round(result.pages / median, 2) if median else 0.0
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result.peak_kb = round(peak / 1024, 1)
+    return result
+
+
+def measure_batch(suite, case, submit_all, documents, params=None):
+    """
+    Throughput of a batch job: ``submit_all()`` renders ``documents`` PDFs
+    and returns the list of their bytes.
+    """
+    result = Result(suite=suite, case=case, params=params or {}, repeat=1)
+    start = time.perf_counter()
+    pdfs = submit_all()
+    elapsed = time.perf_counter() - start
+    pages = sum(count_pages(pdf) for pdf in pdfs)
+    per_doc = elapsed / documents
+    result.first_ms = result.min_ms = result.median_ms = result.p95_ms = result.mean_ms = _ms(per_doc)
+    result.pages = round(pages / documents)
+    result.bytes = round(sum(len(pdf) for pdf in pdfs) / documents)
+    result.docs_per_sec = round(documents / elapsed, 2)
+    result.pages_per_sec = round(pages / elapsed, 2)
+    return result
@@ -0,0 +1,93 @@
+"""
+PDF generation benchmarks: invoices, quotes and statements of increasing
+size, rendered in-process, plus optional render-pool throughput.
+"""
+from unittest import mock
+
+from designs.pdf_utils import generate_design_invoice_pdf, generate_design_quote_pdf
+from products import documents, pdf_service
+from products.pdf_utils import generate_order_invoice_pdf
+from products.statements import generate_customer_statement_pdf
+
+from .fixtures import make_customer, make_design_requests, make_orders, make_product, rolled_back
+from .measure import measure, measure_batch
+
+SUITE = 'pdf'
+
+# (options, services) per order invoice
+INVOICE_SIZES = [(0, 0), (4, 2), (12, 8), (40, 25)]
+# packages per design quote / invoice
+PACKAGE_COUNTS = [1, 4, 15, 50]
+# orders per customer statement
+STATEMENT_SIZES = [10, 500, 5000]
+QUICK_STATEMENT_SIZES = [10, 500]
+
+
+def run(repeat=20, quick=False, pool_workers=0, pool_documents=200, log=None):
+    """
+    Run the suite and return a list of benchmarks.measure.Result.
+    """
+    log = log or (lambda message: None)
+    results = []
+    documents.warm_up()
+
+    with rolled_back():
+        product = make_product()
+
+        for options, services in INVOICE_SIZES:
+            order = make_orders(1, options, services, product=product)[0]
+            case = f"order_invoice[options={options},services={services}]"
+            log(case)
+            results.append(measure(SUITE, case, lambda: generate_order_invoice_pdf(order),
+                                   {'options': options, 'services': services}, repeat))
+
+        # The same small invoice without the logo: the difference is what
+        # embedding the logo costs per document (should be about 1ms)
+        order = make_orders(1, 0, 0, product=product)[0]
+        case = "order_invoice[options=0,services=0,logo=off]"
+        log(case)
+        with mock.patch.object(documents, 'logo_image', return_value=None):
+            results.append(measure(SUITE, case, lambda: generate_order_invoice_pdf(order),
+                                   {'options': 0, 'services': 0, 'logo': False}, repeat))
+
+        for packages in PACKAGE_COUNTS:
+            design_request = make_design_requests(1, packages)[0]
+            for name, generate in (('design_quote', generate_design_quote_pdf), ('design_invoice', generate_design_invoice_pdf)):
+                case = f"{name}[packages={packages}]"
+                log(case)
+                results.append(measure(SUITE, case, lambda: generate(design_request), {'packages': packages}, repeat))
+
+        for orders in (QUICK_STATEMENT_SIZES if quick else STATEMENT_SIZES):
+            customer = make_customer()
+            make_orders(orders, user=customer, product=product)
+            case = f"customer_statement[orders={orders}]"
+            log(case)
+            # Long statements take seconds each; a few runs are plenty
+            statement_repeat = max(1, min(repeat, 50_000 // (orders * 10) or 1))
+            results.append(measure(SUITE, case, lambda: generate_customer_statement_pdf(customer.pk),
+                                   {'orders': orders}, statement_repeat))
+
+        if pool_workers:
+            orders = make_orders(pool_documents, 4, 2, product=product)
+            case = f"order_invoice_pool[workers={pool_workers}]"
+            log(case)
+            results.append(_pool_throughput(case, orders, pool_workers))
+
+    return results
+
+
+def _pool_throughput(case, orders, workers):
+    pool = pdf_service.create_pool(workers)
+    try:
+        # Start and warm every worker before timing
+        warm = [pdf_service.submit(generate_order_invoice_pdf, orders[0], executor=pool) for _ in range(workers * 2)]
+        for future in warm:
+            pdf_service.result(future)
+
+        def submit_all():
+            futures = [pdf_service.submit(generate_order_invoice_pdf, order, executor=pool) for order in orders]
+            return [pdf_service.result(future) for future in futures]
+
+        return measure_batch(SUITE, case, submit_all, len(orders), {'workers': workers, 'documents': len(orders)})
+    finally:
+        pool.shutdown(cancel_futures=True)
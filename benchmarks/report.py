@@ -0,0 +1,80 @@
+"""
+Machine-readable output and run-to-run comparison.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import django
+import reportlab
+
+COLUMNS = [
+    ('case', 'Case', 44), ('median_ms', 'Median ms', 10), ('p95_ms', 'p95 ms', 9), ('first_ms', 'First ms', 9),
+    ('pages', 'Pages', 6), ('pages_per_sec', 'Pages/s', 9), ('peak_kb', 'Peak KB', 9), ('queries', 'Queries', 8),
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def metadata():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'reportlab': reportlab.Version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_json(results, path):
+    payload = {'meta': metadata(), 'results': [result.as_dict() for result in results]}
+    if path == '-':
+        json.dump(payload, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(payload, fh, indent=2)
+
+
+def load_json(path):
+    with open(path, encoding='utf-8') as fh:
+        payload = json.load(fh)
+    return {f"{row['suite']}:{row['case']}": row for row in payload['results']}
+
+
+def format_table(results):
+    lines = [' '.join(title.ljust(width) if key == 'case' else title.rjust(width) for key, title, width in COLUMNS)]
+    for result in results:
+        row = result.as_dict()
+        lines.append(' '.join(
+            str(row[key]).ljust(width) if key == 'case' else str(row[key]).rjust(width)
+            for key, title, width in COLUMNS
+        ))
+    return '\n'.join(lines)
+
+
+def compare(results, baseline, metric='median_ms'):
+    """
+    [(key, before, after, percent change)] for cases present in both runs.
+    """
+    changes = []
+    for result in results:
+        before = baseline.get(result.key, {}).get(metric)
+        if not before:
+            continue
+        after = getattr(result, metric)
+        changes.append((result.key, before, after, round((after - before) / before * 100, 1)))
+    return changes
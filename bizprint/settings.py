@@ -149,6 +149,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Catalog snapshot cache: seconds between checks of the DB catalog version
+# (see products/catalog.py)
+CATALOG_VERSION_CHECK_INTERVAL = 1.0
+
 # Email Configuration
 # For development, print emails to the console instead of sending them.
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -173,4 +177,27 @@ if not DEBUG:
 
 TWILIO_ACCOUNT_SID = 'your_sid_here'
 TWILIO_AUTH_TOKEN = 'your_token_here'
-TWILIO_WHATSAPP_NUMBER = 'whatsapp:+14155238886'    
\ No newline at end of file
+TWILIO_WHATSAPP_NUMBER = 'whatsapp:+14155238886'    
+
+# WhatsApp delivery client (see products/whatsapp.py). Set WHATSAPP_TRANSPORT
+# to 'fake' to load-test the outbox worker offline.
+WHATSAPP_RATE_PER_SECOND = 10
+WHATSAPP_MAX_WORKERS = 4
+
+# Out-of-process PDF rendering (see products/pdf_service.py); 0 renders inline
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_QUEUE_SIZE = 16
+PDF_RENDER_TIMEOUT = 30
+# Account statements can run to thousands of pages
+PDF_STATEMENT_TIMEOUT = 120
+
+# Per-user dashboard analytics cache (see accounts/analytics_cache.py):
+# seconds before a payload is recomputed even if nothing changed, payloads
+# kept in each worker's LRU, seconds to wait for another request's refresh
+ANALYTICS_CACHE_TIMEOUT = 3600
+ANALYTICS_CACHE_MAX_USERS = 1000
+ANALYTICS_CACHE_LOCK_WAIT = 2.0
+
+# Batch quote API (see products/api.py): request rate per IP for anonymous
+# callers, counted in the default cache (per process unless CACHES is shared)
+QUOTE_API_ANON_RATE = '30/min'
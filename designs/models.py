@@ -4,6 +4,8 @@ from django.core.exceptions import ValidationError
 from decimal import Decimal
 import uuid
 
+from products.mixins import FieldTrackerMixin
+
 
 class DesignPackage(models.Model):
     title = models.CharField(max_length=200)
@@ -24,13 +26,14 @@ class DesignPackage(models.Model):
     def __str__(self):
         return self.title
 
-class DesignRequest(models.Model):
+class DesignRequest(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('in_progress', 'In Progress'),
         ('completed', 'Completed'),
         ('paid', 'Paid')
     ]
+    tracked_fields = ('status',)
 
     # Allow guests (user null) or authenticated users
     user = models.ForeignKey(
@@ -147,6 +150,13 @@ class DesignRequest(models.Model):
         Get subtotal including rush fee if applicable
         """
         return self.total_price + self.get_rush_fee()
+
+    def get_total_with_vat(self):
+        """
+        Amount due as quoted: subtotal (with rush fee) plus 15% VAT
+        """
+        subtotal = self.get_subtotal_with_rush()
+        return subtotal + subtotal * Decimal('0.15')
     
     def get_estimated_turnaround_days(self):
         """
@@ -1,256 +1,125 @@
 """
-PDF generation utilities for quotes and invoices using ReportLab
+Design quote and invoice templates (rendered by products.documents)
 """
-from io import BytesIO
 from decimal import Decimal
-from datetime import datetime
 
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.pdfgen import canvas
-from django.conf import settings
-import os
 
+from products.documents import Document, Fields, Items, Note, Totals, banking_fields, render
 
-def generate_design_quote_pdf(design_request):
+
+def design_quote_fingerprint(design_request):
     """
-    Generate a professional PDF quote for a design request
+    Everything printed on the quote; the PDF cache key (see products.pdf_cache)
     """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
-                            topMargin=72, bottomMargin=18)
-    
-    # Container for the 'Flowable' objects
-    elements = []
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1d3557'),
-        spaceAfter=30,
-        alignment=1  # Center
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1d3557'),
-        spaceAfter=12,
-    )
-    
-    normal_style = styles['Normal']
-    
-    # Add logo if exists
-    logo_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'bp-logo-1.png')
-    if os.path.exists(logo_path):
-        try:
-            img = Image(logo_path, width=1.5*inch, height=0.6*inch)
-            elements.append(img)
-            elements.append(Spacer(1, 12))
-        except:
-            pass
-    
-    # Title
-    elements.append(Paragraph("QUOTATION", title_style))
-    elements.append(Spacer(1, 12))
-    
-    # Quote details
-    quote_info = [
-        ['Quote #:', str(design_request.id)],
-        ['Date:', design_request.created_at.strftime('%d %B %Y')],
-        ['Status:', design_request.get_status_display()],
-    ]
-    
-    quote_table = Table(quote_info, colWidths=[1.5*inch, 4*inch])
-    quote_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1d3557')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    elements.append(quote_table)
-    elements.append(Spacer(1, 20))
-    
-    # Client information
-    elements.append(Paragraph("Prepared For:", heading_style))
-    
-    if design_request.user:
-        client_name = design_request.user.get_full_name()
-        client_email = design_request.user.email
-        client_phone = design_request.phone or (design_request.user.profile.phone if hasattr(design_request.user, 'profile') else '')
+    user = design_request.user
+    profile_phone = ''
+    if user and hasattr(user, 'profile'):
+        profile_phone = user.profile.phone
+    return {
+        'id': design_request.id,
+        'created_at': design_request.created_at.date(),
+        'status': design_request.status,
+        'user': [user.get_full_name(), user.email] if user else None,
+        'full_name': design_request.full_name,
+        'email': design_request.email,
+        'phone': design_request.phone or profile_phone,
+        'timeline_preference': design_request.timeline_preference,
+        'packages': [[p.title, p.price] for p in design_request.packages.all()],
+    }
+
+
+def _client_fields(design_request, heading):
+    user = design_request.user
+    if user:
+        client_name = user.get_full_name()
+        client_email = user.email
+        client_phone = design_request.phone or (user.profile.phone if hasattr(user, 'profile') else '')
     else:
         client_name = design_request.full_name or "Guest"
         client_email = design_request.email
         client_phone = design_request.phone or ''
-    
+
     client_info = [
         ['Name:', client_name],
         ['Email:', client_email],
     ]
-    
     if client_phone:
         client_info.append(['Phone:', client_phone])
-    
-    client_table = Table(client_info, colWidths=[1.5*inch, 4*inch])
-    client_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#555555')),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9f9f9')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-    ]))
-    elements.append(client_table)
-    elements.append(Spacer(1, 20))
-    
-    # Estimated turnaround time
-    turnaround_days = design_request.get_estimated_turnaround_days()
-    timeline_text = f"Estimated Turnaround Time: {turnaround_days} business days"
-    if design_request.timeline_preference:
-        timeline_text += f" ({design_request.get_timeline_preference_display()} timeline)"
-    
-    turnaround_style = ParagraphStyle(
-        'Turnaround',
-        parent=normal_style,
-        fontSize=10,
-        textColor=colors.HexColor('#1d3557'),
-        backColor=colors.HexColor('#f0f7ff'),
-        borderPadding=10,
-        borderColor=colors.HexColor('#1d3557'),
-        borderWidth=1,
-        borderRadius=4,
-        leftIndent=10,
-    )
-    elements.append(Paragraph(f"<b>⏱ {timeline_text}</b>", turnaround_style))
-    elements.append(Spacer(1, 30))
-    
-    # Selected packages
-    elements.append(Paragraph("Selected Packages", heading_style))
-    
-    # Package table data
-    package_data = [['Package', 'Price (R)']]
-    for pkg in design_request.packages.all():
-        package_data.append([pkg.title, f"{pkg.price:.2f}"])
-    
-    package_table = Table(package_data, colWidths=[4*inch, 1.5*inch])
-    package_table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1d3557')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        
-        # Data rows
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-        
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#1d3557')),
-    ]))
-    elements.append(package_table)
-    elements.append(Spacer(1, 20))
-    
-    # Totals
+    return Fields(client_info, style='client', heading=heading)
+
+
+def _package_items(design_request, heading):
+    rows = [[pkg.title, f"{pkg.price:.2f}"] for pkg in design_request.packages.all()]
+    return Items(['Package', 'Price (R)'], rows, (4*inch, 1.5*inch), heading=heading, right_columns=(1,))
+
+
+def _totals(design_request):
     subtotal = design_request.total_price
     rush_fee = design_request.get_rush_fee()
     subtotal_with_rush = design_request.get_subtotal_with_rush()
     vat = subtotal_with_rush * Decimal('0.15')
-    total = subtotal_with_rush + vat
-    
-    # Build totals data with rush fee if applicable
-    totals_data = [
-        ['Subtotal:', f"R {subtotal:.2f}"],
-    ]
-    
+
+    totals = [['Subtotal:', f"R {subtotal:.2f}"]]
     if rush_fee > 0:
-        totals_data.append(['Rush Fee (50%):', f"R {rush_fee:.2f}"])
-        totals_data.append(['Subtotal with Rush:', f"R {subtotal_with_rush:.2f}"])
-    
-    totals_data.extend([
+        totals.append(['Rush Fee (50%):', f"R {rush_fee:.2f}"])
+        totals.append(['Subtotal with Rush:', f"R {subtotal_with_rush:.2f}"])
+    totals.extend([
         ['VAT (15%):', f"R {vat:.2f}"],
         ['', ''],  # Spacer row
-        ['Total:', f"R {total:.2f}"],
+        ['Total:', f"R {subtotal_with_rush + vat:.2f}"],
     ])
-    
-    totals_table = Table(totals_data, colWidths=[4*inch, 1.5*inch])
-    totals_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, 2), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, 2), 'Helvetica'),
-        ('FONTNAME', (0, 3), (-1, 3), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 2), 10),
-        ('FONTSIZE', (0, 3), (-1, 3), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, 3), (-1, 3), colors.HexColor('#e63946')),
-        ('LINEABOVE', (0, 3), (-1, 3), 1, colors.HexColor('#1d3557')),
-        ('TOPPADDING', (0, 3), (-1, 3), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
-    elements.append(totals_table)
-    elements.append(Spacer(1, 30))
-    
-    # Banking details
-    elements.append(Paragraph("Banking Details", heading_style))
-    
-    banking_data = [
-        ['Account Name:', 'BizPrint'],
-        ['Bank:', 'Capitec Bank'],
-        ['Account Number:', '2482418611'],
-        ['Branch Code:', '470010'],
-        ['Reference:', f'Quote {design_request.id}'],
-    ]
-    
-    banking_table = Table(banking_data, colWidths=[1.5*inch, 4*inch])
-    banking_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#555555')),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff3cd')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#ffc107')),
-    ]))
-    elements.append(banking_table)
-    elements.append(Spacer(1, 20))
-    
-    # Footer note
-    footer_text = """
-    <para align=center>
-    <font size=8 color="#666666">
-    © 2025 BizPrint. A Subsidiary of Ardent SA (Pty) Ltd.<br/>
-    Terms of Service | Privacy Policy
-    </font>
-    </para>
+    return Totals(totals)
+
+
+def design_quote_document(design_request):
+    """
+    Declarative quotation for a design request
+    """
+    turnaround_days = design_request.get_estimated_turnaround_days()
+    timeline_text = f"Estimated Turnaround Time: {turnaround_days} business days"
+    if design_request.timeline_preference:
+        timeline_text += f" ({design_request.get_timeline_preference_display()} timeline)"
+
+    return Document("QUOTATION", [
+        Fields([
+            ['Quote #:', str(design_request.id)],
+            ['Date:', design_request.created_at.strftime('%d %B %Y')],
+            ['Status:', design_request.get_status_display()],
+        ]),
+        _client_fields(design_request, "Prepared For:"),
+        Note(f"<b>⏱ {timeline_text}</b>", style='callout', space_after=30),
+        _package_items(design_request, "Selected Packages"),
+        _totals(design_request),
+        banking_fields(f'Quote {design_request.id}'),
+    ])
+
+
+def design_invoice_document(design_request):
+    """
+    Declarative invoice for a design request
+    """
+    return Document("INVOICE", [
+        Fields([
+            ['Invoice #:', str(design_request.id)],
+            ['Date:', design_request.created_at.strftime('%d %B %Y')],
+            ['Payment Status:', design_request.get_status_display()],
+        ]),
+        _client_fields(design_request, "Billed To:"),
+        _package_items(design_request, "Design Services"),
+        _totals(design_request),
+    ])
+
+
+def generate_design_quote_pdf(design_request):
+    """
+    Generate a professional PDF quote for a design request
+    """
+    return render(design_quote_document(design_request))
+
+
+def generate_design_invoice_pdf(design_request):
+    """
+    Generate a PDF invoice for a design request
     """
-    elements.append(Spacer(1, 30))
-    elements.append(Paragraph(footer_text, normal_style))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Get the value of the BytesIO buffer and return it
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    return render(design_invoice_document(design_request))
@@ -1,38 +1,35 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-from django.conf import settings
 from .models import DesignRequest
+from products import outbox, pdf_cache
 from decimal import Decimal
 
 
-@receiver(pre_save, sender=DesignRequest)
-def track_status_change(sender, instance, **kwargs):
+@receiver(post_save, sender=DesignRequest)
+def send_status_change_email(sender, instance, created, **kwargs):
     """
-    Track status changes before saving to trigger appropriate emails
+    Queue email notifications when design request status changes
     """
-    if instance.pk:
-        try:
-            previous = DesignRequest.objects.get(pk=instance.pk)
-            instance._previous_status = previous.status
-        except DesignRequest.DoesNotExist:
-            instance._previous_status = None
-    else:
-        instance._previous_status = None
+    outbox.enqueue(*status_change_notifications(instance, created))
 
 
-@receiver(post_save, sender=DesignRequest)
-def send_status_change_email(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=DesignRequest)
+def discard_cached_quote(sender, instance, **kwargs):
+    pdf_cache.discard('quotes', instance.pk)
+
+
+def status_change_notifications(instance, created=False):
     """
-    Send email notifications when design request status changes
+    Unsaved outbox messages for a design request's status change. Also used
+    by bulk updates that bypass post_save.
     """
     # Get email address
     email = instance.email if instance.email else (instance.user.email if instance.user else None)
     
     if not email:
-        return
+        return []
     
     # Prepare context data
     subtotal = instance.total_price
@@ -56,36 +53,25 @@ def send_status_change_email(sender, instance, created, **kwargs):
         email_sent = True
     
     # Status changed from pending to paid
-    elif hasattr(instance, '_previous_status') and instance._previous_status == 'pending' and instance.status == 'paid':
+    elif instance.previous('status') == 'pending' and instance.status == 'paid':
         subject = f'Payment Confirmed - Design #{instance.id} - BizPrint'
         html_message = render_to_string('emails/payment_confirmed.html', context)
         email_sent = True
     
     # Status changed to in_progress
-    elif hasattr(instance, '_previous_status') and instance._previous_status != 'in_progress' and instance.status == 'in_progress':
+    elif instance.has_changed('status') and instance.status == 'in_progress':
         subject = f'Your Design is In Progress - #{instance.id} - BizPrint'
         html_message = render_to_string('emails/design_in_progress.html', context)
         email_sent = True
     
     # Status changed to completed
-    elif hasattr(instance, '_previous_status') and instance._previous_status != 'completed' and instance.status == 'completed':
+    elif instance.has_changed('status') and instance.status == 'completed':
         subject = f'🎉 Your Design is Ready! - #{instance.id} - BizPrint'
         html_message = render_to_string('emails/design_completed.html', context)
         email_sent = True
     
-    # Send the email if a status change was detected
+    # Queue the email if a status change was detected; run_outbox_worker sends it
     if email_sent:
         plain_message = strip_tags(html_message)
-        
-        try:
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-        except Exception as e:
-            # Log the error but don't break the save operation
-            print(f"Failed to send email: {e}")
+        return [outbox.email(subject, [email], html_message, plain_message)]
+    return []
@@ -1,3 +1,32 @@
 from django.test import TestCase
 
-# Create your tests here.
+from products.models import OutboxMessage
+
+from .models import DesignRequest
+
+
+class StatusChangeEmailTests(TestCase):
+    def emails(self):
+        return [m.payload['subject'] for m in OutboxMessage.objects.filter(channel=OutboxMessage.Channel.EMAIL)]
+
+    def test_created_pending_sends_quote(self):
+        design = DesignRequest.objects.create(email='client@example.com')
+        self.assertEqual(self.emails(), [f'Your Design Quote #{design.pk} is Ready - BizPrint'])
+
+    def test_created_with_status_sends_status_email(self):
+        design = DesignRequest.objects.create(email='client@example.com', status='in_progress')
+        self.assertEqual(self.emails(), [f'Your Design is In Progress - #{design.pk} - BizPrint'])
+
+    def test_status_change_sends_once(self):
+        design = DesignRequest.objects.create(email='client@example.com')
+        OutboxMessage.objects.all().delete()
+
+        design.status = 'paid'
+        design.save()
+        design.save()
+        self.assertEqual(self.emails(), [f'Payment Confirmed - Design #{design.pk} - BizPrint'])
+
+        design = DesignRequest.objects.get(pk=design.pk)
+        design.status = 'completed'
+        design.save(update_fields=['status'])
+        self.assertEqual(len(self.emails()), 2)
@@ -4,10 +4,13 @@ from django.contrib import messages
 from django.urls import reverse
 from django.utils.crypto import get_random_string
 from django.http import HttpResponse
+from django.db import transaction
 from decimal import Decimal
 
 from .models import DesignPackage, DesignRequest
-from .pdf_utils import generate_design_quote_pdf
+from .pdf_utils import generate_design_quote_pdf, design_quote_fingerprint
+from products.pdf_cache import pdf_response
+from products import pdf_service
 
 
 def design_list(request):
@@ -84,25 +87,27 @@ def design_request_create(request):
         # generate a unique quote token
         quote_token = get_random_string(32)
 
-        design_request = DesignRequest.objects.create(
-            user=user,
-            additional_instructions=additional_instructions,
-            uploaded_files=uploaded_file,
-            email=email if not user else '', # Store email if guest, otherwise user's email is implicit via user FK
-            phone=phone,
-            full_name=full_name,
-            quote_token=quote_token,
-            brand_colors=brand_colors,
-            target_audience=target_audience,
-            design_preferences=design_preferences,
-            inspiration_links=inspiration_links,
-            timeline_preference=timeline_preference,
-        )
-        # If full_name is still missing, add a warning to help debug missing guest names
-        if not design_request.full_name:
-            messages.warning(request, "No full name was provided — if you typed a name, please check the form and try again.")
-        design_request.packages.add(*package_ids)
-        design_request.save()
+        # Queued notification emails commit together with the request
+        with transaction.atomic():
+            design_request = DesignRequest.objects.create(
+                user=user,
+                additional_instructions=additional_instructions,
+                uploaded_files=uploaded_file,
+                email=email if not user else '', # Store email if guest, otherwise user's email is implicit via user FK
+                phone=phone,
+                full_name=full_name,
+                quote_token=quote_token,
+                brand_colors=brand_colors,
+                target_audience=target_audience,
+                design_preferences=design_preferences,
+                inspiration_links=inspiration_links,
+                timeline_preference=timeline_preference,
+            )
+            # If full_name is still missing, add a warning to help debug missing guest names
+            if not design_request.full_name:
+                messages.warning(request, "No full name was provided — if you typed a name, please check the form and try again.")
+            design_request.packages.add(*package_ids)
+            design_request.save()
 
         messages.success(
             request,
@@ -176,21 +181,21 @@ def download_design_quote_pdf(request, quote_token):
     """
     Download quote as PDF - accessible via quote token (no login required)
     """
-    dr = DesignRequest.objects.filter(quote_token=quote_token).first()
+    # Everything the quote prints, loaded up front (the renderer runs in another process)
+    queryset = DesignRequest.objects.select_related('user__profile').prefetch_related('packages')
+    dr = queryset.filter(quote_token=quote_token).first()
     if not dr:
         if quote_token.isdigit():
-            dr = get_object_or_404(DesignRequest, pk=int(quote_token))
+            dr = get_object_or_404(queryset, pk=int(quote_token))
         else:
-            dr = get_object_or_404(DesignRequest, quote_token=quote_token)
-    
-    # Generate PDF
-    pdf = generate_design_quote_pdf(dr)
-    
-    # Create HTTP response
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="BizPrint_Quote_{dr.id}.pdf"'
+            dr = get_object_or_404(queryset, quote_token=quote_token)
     
-    return response
+    # Rendered once per distinct quote content, then served from disk
+    return pdf_response(
+        request, 'quotes', dr.pk, design_quote_fingerprint(dr),
+        lambda: pdf_service.render(generate_design_quote_pdf, dr),
+        filename=f"BizPrint_Quote_{dr.id}.pdf",
+    )
 
 
 @login_required
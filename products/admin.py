@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import Product, QuantityTier, ProductOption, OptionalService, Order, Category, ShippingMethod
+from .models import Product, QuantityTier, ProductOption, OptionalService, Order, Category, ShippingMethod, OutboxMessage
 from django.utils.html import format_html
+from django.contrib import messages
+from django.http import FileResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+import tempfile
 from import_export.admin import ImportExportModelAdmin
+from .catalog import get_catalog
 
 # ==========================
 # Inlines for Product Admin
@@ -28,6 +33,39 @@ class ProductAdmin(ImportExportModelAdmin):
     list_display = ['name']
     prepopulated_fields = {"slug": ("name",)}
     inlines = [QuantityInline, OptionInline, ServiceInline]
+    actions = ['download_price_sheet_csv', 'download_price_sheet_xlsx']
+
+    def _price_sheet_bundles(self, queryset):
+        snapshot = get_catalog()
+        bundles = [snapshot.product(slug) for slug in queryset.order_by('name').values_list('slug', flat=True)]
+        return [bundle for bundle in bundles if bundle is not None]
+
+    @admin.action(description="Download full price sheet (CSV)")
+    def download_price_sheet_csv(self, request, queryset):
+        from .price_sheets import PriceSheetError, stream_csv
+
+        try:
+            chunks = stream_csv(self._price_sheet_bundles(queryset))
+        except PriceSheetError as e:
+            return HttpResponseBadRequest(str(e), content_type='text/plain')
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="BizPrint_Price_Sheet.csv"'
+        return response
+
+    @admin.action(description="Download full price sheet (XLSX)")
+    def download_price_sheet_xlsx(self, request, queryset):
+        from .price_sheets import PriceSheetError, write_xlsx
+
+        # Written to a temp file so the workbook never sits in memory
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx')
+        try:
+            write_xlsx(self._price_sheet_bundles(queryset), tmp.name)
+        except PriceSheetError as e:
+            tmp.close()
+            self.message_user(request, str(e), level=messages.ERROR)
+            return None
+        tmp.seek(0)
+        return FileResponse(tmp, as_attachment=True, filename='BizPrint_Price_Sheet.xlsx')
 
 admin.site.register(QuantityTier)
 admin.site.register(ProductOption)
@@ -44,7 +82,8 @@ class OrderAdmin(ImportExportModelAdmin):
         'total_price', 'status', 'payment_status', 'created_at'
     ]
     list_filter = ['status', 'payment_status', 'created_at']
-    search_fields = ['uuid', 'product__name', 'user__username']
+    search_fields = ['product__name', 'user__username']
+    actions = ['download_invoices_zip', 'export_orders_csv', 'export_orders_ndjson', 'export_orders_xlsx']
     readonly_fields = [
         'uuid', 'options', 'services', 'total_price',
         'created_at', 'artwork_preview', 'payment_preview',
@@ -66,7 +105,7 @@ class OrderAdmin(ImportExportModelAdmin):
             text_lines = [
                 f"Hi {obj.full_name or 'Customer'}, this is BizPrint.",
                 "",
-                f"Regarding Order #{str(obj.uuid)[:8]}:",
+                f"Regarding Order #{obj.short_ref}:",
                 "",
                 f"• Product: {obj.product.name}",
                 f"• Qty: {obj.quantity}",
@@ -129,9 +168,61 @@ class OrderAdmin(ImportExportModelAdmin):
     )
 
     def short_uuid(self, obj):
-        return str(obj.uuid)[:8]
+        return obj.short_ref
     short_uuid.short_description = 'Ref'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Order references (short, INV..., full uuid) are an indexed exact match
+        candidates = Order.short_ref_candidates(search_term)
+        if candidates:
+            matches = queryset.filter(short_ref__in=candidates)
+            if matches.exists():
+                return matches, False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.action(description="Download invoices (ZIP)")
+    def download_invoices_zip(self, request, queryset):
+        from .invoice_export import stream_invoices_zip
+
+        orders = queryset.select_related('product').order_by('created_at', 'id')
+        response = StreamingHttpResponse(stream_invoices_zip(orders), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="BizPrint_Invoices_{timezone.now():%Y-%m-%d}.zip"'
+        return response
+
+    def _export_filename(self, extension):
+        return f"BizPrint_Orders_{timezone.now():%Y-%m-%d}.{extension}"
+
+    @admin.action(description="Export orders (CSV)")
+    def export_orders_csv(self, request, queryset):
+        from .order_export import stream_csv
+
+        response = StreamingHttpResponse(stream_csv(queryset.order_by('created_at', 'id')), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{self._export_filename("csv")}"'
+        return response
+
+    @admin.action(description="Export orders (NDJSON)")
+    def export_orders_ndjson(self, request, queryset):
+        from .order_export import stream_ndjson
+
+        response = StreamingHttpResponse(stream_ndjson(queryset.order_by('created_at', 'id')), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="{self._export_filename("ndjson")}"'
+        return response
+
+    @admin.action(description="Export orders (XLSX)")
+    def export_orders_xlsx(self, request, queryset):
+        from .order_export import OrderExportError, write_xlsx
+
+        # Written to a temp file so the workbook never sits in memory
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx')
+        try:
+            write_xlsx(queryset.order_by('created_at', 'id'), tmp.name)
+        except OrderExportError as e:
+            tmp.close()
+            self.message_user(request, str(e), level=messages.ERROR)
+            return None
+        tmp.seek(0)
+        return FileResponse(tmp, as_attachment=True, filename=self._export_filename('xlsx'))
+
     def user_display(self, obj):
         return obj.user.username if obj.user else 'Anonymous'
     user_display.short_description = 'Customer'
@@ -163,4 +254,22 @@ class ShippingMethodAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'price', 'description']
     prepopulated_fields = {"slug": ("name",)}
     list_editable = ['price']
-    search_fields = ['name', 'description']
\ No newline at end of file
+    search_fields = ['name', 'description']
+
+# ==========================
+# Notification Outbox Admin
+# ==========================
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'channel']
+    readonly_fields = ['channel', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected messages now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxMessage.Status.SENT).update(
+            status=OutboxMessage.Status.PENDING, attempts=0, available_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} message(s) queued for retry.", messages.SUCCESS)
@@ -0,0 +1,68 @@
+"""
+REST endpoints for the storefront and corporate clients.
+"""
+from django.conf import settings
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle
+from rest_framework.views import APIView
+
+from accounts.models import NewsletterSubscriber
+from .catalog import get_catalog
+from .pricing import PricingError
+from .serializers import MAX_ANON_QUOTE_ITEMS, MAX_QUOTE_ITEMS, QuoteRequestSerializer
+
+
+class QuoteAnonThrottle(AnonRateThrottle):
+    """Per-IP request rate for anonymous batch quotes."""
+    scope = 'quote_anon'
+
+    def get_rate(self):
+        return getattr(settings, 'QUOTE_API_ANON_RATE', '30/min')
+
+
+class BatchQuoteView(APIView):
+    """
+    POST {"items": [{"product": slug, "quantity": 100, "options": {...},
+    "services": [...], "shipping_method": "standard", "discount_code": ""}]}
+
+    Prices every configuration from the in-memory catalog snapshot; the only
+    query is one lookup for all discount codes in the batch. Results keep
+    request order, with an "error" entry for configurations that can't be
+    priced. Anonymous callers are rate limited and get smaller batches.
+    """
+    permission_classes = [AllowAny]
+    throttle_classes = [QuoteAnonThrottle]
+
+    def post(self, request):
+        max_items = MAX_QUOTE_ITEMS if request.user.is_authenticated else MAX_ANON_QUOTE_ITEMS
+        serializer = QuoteRequestSerializer(data=request.data, context={'max_items': max_items})
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+
+        codes = {item['discount_code'].strip().upper() for item in items if item['discount_code'].strip()}
+        valid_codes = set(
+            NewsletterSubscriber.objects.filter(discount_code__in=codes).values_list('discount_code', flat=True)
+        ) if codes else set()
+
+        snapshot = get_catalog()
+        results = []
+        for index, item in enumerate(items):
+            bundle = snapshot.product(item['product'])
+            if bundle is None:
+                results.append({'index': index, 'product': item['product'], 'error': "Unknown product."})
+                continue
+            try:
+                quote = bundle.pricing.quote(
+                    item['quantity'],
+                    options=item['options'],
+                    services=item['services'],
+                    shipping_method=item['shipping_method'] or None,
+                    discount=item['discount_code'].strip().upper() in valid_codes,
+                )
+            except PricingError as e:
+                results.append({'index': index, 'product': item['product'], 'error': str(e)})
+                continue
+            results.append({'index': index, 'product': item['product'], **quote.as_dict()})
+
+        return Response({'catalog_version': snapshot.version, 'results': results})
@@ -0,0 +1,207 @@
+"""
+Per-worker catalog snapshot cache.
+
+The storefront pages read categories, products, tiers, options, services and
+shipping methods from an immutable in-memory snapshot instead of querying
+them on every request. Catalog save/delete signals bump CatalogVersion in
+the database; each worker compares its snapshot's version against that row
+(at most once per CATALOG_VERSION_CHECK_INTERVAL seconds) and reloads when
+it moved, so admin edits reach every gunicorn worker without a shared cache
+server.
+
+Snapshot objects are model instances shared between requests and threads:
+treat them as read-only.
+"""
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+
+@dataclass(frozen=True)
+class ProductPricingBundle:
+    """
+    Everything needed to render and price one product, with dict lookups so
+    pricing an order costs no further queries however many options it has.
+    """
+    product: object
+    tiers: tuple
+    tiers_by_quantity: MappingProxyType
+    grouped_options: MappingProxyType
+    options_by_key: MappingProxyType
+    services: tuple
+    services_by_label: MappingProxyType
+    shipping_methods: tuple
+    shipping_prices: MappingProxyType
+
+    @classmethod
+    def from_product(cls, product, shipping_methods):
+        """
+        Build from a product whose tiers/options/services are prefetched.
+        """
+        tiers = tuple(product.quantity_tiers.all())
+        options = tuple(product.options.all())
+        services = tuple(product.services.all())
+        grouped = defaultdict(list)
+        for opt in options:
+            grouped[opt.option_type].append(opt)
+        return cls(
+            product=product,
+            tiers=tiers,
+            tiers_by_quantity=MappingProxyType({t.quantity: t for t in tiers}),
+            grouped_options=MappingProxyType({k: tuple(v) for k, v in grouped.items()}),
+            options_by_key=MappingProxyType({(o.option_type, o.value): o for o in options}),
+            services=services,
+            services_by_label=MappingProxyType({s.label: s for s in services}),
+            shipping_methods=tuple(shipping_methods),
+            shipping_prices=MappingProxyType({m.slug: m.price for m in shipping_methods}),
+        )
+
+    @classmethod
+    def load(cls, slug):
+        """
+        Fetch a product's pricing bundle straight from the database in a fixed
+        five queries. Raises Product.DoesNotExist for an unknown slug.
+        """
+        from .models import Product, ShippingMethod
+
+        product = (
+            Product.objects.select_related('category')
+            .prefetch_related('quantity_tiers', 'options', 'services')
+            .get(slug=slug)
+        )
+        return cls.from_product(product, ShippingMethod.objects.all())
+
+    def tier(self, quantity):
+        return self.tiers_by_quantity.get(quantity)
+
+    def option(self, option_type, value):
+        return self.options_by_key.get((option_type, value))
+
+    def service(self, label):
+        return self.services_by_label.get(label)
+
+    @cached_property
+    def pricing(self):
+        """Compiled integer-cent pricing tables (built once per bundle)."""
+        from .pricing import CompiledPricing
+
+        return CompiledPricing.compile(self)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    categories: tuple
+    categories_by_slug: MappingProxyType
+    products: tuple
+    products_by_slug: MappingProxyType
+    products_by_category: MappingProxyType
+    shipping_methods: tuple
+    shipping_prices: MappingProxyType
+
+    def category(self, slug):
+        return self.categories_by_slug.get(slug)
+
+    def product(self, slug):
+        return self.products_by_slug.get(slug)
+
+    def category_products(self, category):
+        return self.products_by_category.get(category.pk, ())
+
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+
+
+def _check_interval():
+    return getattr(settings, 'CATALOG_VERSION_CHECK_INTERVAL', 1.0)
+
+
+def current_version() -> int:
+    from .models import CatalogVersion
+
+    version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:
+        version = CatalogVersion.objects.get_or_create(pk=1)[0].version
+    return version
+
+
+def bump_version():
+    """
+    Mark the catalog as changed for every worker. Called from signals.
+    """
+    from .models import CatalogVersion
+
+    if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        CatalogVersion.objects.get_or_create(pk=1)
+    # This worker needn't wait for the next version check
+    transaction.on_commit(clear_local)
+
+
+def clear_local():
+    global _snapshot, _checked_at
+    with _lock:
+        _snapshot = None
+        _checked_at = 0.0
+
+
+def _load(version) -> CatalogSnapshot:
+    from .models import Category, Product, ShippingMethod
+
+    categories = tuple(Category.objects.all())
+    products = list(
+        Product.objects.select_related('category').prefetch_related('quantity_tiers', 'options', 'services')
+    )
+    # Python order must match the (name, id) keyset used for paging
+    products.sort(key=lambda p: (p.name, p.pk))
+
+    shipping_methods = tuple(ShippingMethod.objects.all())
+    by_slug = {}
+    by_category = defaultdict(list)
+    for product in products:
+        by_slug[product.slug] = ProductPricingBundle.from_product(product, shipping_methods)
+        if product.category_id is not None:
+            by_category[product.category_id].append(product)
+
+    return CatalogSnapshot(
+        version=version,
+        categories=categories,
+        categories_by_slug=MappingProxyType({c.slug: c for c in categories}),
+        products=tuple(products),
+        products_by_slug=MappingProxyType(by_slug),
+        products_by_category=MappingProxyType({k: tuple(v) for k, v in by_category.items()}),
+        shipping_methods=shipping_methods,
+        shipping_prices=MappingProxyType({m.slug: m.price for m in shipping_methods}),
+    )
+
+
+def get_catalog() -> CatalogSnapshot:
+    """
+    Return this worker's catalog snapshot, reloading it if the DB version moved.
+    """
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < _check_interval():
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is not None and now - _checked_at < _check_interval():
+            return snapshot
+        # Read the version before the data: a change committed mid-load
+        # leaves a newer version behind and triggers another reload.
+        version = current_version()
+        if snapshot is None or snapshot.version != version:
+            snapshot = _load(version)
+            _snapshot = snapshot
+        _checked_at = now
+        return snapshot
@@ -0,0 +1,417 @@
+"""
+Catalog feed import.
+
+Reads a product feed (JSON array, JSON Lines or CSV) in chunks and upserts
+products with their quantity tiers, options and services. Each record uses
+the same shape as the seed data::
+
+    {"name": ..., "slug": ..., "category": ..., "description": ..., "image": ...,
+     "tiers": [{"qty": 100, "price": 299}, ...],
+     "options": [{"type": "Finish", "value": "Gloss", "price": 20}, ...],
+     "services": [{"label": "Express Delivery", "price": 99, "required": false}, ...]}
+
+In CSV the tiers/options/services columns hold those lists as JSON.
+
+Products are matched on slug (given, or slugified from the name), so a
+feed can be re-imported as often as needed. A record's tiers/options/services
+are the complete set: missing ones are deleted. Each chunk is diffed against
+the database with a handful of queries, only new or changed rows are
+written (bulk_create with update_conflicts), and the chunk is committed in
+one transaction together with the price-range refresh, search index and
+catalog version bump that the per-row signals would have done.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import Category, OptionalService, Product, ProductOption, QuantityTier
+from . import catalog
+from . import search
+
+IMPORT_CHUNK_SIZE = 500
+
+PRODUCT_FIELDS = ('name', 'description', 'category_id', 'image')
+
+FORMATS = ('json', 'jsonl', 'csv')
+
+# Largest QuantityTier.quantity (a PositiveIntegerField) on every backend
+MAX_QUANTITY = 2147483647
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FeedProduct:
+    line: int
+    slug: str
+    name: str
+    description: str
+    category: str
+    image: str | None
+    tiers: dict       # quantity -> price
+    options: dict     # (type, value) -> price modifier
+    services: dict    # label -> (price, required)
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool = False
+    records: int = 0
+    counts: dict = field(default_factory=lambda: defaultdict(Counter))  # model -> action -> rows
+    changes: list = field(default_factory=list)  # (slug, action, summary)
+    errors: list = field(default_factory=list)   # (line, message)
+
+    def summary(self):
+        return ', '.join(
+            f"{model}: " + ' '.join(f"{n} {action}" for action, n in sorted(actions.items()))
+            for model, actions in self.counts.items()
+        ) or "no changes"
+
+
+# ==========================
+# Feed parsing
+# ==========================
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+def _decimal(value, what, model_field):
+    """
+    ``value`` as a Decimal that fits ``model_field`` (its max_digits and
+    decimal_places), so a bad price rejects the line rather than the chunk.
+    """
+    try:
+        amount = Decimal(str(value)).quantize(Decimal(1).scaleb(-model_field.decimal_places))
+    except (InvalidOperation, TypeError, ValueError):
+        raise CatalogImportError(f"Bad {what}: {value!r}")
+    if amount < 0:
+        raise CatalogImportError(f"Negative {what}: {value!r}")
+    if amount.adjusted() >= model_field.max_digits - model_field.decimal_places:
+        raise CatalogImportError(f"{what.capitalize()} too large: {value!r}")
+    return amount
+
+
+def _text(value, what, model_field):
+    text = str(value)
+    if len(text) > model_field.max_length:
+        raise CatalogImportError(f"{what.capitalize()} longer than {model_field.max_length} characters: {text[:40]!r}...")
+    return text
+
+
+def _list(value, what):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise CatalogImportError(f"{what} is not valid JSON")
+    if not isinstance(value, list):
+        raise CatalogImportError(f"{what} must be a list")
+    return value
+
+
+def parse_record(line, record):
+    """
+    Validate one feed record into a FeedProduct (CatalogImportError if bad).
+    """
+    if not isinstance(record, dict):
+        raise CatalogImportError("Record is not an object")
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise CatalogImportError("Missing name")
+    _text(name, 'name', _field(Product, 'name'))
+    slug = slugify(record.get('slug') or name)[:Product._meta.get_field('slug').max_length].strip('-')
+    if not slug:
+        raise CatalogImportError(f"Cannot make a slug from {name!r}")
+
+    tiers = {}
+    for tier in _list(record.get('tiers'), 'tiers'):
+        try:
+            quantity = int(tier['qty'])
+        except (KeyError, TypeError, ValueError):
+            raise CatalogImportError(f"Bad tier: {tier!r}")
+        if not 0 < quantity <= MAX_QUANTITY:
+            raise CatalogImportError(f"Bad tier quantity: {quantity}")
+        tiers[quantity] = _decimal(tier.get('price'), 'tier price', _field(QuantityTier, 'base_price'))
+
+    options = {}
+    for option in _list(record.get('options'), 'options'):
+        if not isinstance(option, dict) or not option.get('type') or not option.get('value'):
+            raise CatalogImportError(f"Bad option: {option!r}")
+        key = (
+            _text(option['type'], 'option type', _field(ProductOption, 'option_type')),
+            _text(option['value'], 'option value', _field(ProductOption, 'value')),
+        )
+        options[key] = _decimal(option.get('price', 0), 'option price', _field(ProductOption, 'price_modifier'))
+
+    services = {}
+    for service in _list(record.get('services'), 'services'):
+        if not isinstance(service, dict) or not service.get('label'):
+            raise CatalogImportError(f"Bad service: {service!r}")
+        required = service.get('required', False)
+        if isinstance(required, str):
+            required = required.strip().lower() in ('1', 'true', 'yes')
+        label = _text(service['label'], 'service label', _field(OptionalService, 'label'))
+        services[label] = (_decimal(service.get('price', 0), 'service price', _field(OptionalService, 'price')), bool(required))
+
+    return FeedProduct(
+        line=line,
+        slug=slug,
+        name=name,
+        description=str(record.get('description') or ''),
+        category=_text(str(record.get('category') or '').strip(), 'category', _field(Category, 'name')),
+        image=_text(record['image'], 'image', _field(Product, 'image')) if record.get('image') else None,
+        tiers=tiers,
+        options=options,
+        services=services,
+    )
+
+
+def iter_records(fileobj, fmt):
+    """
+    Yield (line, record dict) from a feed. JSON Lines and CSV are streamed;
+    a JSON document (a list, or {"products": [...]}) is loaded whole.
+    """
+    if fmt == 'csv':
+        for line, row in enumerate(csv.DictReader(fileobj), start=2):
+            yield line, {key.strip().lower(): value for key, value in row.items() if key}
+    elif fmt == 'jsonl':
+        for line, text in enumerate(fileobj, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError:
+                    yield line, None
+    else:
+        try:
+            document = json.load(fileobj)
+        except ValueError as e:
+            raise CatalogImportError(f"Not a JSON feed: {e}")
+        if isinstance(document, dict):
+            document = document.get('products')
+        if not isinstance(document, list):
+            raise CatalogImportError("A JSON feed must be a list of products (or {\"products\": [...]})")
+        yield from enumerate(document, start=1)
+
+
+def guess_format(path):
+    lowered = path.lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'json'
+
+
+# ==========================
+# Import
+# ==========================
+
+def _categories(names, report):
+    """
+    Category name -> id, creating missing categories.
+    """
+    names = {name for name in names if name}
+    found = dict(Category.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = Category.assign_unique_slugs(Category(name=name) for name in sorted(names - found.keys()))
+    for category in Category.objects.bulk_create(missing):
+        found[category.name] = category.pk
+        report.counts['categories']['created'] += 1
+    return found
+
+
+def _diff(existing, wanted):
+    """
+    Keys to create, keys whose value changed, keys to delete.
+    """
+    created = [key for key in wanted if key not in existing]
+    changed = [key for key in wanted if key in existing and existing[key] != wanted[key]]
+    removed = [key for key in existing if key not in wanted]
+    return created, changed, removed
+
+
+def _key_filter(product_id, fields, keys):
+    condition = Q()
+    for key in keys:
+        condition |= Q(product_id=product_id, **dict(zip(fields, key if isinstance(key, tuple) else (key,))))
+    return condition
+
+
+def import_chunk(items, report):
+    """
+    Upsert one chunk of FeedProducts (call inside a transaction).
+    """
+    # Later records win over earlier ones for the same slug
+    by_slug = {item.slug: item for item in items}
+    category_ids = _categories((item.category for item in by_slug.values()), report)
+
+    existing = {
+        row['slug']: row
+        for row in Product.objects.filter(slug__in=by_slug).values('id', 'slug', *PRODUCT_FIELDS)
+    }
+
+    upserts = []
+    product_changes = {}
+    for slug, item in by_slug.items():
+        current = existing.get(slug)
+        wanted = {
+            'name': item.name,
+            'description': item.description,
+            'category_id': category_ids.get(item.category),
+            # A feed without images keeps the ones already uploaded
+            'image': item.image if item.image is not None else (current['image'] if current else ''),
+        }
+        if current is None:
+            product_changes[slug] = ['new']
+        else:
+            changed = [name for name in PRODUCT_FIELDS if current[name] != wanted[name]]
+            if not changed:
+                continue
+            product_changes[slug] = changed
+        upserts.append(Product(slug=slug, **wanted))
+
+    if upserts:
+        Product.objects.bulk_create(
+            upserts, update_conflicts=True, unique_fields=['slug'], update_fields=list(PRODUCT_FIELDS),
+        )
+    ids = dict(Product.objects.filter(slug__in=by_slug).values_list('slug', 'id'))
+
+    # Current tiers/options/services of every product in the chunk
+    current_tiers, current_options, current_services = defaultdict(dict), defaultdict(dict), defaultdict(dict)
+    for product_id, quantity, price in QuantityTier.objects.filter(product_id__in=ids.values()).values_list(
+            'product_id', 'quantity', 'base_price'):
+        current_tiers[product_id][quantity] = price
+    for product_id, option_type, value, price in ProductOption.objects.filter(product_id__in=ids.values()).values_list(
+            'product_id', 'option_type', 'value', 'price_modifier'):
+        current_options[product_id][(option_type, value)] = price
+    for product_id, label, price, required in OptionalService.objects.filter(product_id__in=ids.values()).values_list(
+            'product_id', 'label', 'price', 'is_required'):
+        current_services[product_id][label] = (price, required)
+
+    tier_rows, option_rows, service_rows = [], [], []
+    removals = defaultdict(Q)
+    priced, indexed, changed_products = [], [], 0
+    for slug, item in by_slug.items():
+        product_id = ids[slug]
+        summary = []
+        for model, name, current, wanted, fields in (
+            (QuantityTier, 'tiers', current_tiers[product_id], item.tiers, ('quantity',)),
+            (ProductOption, 'options', current_options[product_id], item.options, ('option_type', 'value')),
+            (OptionalService, 'services', current_services[product_id], item.services, ('label',)),
+        ):
+            created, changed, removed = _diff(current, wanted)
+            for action, keys in (('created', created), ('updated', changed), ('deleted', removed)):
+                if keys:
+                    report.counts[name][action] += len(keys)
+            if not (created or changed or removed):
+                continue
+            summary.append(f"{name} +{len(created)} ~{len(changed)} -{len(removed)}")
+            for key in created + changed:
+                if model is QuantityTier:
+                    tier_rows.append(QuantityTier(product_id=product_id, quantity=key, base_price=wanted[key]))
+                elif model is ProductOption:
+                    option_rows.append(ProductOption(
+                        product_id=product_id, option_type=key[0], value=key[1], price_modifier=wanted[key],
+                    ))
+                else:
+                    price, required = wanted[key]
+                    service_rows.append(OptionalService(product_id=product_id, label=key, price=price, is_required=required))
+            if removed:
+                removals[model] |= _key_filter(product_id, fields, removed)
+            if model is QuantityTier:
+                priced.append(product_id)
+
+        fields_changed = product_changes.get(slug)
+        if fields_changed:
+            action = 'created' if fields_changed == ['new'] else 'updated'
+            report.counts['products'][action] += 1
+            if action == 'created':
+                priced.append(product_id)
+            indexed.append(product_id)
+            summary.insert(0, ', '.join(fields_changed))
+        elif summary:
+            action = 'updated'
+            report.counts['products'][action] += 1
+        else:
+            report.counts['products']['unchanged'] += 1
+            continue
+        changed_products += 1
+        report.changes.append((slug, action, '; '.join(summary)))
+
+    if tier_rows:
+        QuantityTier.objects.bulk_create(
+            tier_rows, update_conflicts=True, unique_fields=['product', 'quantity'], update_fields=['base_price'],
+        )
+    if option_rows:
+        ProductOption.objects.bulk_create(
+            option_rows, update_conflicts=True, unique_fields=['product', 'option_type', 'value'],
+            update_fields=['price_modifier'],
+        )
+    if service_rows:
+        OptionalService.objects.bulk_create(
+            service_rows, update_conflicts=True, unique_fields=['product', 'label'], update_fields=['price', 'is_required'],
+        )
+    for model, condition in removals.items():
+        # Queryset deletes still fire the per-row catalog signals; fine for
+        # the few rows a feed drops
+        model.objects.filter(condition).delete()
+
+    if priced:
+        Product.refresh_price_ranges(priced)
+    if indexed:
+        search.index_products(indexed)
+    if changed_products:
+        catalog.bump_version()
+
+
+def import_catalog(records, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Import (line, record) pairs chunk by chunk, one transaction each, and
+    return an ImportReport. With ``dry_run`` every chunk is rolled back.
+    """
+    report = ImportReport(dry_run=dry_run)
+    records = iter(records)
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            return report
+        chunk = []
+        for line, record in batch:
+            report.records += 1
+            try:
+                chunk.append(parse_record(line, record))
+            except CatalogImportError as e:
+                report.errors.append((line, str(e)))
+        if chunk:
+            with transaction.atomic():
+                import_chunk(chunk, report)
+                if dry_run:
+                    transaction.set_rollback(True)
+
+
+REPORT_HEADER = ['Product', 'Action', 'Changes']
+
+
+def write_report_csv(report, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(REPORT_HEADER)
+    for slug, action, summary in report.changes:
+        writer.writerow([slug, action, summary])
+    for line, message in report.errors:
+        writer.writerow([f"line {line}", 'error', message])
+
+
+def import_file(path, fmt=None, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        return import_catalog(iter_records(fh, fmt or guess_format(path)), chunk_size, dry_run)
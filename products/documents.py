@@ -0,0 +1,351 @@
+"""
+Shared PDF document layer for invoices, quotes and statements.
+
+A document is described declaratively - a title plus a list of blocks
+(label/value tables, item tables, totals, notes) - by a template function
+next to its model (products.pdf_utils, products.statements,
+designs.pdf_utils), and turned into PDF bytes by render(). Everything that
+is the same for every document is built once per process and reused:
+
+- paragraph and table styles;
+- the logo, flattened, scaled to print resolution and JPEG-encoded once
+  (Canvas.drawImage() copies JPEG data into the PDF as is, so a document
+  pays nothing to embed it);
+- the banking details and footer.
+
+Streams are written binary rather than ASCII85-encoded: the encoding cost
+more per document than laying it out, and made every file a quarter bigger.
+
+Flowables are pulled from the document's blocks as the pages are laid out
+(see _StreamingDocTemplate), so a statement's rows are read from the
+database while it renders and only a few tables exist at a time.
+
+Only public ReportLab API is used (flowables, SimpleDocTemplate and its
+filterFlowables() hook, drawImage, rl_config), so upgrading ReportLab cannot
+silently break every invoice and quote.
+
+warm_up() loads the fonts and builds all of it up front (the PDF render
+workers call it on start-up).
+"""
+import functools
+import os
+from dataclasses import dataclass, field
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Flowable, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+NAVY = colors.HexColor('#1d3557')
+RED = colors.HexColor('#e63946')
+GREY = colors.HexColor('#555555')
+
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'images', 'bp-logo-1.png')
+LOGO_SIZE = (1.5 * inch, 0.6 * inch)
+# Pixels per inch the logo is embedded at
+LOGO_DPI = 300
+
+# Flowables queued ahead of the one being laid out (keepWithNext looks ahead)
+LOOKAHEAD = 8
+
+rl_config.useA85 = 0
+
+BANKING_DETAILS = [
+    ['Account Name:', 'BizPrint'],
+    ['Bank:', 'Capitec Bank'],
+    ['Account Number:', '2482418611'],
+    ['Branch Code:', '470010'],
+]
+
+FOOTER = """
+<para align=center>
+<font size=8 color="#666666">
+© 2025 BizPrint. A Subsidiary of Ardent SA (Pty) Ltd.<br/>
+Terms of Service | Privacy Policy
+</font>
+</para>
+"""
+
+# ==========================
+# Document description
+# ==========================
+
+@dataclass
+class Fields:
+    """Two-column label/value table; ``style`` is 'info', 'client' or 'banking'."""
+    rows: list
+    style: str = 'info'
+    heading: str = ''
+    space_after: int = 20
+
+
+@dataclass
+class Items:
+    """
+    Line items with a header row (repeated when the table breaks across
+    pages); numbers in ``right_columns`` are right-aligned. ``compact``
+    tightens the rows for long listings.
+    """
+    header: list
+    rows: list
+    col_widths: tuple
+    heading: str = ''
+    right_columns: tuple = ()
+    compact: bool = False
+    space_after: int = 20
+
+
+@dataclass
+class Totals:
+    """Label/amount rows; the last one is the grand total."""
+    rows: list
+    space_after: int = 30
+
+
+@dataclass
+class Note:
+    """Free text (ReportLab paragraph markup); ``style`` names a paragraph style."""
+    text: str
+    style: str = 'normal'
+    space_after: int = 20
+
+
+@dataclass
+class Document:
+    """
+    ``blocks`` may be a generator (e.g. rows streamed from the database);
+    render() pulls from it as the pages are laid out.
+    """
+    title: str
+    blocks: list = field(default_factory=list)
+    footer: bool = True
+
+
+def banking_fields(reference, space_after=20):
+    return Fields(BANKING_DETAILS + [['Reference:', reference]], style='banking', heading='Banking Details', space_after=space_after)
+
+
+# ==========================
+# Per-process caches
+# ==========================
+
+@functools.lru_cache(maxsize=None)
+def paragraph_styles():
+    base = getSampleStyleSheet()
+    normal = base['Normal']
+    return {
+        'normal': normal,
+        'title': ParagraphStyle('DocTitle', parent=base['Heading1'], fontSize=24, textColor=NAVY, spaceAfter=30, alignment=1),
+        'heading': ParagraphStyle('DocHeading', parent=base['Heading2'], fontSize=14, textColor=NAVY, spaceAfter=12),
+        'callout': ParagraphStyle(
+            'DocCallout', parent=normal, fontSize=10, textColor=NAVY, backColor=colors.HexColor('#f0f7ff'),
+            borderPadding=10, borderColor=NAVY, borderWidth=1, borderRadius=4, leftIndent=10,
+        ),
+    }
+
+
+_FIELD_COMMANDS = [
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+]
+_BOXED_COMMANDS = [
+    ('TEXTCOLOR', (0, 0), (0, -1), GREY),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('LEFTPADDING', (0, 0), (-1, -1), 10),
+]
+
+FIELD_STYLES = {
+    'info': TableStyle(_FIELD_COMMANDS + [('TEXTCOLOR', (0, 0), (0, -1), NAVY)]),
+    'client': TableStyle(_FIELD_COMMANDS + _BOXED_COMMANDS + [
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9f9f9')),
+    ]),
+    'banking': TableStyle(_FIELD_COMMANDS + _BOXED_COMMANDS + [
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fff3cd')),
+        ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#ffc107')),
+    ]),
+}
+FIELD_COL_WIDTHS = [1.5 * inch, 4 * inch]
+
+_ITEM_COMMANDS = [
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), NAVY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
+    # Data rows
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING', (0, 0), (-1, -1), 10),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+    # Grid
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#dddddd')),
+    ('BOX', (0, 0), (-1, -1), 1, NAVY),
+]
+
+
+_COMPACT_ITEM_COMMANDS = [
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ('LEFTPADDING', (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def items_style(right_columns=(), compact=False):
+    commands = _ITEM_COMMANDS + (_COMPACT_ITEM_COMMANDS if compact else [])
+    return TableStyle(commands + [('ALIGN', (col, 0), (col, -1), 'RIGHT') for col in right_columns])
+
+
+TOTALS_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -2), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -2), 'Helvetica'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -2), 10),
+    ('FONTSIZE', (0, -1), (-1, -1), 12),
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('TEXTCOLOR', (0, -1), (-1, -1), RED),
+    ('LINEABOVE', (0, -1), (-1, -1), 1, NAVY),
+    ('TOPPADDING', (0, -1), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+TOTALS_COL_WIDTHS = [4 * inch, 1.5 * inch]
+
+
+@functools.lru_cache(maxsize=None)
+def logo_image():
+    """
+    The logo flattened onto white (documents are white), scaled to LOGO_DPI
+    at its printed size and JPEG-encoded, as an ImageReader shared by every
+    document in the process (None if it is missing or unreadable).
+    """
+    if not os.path.exists(LOGO_PATH):
+        return None
+    try:
+        with Image.open(LOGO_PATH) as source:
+            source = source.convert('RGBA')
+            logo = Image.new('RGB', source.size, 'white')
+            logo.paste(source, mask=source.getchannel('A'))
+        width = round(LOGO_SIZE[0] / inch * LOGO_DPI)
+        if width < logo.width:
+            logo = logo.resize((width, round(logo.height * width / logo.width)), Image.LANCZOS)
+        encoded = BytesIO()
+        logo.save(encoded, 'JPEG', quality=95, subsampling=0)
+        reader = ImageReader(BytesIO(encoded.getvalue()))
+        reader.getRGBData()  # drawImage() fingerprints the pixels; decode them now
+        return reader
+    except Exception:
+        return None
+
+
+class Logo(Flowable):
+    def __init__(self, image, width, height):
+        super().__init__()
+        self.image, self.width, self.height = image, width, height
+        self.hAlign = 'CENTER'
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.image, 0, 0, self.width, self.height)
+
+
+def warm_up():
+    for font in ('Helvetica', 'Helvetica-Bold'):
+        pdfmetrics.getFont(font)
+    paragraph_styles()
+    logo_image()
+
+
+# ==========================
+# Rendering
+# ==========================
+
+def _flowables(block, styles):
+    heading = getattr(block, 'heading', '')
+    if heading:
+        yield Paragraph(heading, styles['heading'])
+
+    if isinstance(block, Fields):
+        table = Table(block.rows, colWidths=FIELD_COL_WIDTHS)
+        table.setStyle(FIELD_STYLES[block.style])
+        yield table
+    elif isinstance(block, Items):
+        table = Table([block.header] + list(block.rows), colWidths=list(block.col_widths), repeatRows=1)
+        table.setStyle(items_style(tuple(block.right_columns), block.compact))
+        yield table
+    elif isinstance(block, Totals):
+        table = Table(block.rows, colWidths=TOTALS_COL_WIDTHS)
+        table.setStyle(TOTALS_STYLE)
+        yield table
+    elif isinstance(block, Note):
+        yield Paragraph(block.text, styles[block.style])
+    else:
+        raise TypeError(f"Unknown document block {block!r}")
+
+    if block.space_after:
+        yield Spacer(1, block.space_after)
+
+
+def _document_flowables(document, styles):
+    logo = logo_image()
+    if logo is not None:
+        yield Logo(logo, *LOGO_SIZE)
+        yield Spacer(1, 12)
+    yield Paragraph(document.title, styles['title'])
+    yield Spacer(1, 12)
+    for block in document.blocks:
+        yield from _flowables(block, styles)
+    if document.footer:
+        yield Spacer(1, 30)
+        yield Paragraph(FOOTER, styles['normal'])
+
+
+class _StreamingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate fed from an iterator: filterFlowables(), called before
+    each flowable is laid out, tops the queue up to LOOKAHEAD, so flowables
+    are created as the pages fill and dropped once drawn.
+    """
+    def build_from(self, flowables):
+        self._pending = iter(flowables)
+        self._queue = list(islice(self._pending, LOOKAHEAD))
+        self.build(self._queue)
+
+    def filterFlowables(self, flowables):
+        super().filterFlowables(flowables)
+        # Also called for internal lists (page-start actions); leave those be
+        if flowables is self._queue and len(flowables) < LOOKAHEAD:
+            flowables.extend(islice(self._pending, LOOKAHEAD - len(flowables)))
+
+
+def render(document, compress=False):
+    """
+    PDF bytes for a Document. ``compress`` deflates the page streams, for
+    long documents.
+    """
+    styles = paragraph_styles()
+    buffer = BytesIO()
+    doc = _StreamingDocTemplate(
+        buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18,
+        pageCompression=1 if compress else None,
+    )
+    doc.build_from(_document_flowables(document, styles))
+    return buffer.getvalue()
@@ -0,0 +1,108 @@
+"""
+Filter sidebar facets for the product listing.
+
+All counts (per category, in stock, price buckets) come from one grouped
+query over the products matching the current search, and the folded result
+is cached per normalized search and catalog version so repeat visits skip
+the database.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import models
+
+from . import catalog
+
+# Lower bounds (inclusive) of the starting-price histogram buckets, in Rand
+PRICE_BUCKET_EDGES = [Decimal('0'), Decimal('250'), Decimal('500'), Decimal('1000'), Decimal('2500')]
+
+FACET_CACHE_TIMEOUT = 300
+
+IN_STOCK = models.Q(track_inventory=False) | models.Q(stock_quantity__gt=0)
+
+
+def normalize_search(search_query):
+    return ' '.join(search_query.lower().split())
+
+
+def _cache_key(search_query):
+    digest = hashlib.sha1(normalize_search(search_query).encode()).hexdigest()
+    # Keyed on the catalog version so any catalog edit expires it everywhere
+    return f'products:facets:{catalog.get_catalog().version}:{digest}'
+
+
+def _bucket_expression():
+    whens = [
+        models.When(min_price__gte=edge, then=models.Value(index))
+        for index, edge in reversed(list(enumerate(PRICE_BUCKET_EDGES)))
+    ]
+    return models.Case(*whens, default=models.Value(None), output_field=models.IntegerField())
+
+
+def _bucket_labels():
+    labels = []
+    for index, edge in enumerate(PRICE_BUCKET_EDGES):
+        upper = PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES) else None
+        labels.append({
+            'index': index,
+            'min': edge,
+            'max': upper,
+            # price_max filter is inclusive, buckets are half-open
+            'filter_max': upper - Decimal('0.01') if upper is not None else None,
+            'label': f"R{edge:,.0f} – R{upper:,.0f}" if upper is not None else f"R{edge:,.0f}+",
+        })
+    return labels
+
+
+def compute_facets(products):
+    """
+    Fold one GROUP BY (category, in stock, price bucket) into sidebar facets.
+    """
+    rows = (
+        products.order_by()
+        .annotate(
+            in_stock_flag=models.Case(models.When(IN_STOCK, then=models.Value(1)), default=models.Value(0)),
+            price_bucket=_bucket_expression(),
+        )
+        .values('category_id', 'in_stock_flag', 'price_bucket')
+        .annotate(n=models.Count('id'))
+    )
+
+    categories = {}
+    buckets = {}
+    total = in_stock = 0
+    for row in rows:
+        n = row['n']
+        total += n
+        if row['in_stock_flag']:
+            in_stock += n
+        if row['category_id'] is not None:
+            categories[row['category_id']] = categories.get(row['category_id'], 0) + n
+        if row['price_bucket'] is not None:
+            buckets[row['price_bucket']] = buckets.get(row['price_bucket'], 0) + n
+
+    price_buckets = []
+    for bucket in _bucket_labels():
+        bucket['count'] = buckets.get(bucket['index'], 0)
+        price_buckets.append(bucket)
+
+    return {
+        'total': total,
+        'in_stock': in_stock,
+        'categories': categories,
+        'price_buckets': price_buckets,
+    }
+
+
+def get_facets(products, search_query=''):
+    """
+    Cached facets for the products matching ``search_query``.
+    ``products`` must already be narrowed to that search only.
+    """
+    key = _cache_key(search_query)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(products)
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,155 @@
+"""
+Bulk invoice export: every invoice for a period in one ZIP.
+
+Orders are read with .iterator() and their invoices rendered on a process
+pool (products.pdf_service) through a sliding window of futures, so only
+``window`` PDFs are in flight or in memory at once. Each finished PDF is
+written straight into the ZIP, which can be a file on disk or a
+non-seekable stream feeding a StreamingHttpResponse. Invoices already in
+the PDF cache are read from disk instead of being rendered again.
+
+An index.csv at the end of the archive lists every order, and any invoice
+that failed to render, so nothing goes missing silently.
+"""
+import csv
+import io
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from .models import Order
+from .pdf_utils import generate_order_invoice_pdf, order_invoice_fingerprint
+from . import pdf_cache
+from . import pdf_service
+
+INDEX_HEADER = ['Invoice', 'Date', 'Customer', 'Email', 'Product', 'Total', 'Status', 'Payment Status', 'File', 'Error']
+
+
+def select_orders(date_from=None, date_to=None, statuses=None, payment_statuses=None):
+    """
+    Orders created between two dates (inclusive), optionally by status.
+    """
+    orders = Order.objects.select_related('product').order_by('created_at', 'id')
+    if date_from:
+        orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        orders = orders.filter(created_at__lte=timezone.make_aware(datetime.combine(date_to, time.max)))
+    if statuses:
+        orders = orders.filter(status__in=statuses)
+    if payment_statuses:
+        orders = orders.filter(payment_status__in=payment_statuses)
+    return orders
+
+
+def invoice_filename(order):
+    return f"{order.created_at:%Y-%m-%d}_BizPrint_Invoice_{order.short_ref}.pdf"
+
+
+def iter_invoice_pdfs(orders, executor=None, window=8):
+    """
+    Yield (order, pdf_bytes, error) in order, keeping at most ``window``
+    renders in flight.
+    """
+    pending = deque()
+
+    def resolve(item):
+        order, future, cached = item
+        if cached:
+            with open(cached, 'rb') as fh:
+                return order, fh.read(), ''
+        try:
+            return order, pdf_service.result(future), ''
+        except Exception as e:
+            return order, None, f"{type(e).__name__}: {e}"
+
+    for order in orders:
+        cached = pdf_cache.cached_path('invoices', order.pk, order_invoice_fingerprint(order))
+        if cached:
+            pending.append((order, None, cached))
+            continue
+        try:
+            future = pdf_service.submit(generate_order_invoice_pdf, order, executor=executor)
+        except pdf_service.PdfRenderError as e:
+            # Shared pool saturated: record it rather than abort the whole archive
+            future = Future()
+            future.set_exception(e)
+        pending.append((order, future, None))
+        while len(pending) >= window:
+            yield resolve(pending.popleft())
+    while pending:
+        yield resolve(pending.popleft())
+
+
+def write_invoices_zip(orders, fileobj, executor=None, window=8):
+    """
+    Write the ZIP to ``fileobj`` (seekable or not), yielding the running
+    (written, failed) counts after each invoice.
+    """
+    index = io.StringIO()
+    writer = csv.writer(index)
+    writer.writerow(INDEX_HEADER)
+    written = failed = 0
+
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for order, pdf, error in iter_invoice_pdfs(orders.iterator(chunk_size=500), executor, window):
+            name = ''
+            if pdf is not None:
+                name = invoice_filename(order)
+                archive.writestr(name, pdf)
+                written += 1
+            else:
+                failed += 1
+            writer.writerow([
+                order.short_ref, f"{order.created_at:%Y-%m-%d}", order.full_name, order.email,
+                order.product.name, f"{order.total_price:.2f}", order.get_status_display(),
+                order.get_payment_status_display(), name, error,
+            ])
+            yield written, failed
+        archive.writestr('index.csv', index.getvalue())
+    yield written, failed
+
+
+def export_invoices(orders, path, executor=None, window=8):
+    """
+    Write the ZIP to ``path``. Returns (written, failed).
+    """
+    result = (0, 0)
+    with open(path, 'wb') as fh:
+        for result in write_invoices_zip(orders, fh, executor, window):
+            pass
+    return result
+
+
+class _ZipStream:
+    """Write-only sink whose buffered bytes are drained after each file."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_invoices_zip(orders, executor=None, window=8):
+    """
+    Generator of ZIP bytes for StreamingHttpResponse.
+    """
+    sink = _ZipStream()
+    for _ in write_invoices_zip(orders, sink, executor, window):
+        data = sink.drain()
+        if data:
+            yield data
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,32 @@
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from products import pdf_service
+from products.invoice_export import export_invoices, select_orders
+from products.models import Order
+
+class Command(BaseCommand):
+    help = "Export every invoice for a date range into one ZIP (with an index.csv), rendering in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="First order date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Last order date (YYYY-MM-DD)")
+        parser.add_argument('--status', action='append', choices=Order.Status.values, help="Repeat for several")
+        parser.add_argument('--payment-status', action='append', choices=Order.PaymentStatus.values, help="Repeat for several")
+        parser.add_argument('--output', '-o', required=True, help="ZIP file to write")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Render processes (default: one per CPU)")
+
+    def handle(self, *args, **options):
+        orders = select_orders(options['date_from'], options['date_to'], options['status'], options['payment_status'])
+        workers = max(1, options['workers'])
+        pool = pdf_service.create_pool(workers)
+        try:
+            written, failed = export_invoices(orders, options['output'], executor=pool, window=workers * 4)
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stderr.write(style(f"Wrote {written} invoices to {options['output']} ({failed} failed, see index.csv)."))
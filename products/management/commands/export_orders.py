@@ -0,0 +1,38 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from products.invoice_export import select_orders
+from products.models import Order
+from products.order_export import FORMATS, OrderExportError, write_csv, write_ndjson, write_xlsx
+
+class Command(BaseCommand):
+    help = "Export orders (CSV, NDJSON or XLSX) with options/services flattened into columns, streamed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="First order date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Last order date (YYYY-MM-DD)")
+        parser.add_argument('--status', action='append', choices=Order.Status.values, help="Repeat for several")
+        parser.add_argument('--payment-status', action='append', choices=Order.PaymentStatus.values, help="Repeat for several")
+        parser.add_argument('--output', '-o', help="Output file (CSV/NDJSON default to stdout; required for XLSX)")
+
+    def handle(self, *args, **options):
+        orders = select_orders(options['date_from'], options['date_to'], options['status'], options['payment_status'])
+        output = options['output']
+        try:
+            if options['format'] == 'xlsx':
+                if not output:
+                    raise CommandError("--output is required for XLSX.")
+                write_xlsx(orders, output)
+            else:
+                write = write_csv if options['format'] == 'csv' else write_ndjson
+                if not output:
+                    write(orders, sys.stdout)
+                    return
+                with open(output, 'w', newline='', encoding='utf-8') as fh:
+                    write(orders, fh)
+        except (OrderExportError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['format'].upper()} export to {output}"))
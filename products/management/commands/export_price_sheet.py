@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog import get_catalog
+from products.price_sheets import PriceSheetError, price_sheet_row_count, write_csv, write_xlsx
+
+class Command(BaseCommand):
+    help = "Export full price sheets (every tier x option x service x shipping combination)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="Product slugs (default: every product)")
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', '-o', help="Output file (CSV defaults to stdout; required for XLSX)")
+
+    def handle(self, *args, **options):
+        snapshot = get_catalog()
+        if options['slugs']:
+            bundles = []
+            for slug in options['slugs']:
+                bundle = snapshot.product(slug)
+                if bundle is None:
+                    raise CommandError(f"Unknown product: {slug}")
+                bundles.append(bundle)
+        else:
+            bundles = [snapshot.product(p.slug) for p in snapshot.products]
+
+        try:
+            rows = sum(price_sheet_row_count(bundle) for bundle in bundles)
+            if options['format'] == 'xlsx':
+                if not options['output']:
+                    raise CommandError("--output is required for XLSX.")
+                write_xlsx(bundles, options['output'])
+            elif options['output']:
+                with open(options['output'], 'w', newline='', encoding='utf-8') as fh:
+                    write_csv(bundles, fh)
+            else:
+                write_csv(bundles, sys.stdout)
+                return
+        except PriceSheetError as e:
+            raise CommandError(str(e))
+
+        self.stderr.write(self.style.SUCCESS(f"Wrote {rows} rows for {len(bundles)} products to {options['output']}"))
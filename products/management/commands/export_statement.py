@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from products.statements import generate_customer_statement_pdf
+
+class Command(BaseCommand):
+    help = "Write a customer's account statement PDF."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="First order date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Last order date (YYYY-MM-DD)")
+        parser.add_argument('--output', '-o', required=True, help="PDF file to write")
+
+    def handle(self, *args, **options):
+        try:
+            user_id = User.objects.values_list('pk', flat=True).get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['username']}")
+
+        pdf = generate_customer_statement_pdf(user_id, options['date_from'], options['date_to'])
+        with open(options['output'], 'wb') as fh:
+            fh.write(pdf)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {len(pdf) // 1024} KB to {options['output']}"))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog_import import FORMATS, IMPORT_CHUNK_SIZE, CatalogImportError, import_file, write_report_csv
+
+class Command(BaseCommand):
+    help = "Import a product feed (JSON, JSON Lines or CSV): upsert products, tiers, options and services in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', help="Path to the feed")
+        parser.add_argument('--format', choices=FORMATS, help="Default: guessed from the file extension")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Products per transaction")
+        parser.add_argument('--report', help="Write the diff report (CSV) here instead of stdout")
+        parser.add_argument('--dry-run', action='store_true', help="Diff and report only; change nothing")
+
+    def handle(self, *args, **options):
+        try:
+            report = import_file(options['feed'], options['format'], max(1, options['chunk_size']), options['dry_run'])
+        except (OSError, CatalogImportError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as fh:
+                write_report_csv(report, fh)
+        elif report.changes or report.errors:
+            write_report_csv(report, sys.stdout)
+
+        verb = "Would apply" if options['dry_run'] else "Applied"
+        style = self.style.WARNING if report.errors else self.style.SUCCESS
+        self.stderr.write(style(
+            f"{report.records} records, {len(report.errors)} rejected. {verb}: {report.summary()}."
+        ))
@@ -0,0 +1,39 @@
+import sys
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from products.reconciliation import StatementError, reconcile_file, write_exceptions_csv
+
+class Command(BaseCommand):
+    help = "Match a bank statement (CSV or OFX) against open orders and design quotes and mark exact matches paid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help="Path to the statement export")
+        parser.add_argument('--format', choices=['csv', 'ofx'], help="Default: guessed from the file extension")
+        parser.add_argument('--report', help="Write the exceptions report (CSV) here instead of stdout")
+        parser.add_argument('--tolerance', default='0.00', help="Accepted difference in Rand (default 0.00)")
+        parser.add_argument('--dry-run', action='store_true', help="Match and report only; change nothing")
+
+    def handle(self, *args, **options):
+        try:
+            tolerance = Decimal(options['tolerance'])
+        except InvalidOperation:
+            raise CommandError("--tolerance must be a number.")
+
+        try:
+            result = reconcile_file(options['statement'], options['format'], tolerance, options['dry_run'])
+        except (OSError, StatementError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as fh:
+                write_exceptions_csv(result.exceptions, fh)
+        elif result.exceptions:
+            write_exceptions_csv(result.exceptions, sys.stdout)
+
+        verb = "Would mark" if options['dry_run'] else "Marked"
+        self.stderr.write(self.style.SUCCESS(
+            f"{result.transactions} transactions, {result.credits} credits. "
+            f"{verb} {len(result.matched_orders)} orders and {len(result.matched_designs)} design requests paid; "
+            f"{len(result.exceptions)} exceptions."
+        ))
@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from products import rollups
+
+class Command(BaseCommand):
+    help = "Rebuild the daily order rollups for days whose orders changed (safe to re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="Also rebuild every day from this date (YYYY-MM-DD) to today")
+        parser.add_argument('--all', action='store_true', help="Rebuild every day since the first order (initial backfill)")
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if options['all']:
+            since = rollups.first_order_day()
+
+        rebuilt = rollups.rebuild_since(since) if since else 0
+        rebuilt += rollups.rebuild_dirty()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {rebuilt} days"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import pdf
+from benchmarks.report import compare, format_table, load_json, write_json
+
+SUITES = {'pdf': pdf.run}
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks on synthetic data (rolled back afterwards) and report timings and memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help=f"Suites to run: {', '.join(SUITES)} (default: all)")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per case (default 20)")
+        parser.add_argument('--quick', action='store_true', help="Skip the largest cases")
+        parser.add_argument('--pool-workers', type=int, default=0, help="Also measure render-pool throughput with N workers")
+        parser.add_argument('--output', '-o', help="Write results as JSON here ('-' for stdout)")
+        parser.add_argument('--compare', help="Baseline JSON from an earlier run")
+        parser.add_argument('--max-regression', type=float, help="Fail if any median is this many percent slower than the baseline")
+
+    def handle(self, *args, **options):
+        if options['max_regression'] is not None and not options['compare']:
+            raise CommandError("--max-regression needs --compare.")
+        unknown = set(options['suites']) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suite(s): {', '.join(sorted(unknown))}")
+        baseline = {}
+        if options['compare']:
+            try:
+                baseline = load_json(options['compare'])
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        results = []
+        for name in options['suites'] or SUITES:
+            results += SUITES[name](
+                repeat=max(1, options['repeat']), quick=options['quick'], pool_workers=options['pool_workers'],
+                log=lambda case: self.stderr.write(f"  {case}"),
+            )
+
+        if options['output']:
+            write_json(results, options['output'])
+        if options['output'] != '-':
+            self.stdout.write(format_table(results))
+
+        if baseline:
+            regressions = []
+            self.stderr.write("\nChange in median vs baseline:")
+            for key, before, after, change in compare(results, baseline):
+                self.stderr.write(f"  {key}: {before} -> {after} ms ({change:+.1f}%)")
+                if options['max_regression'] is not None and change > options['max_regression']:
+                    regressions.append(key)
+            if regressions:
+                raise CommandError(f"{len(regressions)} case(s) regressed more than {options['max_regression']}%: {', '.join(regressions)}")
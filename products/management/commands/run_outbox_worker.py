@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from products import outbox
+
+class Command(BaseCommand):
+    help = "Deliver queued email/WhatsApp notifications from the outbox (retries with backoff, dead-letters after max attempts)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain what is due now, then exit")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to sleep when nothing is due")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Outbox worker started.")
+        try:
+            while True:
+                close_old_connections()
+                counts = outbox.process_batch(options['batch_size'])
+                if any(counts.values()):
+                    self.stdout.write(f"sent={counts['sent']} retry={counts['retry']} dead={counts['dead']}")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Outbox worker stopped."))
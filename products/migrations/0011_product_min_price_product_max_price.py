@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 12:08
+
+from django.db import migrations, models
+from django.db.models import Max, Min, OuterRef, Subquery
+
+
+def backfill_price_range(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    QuantityTier = apps.get_model('products', 'QuantityTier')
+    tiers = QuantityTier.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(
+        min_price=Subquery(tiers.annotate(p=Min('base_price')).values('p')),
+        max_price=Subquery(tiers.annotate(p=Max('base_price')).values('p')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_allow_backorder_product_low_stock_threshold_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Highest quantity tier price', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Lowest quantity tier price', max_digits=8, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_price'], name='products_pr_min_pri_3029f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['max_price'], name='products_pr_max_pri_8e3ae3_idx'),
+        ),
+        migrations.RunPython(backfill_price_range, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Full-text search index for the product catalog (see products/search.py)
+
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Product = apps.get_model('products', 'Product')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5("
+        "product_id UNINDEXED, name, description, category, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    rows = Product.objects.values_list('pk', 'name', 'description', 'category__name')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO products_product_fts (product_id, name, description, category) VALUES (%s, %s, %s, %s)",
+            [(pk, name, description, category or '') for pk, name, description, category in rows],
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS products_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_min_price_product_max_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
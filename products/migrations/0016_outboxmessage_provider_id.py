@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='provider_id',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
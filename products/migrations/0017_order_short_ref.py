@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 12:22
+
+import uuid
+
+from django.db import migrations, models
+
+SHORT_REF_LENGTHS = (8, 10, 12, 16, 32)
+CHUNK_SIZE = 2000
+
+
+def backfill_short_refs(apps, schema_editor):
+    """
+    Give existing orders their uuid prefix as short_ref, in pk-ordered chunks.
+    """
+    Order = apps.get_model('products', 'Order')
+    taken = set(Order.objects.exclude(short_ref=None).values_list('short_ref', flat=True))
+    last_pk = 0
+    while True:
+        chunk = list(
+            Order.objects.filter(pk__gt=last_pk, short_ref=None).order_by('pk').only('pk', 'uuid')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for order in chunk:
+            if order.uuid is None:
+                order.uuid = uuid.uuid4()
+            digits = order.uuid.hex.upper()
+            order.short_ref = next(digits[:n] for n in SHORT_REF_LENGTHS if digits[:n] not in taken)
+            taken.add(order.short_ref)
+        Order.objects.bulk_update(chunk, ['uuid', 'short_ref'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_outboxmessage_provider_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='short_ref',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_short_refs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='short_ref',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
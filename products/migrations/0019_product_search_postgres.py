@@ -0,0 +1,43 @@
+# PostgreSQL full-text search index for the product catalog (see products/search.py)
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE TABLE IF NOT EXISTS products_product_search ("
+        "product_id integer PRIMARY KEY REFERENCES products_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS products_product_search_document "
+        "ON products_product_search USING GIN (document)"
+    )
+    schema_editor.execute(
+        "INSERT INTO products_product_search (product_id, document) "
+        "SELECT p.id, "
+        "setweight(to_tsvector(coalesce(p.name, '')), 'A') || "
+        "setweight(to_tsvector(coalesce(c.name, '')), 'B') || "
+        "setweight(to_tsvector(coalesce(p.description, '')), 'C') "
+        "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id "
+        "ON CONFLICT (product_id) DO NOTHING"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS products_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_rollupdirtyday_dailyorderrollup_dailyproductrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,26 @@
+# Key the SQLite full-text index by product id (rowid = product_id), so the
+# catalog query can look a product's rank up directly (see products/search.py)
+
+from django.db import migrations
+
+
+def reindex_by_rowid(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DELETE FROM products_product_fts")
+    schema_editor.execute(
+        "INSERT INTO products_product_fts (rowid, product_id, name, description, category) "
+        "SELECT p.id, p.id, p.name, p.description, coalesce(c.name, '') "
+        "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_product_search_postgres'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_by_rowid, migrations.RunPython.noop),
+    ]
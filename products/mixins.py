@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.utils.text import slugify
 
 class UniqueSlugMixin(models.Model):
@@ -8,25 +9,150 @@ class UniqueSlugMixin(models.Model):
     class Meta:
         abstract = True
 
-    def _generate_unique_slug(self):
+    # Longest "-N" suffix a prefix query leaves room for
+    SLUG_SUFFIX_ROOM = 8
+    # Prefixes per query in assign_unique_slugs
+    SLUG_QUERY_BATCH = 500
+
+    @classmethod
+    def _slug_base(cls, name):
+        maxlen = cls._meta.get_field("slug").max_length or 50
+        return (slugify(name) or "item")[:maxlen], maxlen
+
+    @classmethod
+    def _taken_slugs(cls, prefixes, exclude_pks=()):
         """
-        Create a URL-safe slug from name and ensure uniqueness by adding -2, -3, ...
-        Only called when slug is empty.
+        Existing slugs starting with any of ``prefixes``, one query per
+        SLUG_QUERY_BATCH prefixes.
         """
-        base = slugify(self.name) or "item"
-        maxlen = self._meta.get_field("slug").max_length or 50
-        slug = base[:maxlen]
+        prefixes = sorted(set(prefixes))
+        taken = set()
+        for start in range(0, len(prefixes), cls.SLUG_QUERY_BATCH):
+            condition = Q()
+            for prefix in prefixes[start:start + cls.SLUG_QUERY_BATCH]:
+                condition |= Q(slug__startswith=prefix)
+            taken.update(
+                cls.objects.filter(condition).exclude(pk__in=[pk for pk in exclude_pks if pk is not None])
+                .values_list("slug", flat=True)
+            )
+        return taken
 
-        # If taken, append -2, -3 ... truncating base to keep within maxlen
+    @staticmethod
+    def _free_slug(base, maxlen, taken):
+        """
+        base, or base-2, base-3 ... (base truncated to keep within maxlen):
+        the first not in ``taken``.
+        """
+        slug = base
         counter = 2
-        # Use self.__class__ to query the correct model
-        while self.__class__.objects.filter(slug=slug).exclude(pk=self.pk).exists():
+        while slug in taken:
             suffix = f"-{counter}"
             slug = f"{base[:maxlen - len(suffix)]}{suffix}"
             counter += 1
         return slug
 
+    def _generate_unique_slug(self):
+        """
+        Create a URL-safe slug from name and ensure uniqueness by adding -2, -3, ...
+        Only called when slug is empty. Every slug the candidates could
+        collide with is fetched in one query.
+        """
+        base, maxlen = self._slug_base(self.name)
+        taken = self._taken_slugs([base[:maxlen - self.SLUG_SUFFIX_ROOM]], exclude_pks=[self.pk])
+        return self._free_slug(base, maxlen, taken)
+
+    @classmethod
+    def assign_unique_slugs(cls, instances):
+        """
+        Give every instance without a slug a unique one, avoiding existing
+        rows and each other, with one query for the lot. For bulk_create()
+        and importers, which skip save().
+        """
+        instances = list(instances)
+        pending = [obj for obj in instances if not obj.slug and obj.name]
+        if not pending:
+            return instances
+        bases = [cls._slug_base(obj.name) for obj in pending]
+        taken = cls._taken_slugs(
+            [base[:maxlen - cls.SLUG_SUFFIX_ROOM] for base, maxlen in bases],
+            exclude_pks=[obj.pk for obj in instances],
+        )
+        taken.update(obj.slug for obj in instances if obj.slug)
+        for obj, (base, maxlen) in zip(pending, bases):
+            obj.slug = cls._free_slug(base, maxlen, taken)
+            taken.add(obj.slug)
+        return instances
+
     def save(self, *args, **kwargs):
         if not self.slug and self.name:
             self.slug = self._generate_unique_slug()
         super().save(*args, **kwargs)
+
+
+class FieldTrackerMixin(models.Model):
+    """
+    Remember the values of ``tracked_fields`` as loaded from (or last saved
+    to) the database, so signals can tell what changed without re-reading the
+    row. The snapshot is refreshed after save(), i.e. after post_save
+    handlers have run, so those handlers still see the previous values.
+
+    Fields deferred at load time (.only()/.defer()) are not tracked and
+    report no change.
+    """
+    tracked_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked()
+        return instance
+
+    def _snapshot_tracked(self, fields=None):
+        if not hasattr(self, '_tracked_initial'):
+            self._tracked_initial = {}
+        for name in fields or self.tracked_fields:
+            if name not in self.tracked_fields:
+                continue
+            attname = self._meta.get_field(name).attname
+            if attname in self.__dict__:  # not deferred
+                self._tracked_initial[name] = self.__dict__[attname]
+
+    def _current(self, name):
+        return getattr(self, self._meta.get_field(name).attname)
+
+    def previous(self, name):
+        """
+        Value of ``name`` when the row was loaded/last saved (None if new).
+        """
+        return getattr(self, '_tracked_initial', {}).get(name)
+
+    def has_changed(self, name):
+        """
+        True if ``name`` differs from its loaded value, or the instance has
+        never been saved (including in the post_save of its first save).
+        """
+        if self._state.adding or getattr(self, '_tracked_adding', False):
+            return True
+        initial = getattr(self, '_tracked_initial', {})
+        if name not in initial:
+            return False
+        return initial[name] != self._current(name)
+
+    def changed_fields(self):
+        return {name for name in self.tracked_fields if self.has_changed(name)}
+
+    def save(self, *args, **kwargs):
+        # Django clears _state.adding before post_save; keep it for handlers
+        self._tracked_adding = self._state.adding
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._tracked_adding = False
+        self._snapshot_tracked(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked(kwargs.get('fields'))
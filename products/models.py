@@ -1,11 +1,12 @@
 import uuid
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.urls import reverse
-from django.db.models import Min, Q
-from .mixins import UniqueSlugMixin
+from django.utils import timezone
+from django.db.models import Min, Max, Q, OuterRef, Subquery
+from .mixins import UniqueSlugMixin, FieldTrackerMixin
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # Category
@@ -53,12 +54,21 @@ class Product(UniqueSlugMixin, models.Model):
     track_inventory = models.BooleanField(default=True, help_text="Enable inventory tracking for this product")
     allow_backorder = models.BooleanField(default=False, help_text="Allow orders when out of stock")
 
+    # Denormalized tier price range (kept in sync by products.signals)
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False,
+                                    help_text="Lowest quantity tier price")
+    max_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False,
+                                    help_text="Highest quantity tier price")
+
     class Meta:
         ordering = ['name']  # NEW: consistent listing without changing features
         indexes = [
             models.Index(fields=['slug']),                 # NEW
             models.Index(fields=['category']),             # NEW
             models.Index(fields=['stock_quantity']),       # NEW: for inventory queries
+            models.Index(fields=['min_price']),            # NEW: price filters/sorting
+            models.Index(fields=['max_price']),            # NEW
+            models.Index(fields=['name', 'id']),           # NEW: keyset pagination
         ]
 
     def __str__(self):
@@ -68,10 +78,26 @@ class Product(UniqueSlugMixin, models.Model):
     @property
     def starting_price(self) -> Decimal | None:
         """
-        Lowest tier price (or None if no tiers).
+        Lowest tier price (or None if no tiers). Reads the stored min_price,
+        so listing templates don't issue one aggregate per product.
+        """
+        return self.min_price
+
+    @classmethod
+    def refresh_price_ranges(cls, product_ids=None) -> int:
+        """
+        Recompute min_price/max_price from quantity tiers in a single UPDATE.
+        Pass product_ids to limit the refresh (None = every product).
+        Use after bulk_create/bulk_update/queryset deletes, which skip signals.
         """
-        agg = self.quantity_tiers.aggregate(p=Min('base_price'))
-        return agg['p']
+        tiers = QuantityTier.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        qs = cls.objects.all()
+        if product_ids is not None:
+            qs = qs.filter(pk__in=product_ids)
+        return qs.update(
+            min_price=Subquery(tiers.annotate(p=Min('base_price')).values('p')),
+            max_price=Subquery(tiers.annotate(p=Max('base_price')).values('p')),
+        )
     
     # Inventory Management Properties
     @property
@@ -199,11 +225,27 @@ class ShippingMethod(models.Model):
         return f"{self.name} (R{self.price})"
 
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# Catalog cache version
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped whenever catalog data changes, so every worker
+    can tell its in-memory catalog snapshot is stale (see products.catalog).
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
+
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # Orders
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-class Order(models.Model):
+class Order(FieldTrackerMixin, models.Model):
     class Status(models.TextChoices):  # NEW: safer than raw strings in code, same values
         RECEIVED = "received", "Received"
         IN_PROD = "in_production", "In Production"
@@ -221,7 +263,14 @@ class Order(models.Model):
         EFT = "eft", "EFT"
         ONLINE = "online", "Online"
 
+    tracked_fields = ('status', 'payment_status')  # NEW: see FieldTrackerMixin
+
+    # Leading hex digits of the uuid, lengthened only on collision
+    SHORT_REF_LENGTHS = (8, 10, 12, 16, 32)
+
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, blank=True, null=True, db_index=True)  # db_index NEW
+    # NEW: customer-facing reference (tracking, invoice #, INV banking reference)
+    short_ref = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders', null=True, blank=True)
 
@@ -264,7 +313,54 @@ class Order(models.Model):
         ]
 
     def __str__(self):
-        return f"Order #{str(self.uuid)[:8]} - {self.product.name} - R{self.total_price}"
+        return f"Order #{self.short_ref} - {self.product.name} - R{self.total_price}"
+
+    # NEW: short reference
+    @staticmethod
+    def normalize_reference(ref) -> str:
+        """
+        'INVab12cd34', 'ab12cd34-...' or a full uuid -> 'AB12CD34...'.
+        """
+        ref = (ref or '').strip().upper().replace('-', '').replace(' ', '')
+        if ref.startswith('INV'):
+            ref = ref[3:]
+        return ref
+
+    @classmethod
+    def short_ref_candidates(cls, ref) -> list:
+        """
+        Every short_ref the given reference could stand for, for an indexed
+        ``short_ref__in`` lookup.
+        """
+        ref = cls.normalize_reference(ref)
+        if len(ref) < cls.SHORT_REF_LENGTHS[0] or any(c not in '0123456789ABCDEF' for c in ref):
+            return []
+        return [ref[:n] for n in cls.SHORT_REF_LENGTHS if len(ref) >= n]
+
+    def _generate_short_ref(self) -> str:
+        if self.uuid is None:
+            self.uuid = uuid.uuid4()
+        digits = self.uuid.hex.upper()
+        taken = set(
+            Order.objects.filter(short_ref__in=[digits[:n] for n in self.SHORT_REF_LENGTHS])
+            .exclude(pk=self.pk).values_list('short_ref', flat=True)
+        )
+        return next(digits[:n] for n in self.SHORT_REF_LENGTHS if digits[:n] not in taken)
+
+    def save(self, *args, **kwargs):
+        if self.short_ref:
+            return super().save(*args, **kwargs)
+
+        self.short_ref = self._generate_short_ref()
+        try:
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+        except IntegrityError:
+            # Lost a race for the same prefix: pick the next free length once
+            if not Order.objects.filter(short_ref=self.short_ref).exclude(pk=self.pk).exists():
+                raise
+            self.short_ref = self._generate_short_ref()
+            return super().save(*args, **kwargs)
 
     # NEW: small helpers (no behavior change)
     @property
@@ -274,3 +370,107 @@ class Order(models.Model):
     @property
     def is_cancelable(self) -> bool:
         return self.status == self.Status.RECEIVED
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# Notification outbox
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class OutboxMessage(models.Model):
+    """
+    A notification (email / WhatsApp) written in the same transaction as the
+    order or design change that caused it, and delivered later by
+    ``manage.py run_outbox_worker`` (see products.outbox).
+    """
+    class Channel(models.TextChoices):
+        EMAIL = "email", "Email"
+        WHATSAPP = "whatsapp", "WhatsApp"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        DEAD = "dead", "Dead"  # gave up after max attempts
+
+    channel = models.CharField(max_length=20, choices=Channel.choices)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Not before this time: retry backoff, and the lease while a worker holds it
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    provider_id = models.CharField(max_length=100, blank=True)  # e.g. Twilio message SID
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} #{self.pk} ({self.status})"
+
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# Daily order rollups
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class DailyOrderRollup(models.Model):
+    """
+    Orders placed on one day (current time zone) with one status, payment
+    status and payment method, summed. Rebuilt by ``manage.py rollup_orders``
+    (see products.rollups) so platform analytics read O(days) rows.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    payment_status = models.CharField(max_length=20, choices=Order.PaymentStatus.choices)
+    payment_method = models.CharField(max_length=20, choices=Order.PaymentMethod.choices)
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discounts = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vat = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # included in revenue
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'payment_status', 'payment_method'], name='uq_order_rollup_day_group',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.payment_status}/{self.payment_method}: {self.orders} orders"
+
+
+class DailyProductRollup(models.Model):
+    """
+    Orders placed on one day for one product, summed (see DailyOrderRollup).
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_rollups')
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='uq_product_rollup_day_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.orders} orders"
+
+
+class RollupDirtyDay(models.Model):
+    """
+    A day whose orders changed since its rollups were last built; marked by
+    the Order signals, cleared by ``manage.py rollup_orders``.
+    """
+    day = models.DateField(unique=True)
+
+    def __str__(self):
+        return str(self.day)
@@ -0,0 +1,154 @@
+"""
+Streaming order export (CSV, NDJSON, XLSX) for admin and accounting.
+
+Orders are read with .iterator() and select_related('product', 'user') and
+written out row by row, so an export of every order holds one database
+chunk in memory however long the history. The options/services JSON is
+flattened into one column per option type and per service label offered by
+the exported orders' products (one small query up front, so the header is
+known before the first row); anything an order carries that is no longer in
+the catalog lands in the "other" columns rather than being dropped.
+"""
+import csv
+import json
+from dataclasses import dataclass
+
+from django.utils import timezone
+
+from .models import OptionalService, ProductOption
+from .streaming import Echo, batched
+
+# Rows fetched per database round trip
+EXPORT_CHUNK_SIZE = 2000
+
+BASE_HEADER = [
+    'reference', 'created_at', 'status', 'payment_status', 'payment_method',
+    'username', 'full_name', 'email', 'phone', 'address',
+    'product', 'quantity', 'base_price', 'shipping_price', 'discount_code', 'discount_amount', 'total_price',
+]
+FORMATS = ('csv', 'ndjson', 'xlsx')
+
+
+class OrderExportError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ExportColumns:
+    option_types: tuple
+    service_labels: tuple
+
+    @classmethod
+    def for_orders(cls, orders):
+        """
+        Option types and service labels of the products in ``orders``.
+        """
+        products = orders.order_by().values('product_id')
+        option_types = ProductOption.objects.filter(product__in=products).values_list('option_type', flat=True)
+        service_labels = OptionalService.objects.filter(product__in=products).values_list('label', flat=True)
+        return cls(tuple(sorted(set(option_types))), tuple(sorted(set(service_labels))))
+
+    @property
+    def header(self):
+        return (
+            BASE_HEADER
+            + [f'option: {option_type}' for option_type in self.option_types]
+            + ['other_options']
+            + [f'service: {label}' for label in self.service_labels]
+            + ['other_services']
+        )
+
+    def flatten(self, options, services):
+        options = options if isinstance(options, dict) else {}
+        services = services if isinstance(services, list) else []
+        chosen = set(services)
+        other_options = '; '.join(f"{key}: {value}" for key, value in options.items() if key not in self.option_types)
+        other_services = '; '.join(str(label) for label in services if label not in self.service_labels)
+        return (
+            [options.get(option_type, '') for option_type in self.option_types]
+            + [other_options]
+            + ['yes' if label in chosen else '' for label in self.service_labels]
+            + [other_services]
+        )
+
+
+def iter_rows(orders, columns=None):
+    """
+    Header followed by one flat row per order, streamed.
+    """
+    columns = columns or ExportColumns.for_orders(orders)
+    tz = timezone.get_current_timezone()
+    yield columns.header
+    for order in orders.select_related('product', 'user').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            order.short_ref or '',
+            order.created_at.astimezone(tz).strftime('%Y-%m-%d %H:%M:%S'),
+            order.status,
+            order.payment_status,
+            order.payment_method,
+            order.user.username if order.user else '',
+            order.full_name,
+            order.email,
+            order.phone,
+            order.address,
+            order.product.name,
+            order.quantity,
+            order.base_price,
+            order.shipping_price,
+            order.discount_code or '',
+            order.discount_amount,
+            order.total_price,
+        ] + columns.flatten(order.options, order.services)
+
+
+def iter_records(orders):
+    """
+    One dict per order, keyed by the CSV header.
+    """
+    rows = iter_rows(orders)
+    header = next(rows)
+    for row in rows:
+        yield dict(zip(header, row))
+
+
+def stream_csv(orders, batch=1000):
+    """
+    Generator of CSV text chunks, suitable for StreamingHttpResponse.
+    """
+    writer = csv.writer(Echo())
+    return batched((writer.writerow(row) for row in iter_rows(orders)), batch)
+
+
+def stream_ndjson(orders, batch=1000):
+    """
+    Generator of newline-delimited JSON chunks (decimals as strings).
+    """
+    return batched((json.dumps(record, default=str) + '\n' for record in iter_records(orders)), batch)
+
+
+def write_csv(orders, fileobj):
+    writer = csv.writer(fileobj)
+    for row in iter_rows(orders):
+        writer.writerow(row)
+
+
+def write_ndjson(orders, fileobj):
+    for chunk in stream_ndjson(orders):
+        fileobj.write(chunk)
+
+
+def write_xlsx(orders, path):
+    """
+    Write an .xlsx with openpyxl's write-only mode (rows go straight to disk).
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise OrderExportError("XLSX export needs openpyxl (pip install openpyxl).")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    # Quantities and money keep their types so the sheet can be summed
+    for row in iter_rows(orders):
+        sheet.append(row)
+    workbook.save(path)
@@ -0,0 +1,201 @@
+"""
+Transactional outbox for customer notifications.
+
+Signals never talk to SMTP or Twilio directly: they add OutboxMessage rows,
+which commit (or roll back) together with the order/design change that
+caused them. ``manage.py run_outbox_worker`` drains the table, retrying
+failures with exponential backoff and marking a message dead once it runs
+out of attempts. Each batch reuses one SMTP connection for its emails and
+sends its WhatsApp messages concurrently through products.whatsapp.
+
+Workers claim a message by moving its ``available_at`` forward (a lease)
+with a conditional UPDATE, so several workers can run side by side, and a
+worker that dies mid-send only delays the message until the lease expires.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .whatsapp import get_client as get_whatsapp_client
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def max_attempts():
+    return _setting('OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def lease_seconds():
+    return _setting('OUTBOX_LEASE_SECONDS', 300)
+
+
+def backoff_seconds(attempts):
+    """
+    Delay before the next try: doubling from OUTBOX_BACKOFF_BASE up to
+    OUTBOX_BACKOFF_MAX, with jitter so failed batches don't retry in step.
+    """
+    base = _setting('OUTBOX_BACKOFF_BASE', 30)
+    cap = _setting('OUTBOX_BACKOFF_MAX', 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ==========================
+# Enqueueing
+# ==========================
+
+def email(subject, to, html_body, text_body=''):
+    """
+    Unsaved outbox message for an email; pass it to enqueue().
+    """
+    return OutboxMessage(
+        channel=OutboxMessage.Channel.EMAIL,
+        payload={'subject': subject, 'to': list(to), 'html': html_body, 'text': text_body},
+    )
+
+
+def whatsapp(to_number, body):
+    return OutboxMessage(
+        channel=OutboxMessage.Channel.WHATSAPP,
+        payload={'to': to_number, 'body': body},
+    )
+
+
+def enqueue(*messages):
+    """
+    Save messages in one INSERT. Call inside the transaction that made the
+    change being announced.
+    """
+    messages = [m for m in messages if m is not None]
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+    return messages
+
+
+# ==========================
+# Delivery
+# ==========================
+
+def _send_emails(messages):
+    """
+    Send over one SMTP connection. Returns {pk: (error, provider_id)}.
+    """
+    results = {}
+    try:
+        with get_connection() as connection:
+            for message in messages:
+                payload = message.payload
+                email = EmailMultiAlternatives(
+                    payload['subject'], payload.get('text', ''), settings.DEFAULT_FROM_EMAIL, payload['to'],
+                    connection=connection,
+                )
+                if payload.get('html'):
+                    email.attach_alternative(payload['html'], "text/html")
+                try:
+                    email.send()
+                    results[message.pk] = ('', '')
+                except Exception as e:
+                    results[message.pk] = (f"{type(e).__name__}: {e}", '')
+    except Exception as e:
+        # Couldn't open/close the connection: anything unsent failed with it
+        for message in messages:
+            results.setdefault(message.pk, (f"{type(e).__name__}: {e}", ''))
+    return results
+
+
+def _send_whatsapps(messages):
+    """
+    Send concurrently through the shared, rate-limited WhatsApp client.
+    """
+    try:
+        client = get_whatsapp_client()
+    except Exception as e:
+        return {message.pk: (f"{type(e).__name__}: {e}", '') for message in messages}
+    results = client.send_many((m.pk, m.payload['to'], m.payload['body']) for m in messages)
+    return {result.key: (result.error, result.sid) for result in results}
+
+
+SENDERS = {
+    OutboxMessage.Channel.EMAIL: _send_emails,
+    OutboxMessage.Channel.WHATSAPP: _send_whatsapps,
+}
+
+
+def claim(limit):
+    """
+    Lease up to ``limit`` due messages to this worker.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=lease_seconds())
+    due = (
+        OutboxMessage.objects
+        .filter(status=OutboxMessage.Status.PENDING, available_at__lte=now)
+        .order_by('available_at', 'id')[:limit]
+    )
+    claimed = []
+    for message in due:
+        # Lost the race if another worker moved available_at first
+        won = OutboxMessage.objects.filter(
+            pk=message.pk, status=OutboxMessage.Status.PENDING, available_at=message.available_at
+        ).update(available_at=lease_until, attempts=F('attempts') + 1)
+        if won:
+            message.available_at = lease_until
+            message.attempts += 1
+            claimed.append(message)
+    return claimed
+
+
+def record(message, error='', provider_id=''):
+    """
+    Store the outcome of one delivery attempt. Returns the new status.
+    """
+    if error:
+        message.last_error = error
+        if message.attempts >= max_attempts():
+            message.status = OutboxMessage.Status.DEAD
+        else:
+            message.available_at = timezone.now() + timedelta(seconds=backoff_seconds(message.attempts))
+        message.save(update_fields=['status', 'available_at', 'last_error'])
+        return message.status
+
+    message.status = OutboxMessage.Status.SENT
+    message.sent_at = timezone.now()
+    message.last_error = ''
+    message.provider_id = provider_id
+    message.save(update_fields=['status', 'sent_at', 'last_error', 'provider_id'])
+    return message.status
+
+
+def process_batch(limit=50):
+    """
+    Claim and deliver one batch, grouped by channel so each channel can send
+    its share together. Returns {'sent': n, 'retry': n, 'dead': n}.
+    """
+    by_channel = {}
+    for message in claim(limit):
+        by_channel.setdefault(message.channel, []).append(message)
+
+    counts = {'sent': 0, 'retry': 0, 'dead': 0}
+    for channel, messages in by_channel.items():
+        sender = SENDERS.get(channel)
+        if sender is None:
+            results = {m.pk: (f"No sender for channel {channel!r}", '') for m in messages}
+        else:
+            results = sender(messages)
+        for message in messages:
+            error, provider_id = results.get(message.pk, ("No delivery result", ''))
+            status = record(message, error, provider_id)
+            if status == OutboxMessage.Status.SENT:
+                counts['sent'] += 1
+            elif status == OutboxMessage.Status.DEAD:
+                counts['dead'] += 1
+            else:
+                counts['retry'] += 1
+    return counts
@@ -0,0 +1,183 @@
+"""
+Keyset (cursor) pagination.
+
+Unlike OFFSET paging, each page is fetched with a WHERE clause on the last
+row's sort key, so page 500 costs the same as page 1 when the ordering is
+backed by an index. Cursors are opaque URL-safe strings.
+"""
+import base64
+import bisect
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would make
+    # the seek predicate skip or repeat rows that differ by microseconds.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    ordering: list = field(default_factory=list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _encode_cursor(values, direction):
+    raw = json.dumps({'k': values, 'd': direction}, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, key_count):
+    """
+    Returns (values, direction) or (None, 'n') for a missing/garbled cursor,
+    which simply restarts at the first page.
+    """
+    if not cursor:
+        return None, 'n'
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = data['k'], data['d']
+    except (ValueError, KeyError, TypeError):
+        return None, 'n'
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != key_count:
+        return None, 'n'
+    return values, direction
+
+
+def _output_field(queryset, name):
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    if name == 'pk':
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(name)
+
+
+def _seek_filter(keys, values, forward):
+    """
+    Build (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... honouring each key's direction.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(keys, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=24):
+    """
+    Return one KeysetPage of queryset ordered by ``ordering``.
+
+    ``ordering`` is a list of field or annotation names ('-' for descending)
+    whose last entry must be unique (normally 'id') so that every row has a
+    distinct position. Values must be non-null; coalesce nullable keys in an
+    annotation first.
+    """
+    keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    values, direction = _decode_cursor(cursor, len(keys))
+    forward = direction == 'n'
+
+    if values is not None:
+        try:
+            values = [_output_field(queryset, name).to_python(value) for (name, _), value in zip(keys, values)]
+        except (ValidationError, TypeError, ValueError):
+            values, forward = None, True
+
+    if forward:
+        order_by = ordering
+    else:
+        order_by = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+    qs = queryset.order_by(*order_by)
+    if values is not None:
+        qs = qs.filter(_seek_filter(keys, values, forward))
+
+    rows = list(qs[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    def cursor_for(row, cursor_direction):
+        return _encode_cursor([getattr(row, name) for name, _ in keys], cursor_direction)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if (has_more if forward else values is not None):
+            next_cursor = cursor_for(rows[-1], 'n')
+        if (values is not None if forward else has_more):
+            prev_cursor = cursor_for(rows[0], 'p')
+
+    return KeysetPage(object_list=rows, next_cursor=next_cursor, prev_cursor=prev_cursor, ordering=list(ordering))
+
+
+def paginate_sequence(items, ordering, cursor=None, page_size=24):
+    """
+    Keyset-paginate an in-memory sequence already sorted ascending by
+    ``ordering`` (e.g. a cached catalog list). Cursors are interchangeable
+    with paginate_keyset for the same ordering.
+    """
+    names = list(ordering)
+    values, direction = _decode_cursor(cursor, len(names))
+    if values is not None and items:
+        try:
+            meta = items[0]._meta
+            values = tuple(
+                (meta.pk if name == 'pk' else meta.get_field(name)).to_python(value)
+                for name, value in zip(names, values)
+            )
+        except (ValidationError, TypeError, ValueError):
+            values = None
+
+    def key(item):
+        return tuple(getattr(item, name) for name in names)
+
+    keys = [key(item) for item in items]
+    if values is None:
+        start, end = 0, page_size
+    elif direction == 'n':
+        start = bisect.bisect_right(keys, values)
+        end = start + page_size
+    else:
+        end = bisect.bisect_left(keys, values)
+        start = max(0, end - page_size)
+
+    rows = list(items[start:end])
+    next_cursor = prev_cursor = None
+    if rows:
+        if end < len(items):
+            next_cursor = _encode_cursor(list(key(rows[-1])), 'n')
+        if start > 0:
+            prev_cursor = _encode_cursor(list(key(rows[0])), 'p')
+    return KeysetPage(object_list=rows, next_cursor=next_cursor, prev_cursor=prev_cursor, ordering=names)
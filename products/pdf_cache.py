@@ -0,0 +1,104 @@
+"""
+On-disk cache for generated PDFs (invoices, quotes).
+
+A document is stored under MEDIA_ROOT/pdf_cache/<kind>/<key>-<digest>.pdf,
+where ``digest`` hashes every value that appears on it (its "fingerprint").
+Any change to those values gives a new digest, so a stale file is never
+served; the superseded file for the same object is removed when the new one
+is written. The digest doubles as the HTTP ETag, so a browser that already
+has the current version gets a 304 without the file being read at all.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from .pdf_service import PdfRenderError
+
+# Bump when the layout of any cached document changes
+PDF_CACHE_VERSION = 2
+
+
+def cache_dir(kind):
+    return os.path.join(settings.MEDIA_ROOT, 'pdf_cache', kind)
+
+
+def digest(fingerprint) -> str:
+    payload = json.dumps([PDF_CACHE_VERSION, fingerprint], sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _path(kind, key, digest_):
+    return os.path.join(cache_dir(kind), f"{key}-{digest_}.pdf")
+
+
+def cached_path(kind, key, fingerprint):
+    """
+    Path of the cached PDF for this fingerprint, or None if not rendered yet.
+    """
+    path = _path(kind, key, digest(fingerprint))
+    return path if os.path.exists(path) else None
+
+
+def get_or_render(kind, key, fingerprint, render):
+    """
+    Path of the cached PDF for this fingerprint, rendering it with
+    ``render()`` (which returns bytes) on a miss. Returns (path, digest).
+    """
+    digest_ = digest(fingerprint)
+    path = _path(kind, key, digest_)
+    if os.path.exists(path):
+        return path, digest_
+
+    pdf = render()
+    os.makedirs(cache_dir(kind), exist_ok=True)
+    # Write then rename, so a concurrent reader never sees half a file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir(kind), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(pdf)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    discard(kind, key, keep=path)
+    return path, digest_
+
+
+def discard(kind, key, keep=None):
+    """
+    Delete cached versions of one object's document (all but ``keep``).
+    """
+    for stale in glob.glob(os.path.join(glob.escape(cache_dir(kind)), f"{glob.escape(str(key))}-*.pdf")):
+        if stale != keep:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+
+def pdf_response(request, kind, key, fingerprint, render, filename):
+    """
+    Serve a cached PDF as an attachment with an ETag (304 if unchanged).
+    """
+    etag = f'"{digest(fingerprint)}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            path, _ = get_or_render(kind, key, fingerprint, render)
+        except PdfRenderError as e:
+            response = HttpResponse(str(e), status=503, content_type='text/plain')
+            response['Retry-After'] = '5'
+            return response
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,212 @@
+"""
+Out-of-process PDF rendering.
+
+ReportLab layout is CPU-bound, so rendering it inside a request thread ties
+up that worker (and, with the GIL, its siblings). Views instead hand the
+job to a small ProcessPoolExecutor:
+
+- workers are started once and warmed up (Django set up, ReportLab fonts,
+  document styles and the logo loaded, see products.documents) before
+  their first job;
+- at most PDF_RENDER_WORKERS + PDF_RENDER_QUEUE_SIZE jobs are admitted at
+  a time, further callers wait up to PDF_RENDER_QUEUE_TIMEOUT and then get
+  RenderBusy instead of piling up;
+- each job has a hard time limit (PDF_RENDER_TIMEOUT), enforced inside the
+  worker with an interval timer, so a pathological document cannot wedge a
+  worker forever.
+
+Set PDF_RENDER_WORKERS = 0 to render inline (handy for debugging).
+
+Jobs are ``render(func, *args)`` where ``func`` is a module-level function
+returning bytes; model instances are pickled to the worker, so prefetch
+whatever the document needs first.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class RenderBusy(PdfRenderError):
+    """Too many render jobs queued."""
+
+
+class RenderTimeout(PdfRenderError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_count():
+    return _setting('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def render_timeout():
+    return _setting('PDF_RENDER_TIMEOUT', 30)
+
+
+# ==========================
+# Worker process side
+# ==========================
+
+class _JobTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _JobTimeout()
+
+
+def _warm_worker(settings_module):
+    """
+    Pool initializer: set Django up and pay ReportLab's one-off costs now
+    rather than on the first job.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    # Fonts, styles and the encoded logo, shared by every document this worker renders
+    from products import documents
+    documents.warm_up()
+
+    # Import the templates so the first job doesn't
+    import products.pdf_utils  # noqa: F401
+    import designs.pdf_utils  # noqa: F401
+
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _run_job(func, args, time_limit):
+    signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        return func(*args)
+    except _JobTimeout:
+        raise RenderTimeout(f"Rendering took longer than {time_limit}s")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ==========================
+# Web process side
+# ==========================
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def create_pool(workers):
+    """
+    A new pool of warmed render workers. The shared one is used by views;
+    batch jobs (invoice exports) may create their own.
+    """
+    context = multiprocessing.get_context(_setting('PDF_RENDER_START_METHOD', 'spawn'))
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_warm_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'bizprint.settings'),),
+    )
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = worker_count()
+            _executor = create_pool(workers)
+            _slots = threading.BoundedSemaphore(workers + _setting('PDF_RENDER_QUEUE_SIZE', 16))
+        return _executor, _slots
+
+
+def shutdown():
+    """Stop the pool (it is restarted lazily by the next render)."""
+    global _executor, _slots
+    with _lock:
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def warm_up():
+    """
+    Start every worker now (e.g. from AppConfig.ready or a deploy hook)
+    instead of on the first download.
+    """
+    if worker_count() <= 0:
+        return
+    executor, _ = _pool()
+    futures = [executor.submit(os.getpid) for _ in range(worker_count())]
+    for future in futures:
+        future.result()
+
+
+def submit(func, *args, timeout=None, executor=None):
+    """
+    Queue ``func(*args)`` and return a Future; collect it with result().
+    Without ``executor`` the shared pool is used, subject to its admission
+    limit (RenderBusy). Inline mode returns an already-finished Future.
+    """
+    timeout = timeout or render_timeout()
+    if executor is not None:
+        return executor.submit(_run_job, func, args, timeout)
+
+    if worker_count() <= 0:
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    executor, slots = _pool()
+    if not slots.acquire(timeout=_setting('PDF_RENDER_QUEUE_TIMEOUT', 5)):
+        raise RenderBusy("PDF renderer is busy, please try again shortly.")
+    try:
+        future = executor.submit(_run_job, func, args, timeout)
+    except BrokenProcessPool:
+        slots.release()
+        # A worker died (OOM, segfault): start a fresh pool for the next caller
+        shutdown()
+        raise PdfRenderError("PDF renderer restarted, please try again.")
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the job really finishes, not just until we stop waiting
+    future.add_done_callback(lambda f: slots.release())
+    return future
+
+
+def result(future, timeout=None):
+    """
+    Wait for a submitted job, translating pool failures to PdfRenderError.
+    """
+    timeout = timeout or render_timeout()
+    try:
+        # Small grace period over the in-worker limit for pickling/transfer
+        return future.result(timeout=timeout + 5)
+    except FutureTimeout:
+        raise RenderTimeout(f"Rendering took longer than {timeout}s")
+    except BrokenProcessPool:
+        shutdown()
+        raise PdfRenderError("PDF renderer restarted, please try again.")
+
+
+def render(func, *args, timeout=None):
+    """
+    Run ``func(*args)`` (returning PDF bytes) on the render pool. Raises
+    RenderBusy when the queue is full and RenderTimeout when the job runs
+    past ``timeout`` seconds (default PDF_RENDER_TIMEOUT).
+    """
+    return result(submit(func, *args, timeout=timeout), timeout=timeout)
@@ -0,0 +1,174 @@
+"""
+Full price sheets: every quantity tier x one value per option type x every
+subset of optional services x every shipping method.
+
+Modifier totals are built with NumPy broadcasting over the compiled
+integer-cent tables (products.pricing), then emitted in fixed-size blocks,
+so memory stays bounded however many rows a sheet has. Prices exclude the
+newsletter discount.
+"""
+import csv
+from decimal import Decimal
+
+import numpy as np
+
+from .pricing import VAT_PERCENT
+from .streaming import Echo, batched
+
+HEADER = ['Product', 'Quantity', 'Options', 'Services', 'Shipping', 'Subtotal', 'VAT', 'Total']
+
+# 2**n service subsets per product; refuse to enumerate anything silly
+MAX_SERVICES = 12
+
+DEFAULT_BLOCK_ROWS = 50_000
+
+
+class PriceSheetError(ValueError):
+    pass
+
+
+def _option_axes(pricing):
+    """
+    Sum of modifiers for every combination of one value per option type,
+    via repeated outer (broadcast) addition, plus the label parts per axis.
+    """
+    sums = np.zeros(1, dtype=np.int64)
+    shape = []
+    labels = []
+    for option_type, values in pricing.option_cents.items():
+        cents = np.fromiter(values.values(), dtype=np.int64, count=len(values))
+        sums = (sums[:, None] + cents[None, :]).ravel()
+        shape.append(len(values))
+        labels.append([f"{option_type}: {value}" for value in values])
+    return sums, tuple(shape), labels
+
+
+def _service_axes(pricing):
+    """
+    Sum and label for every subset of services (bit i = service i selected).
+    """
+    names = list(pricing.service_cents)
+    if len(names) > MAX_SERVICES:
+        raise PriceSheetError(f"{len(names)} services would produce 2^{len(names)} subsets per row.")
+    prices = np.fromiter(pricing.service_cents.values(), dtype=np.int64, count=len(names))
+    subsets = np.arange(1 << len(names), dtype=np.int64)
+    masks = (subsets[:, None] >> np.arange(len(names), dtype=np.int64)[None, :]) & 1
+    sums = masks @ prices if names else np.zeros(1, dtype=np.int64)
+    labels = ['; '.join(name for bit, name in zip(mask, names) if bit) for mask in masks.tolist()]
+    return sums, labels
+
+
+def check_sheet(bundles):
+    """
+    Raise PriceSheetError if any bundle's sheet can't be enumerated, so
+    callers fail before writing (or streaming) the first row.
+    """
+    for bundle in bundles:
+        services = len(bundle.pricing.service_cents)
+        if services > MAX_SERVICES:
+            raise PriceSheetError(
+                f"{bundle.product.name}: {services} services would produce 2^{services} subsets per row."
+            )
+
+
+def _money(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def iter_price_sheet_rows(bundle, shipping_names=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Yield one list per sheet row for a ProductPricingBundle (no header).
+    """
+    pricing = bundle.pricing
+    product_name = bundle.product.name
+    option_sums, option_shape, option_labels = _option_axes(pricing)
+    service_sums, service_labels = _service_axes(pricing)
+
+    shipping_slugs = list(pricing.shipping_cents) or [None]
+    shipping = np.array([pricing.shipping_cents.get(slug, 0) for slug in shipping_slugs], dtype=np.int64)
+    shipping_names = shipping_names or {}
+    shipping_labels = [shipping_names.get(slug, slug or '') for slug in shipping_slugs]
+
+    per_option = len(service_sums) * len(shipping)
+    step = max(1, block_rows // per_option)
+
+    for quantity, base in pricing.tier_cents.items():
+        for start in range(0, len(option_sums), step):
+            stop = min(start + step, len(option_sums))
+            # (options, services, shipping) grid of subtotals for this block
+            subtotal = (
+                base
+                + option_sums[start:stop, None, None]
+                + service_sums[None, :, None]
+                + shipping[None, None, :]
+            )
+            vat = (subtotal * VAT_PERCENT + 50) // 100
+            total = subtotal + vat
+
+            option_index = np.unravel_index(np.arange(start, stop), option_shape) if option_shape else ()
+            option_text = [
+                '; '.join(option_labels[axis][option_index[axis][i]] for axis in range(len(option_shape)))
+                for i in range(stop - start)
+            ]
+            for i, (sub_row, vat_row, total_row) in enumerate(zip(subtotal.tolist(), vat.tolist(), total.tolist())):
+                for s, (sub_cells, vat_cells, total_cells) in enumerate(zip(sub_row, vat_row, total_row)):
+                    for h in range(len(shipping_labels)):
+                        yield [
+                            product_name, quantity, option_text[i], service_labels[s], shipping_labels[h],
+                            _money(sub_cells[h]), _money(vat_cells[h]), _money(total_cells[h]),
+                        ]
+
+
+def price_sheet_row_count(bundle) -> int:
+    pricing = bundle.pricing
+    count = len(pricing.tier_cents) * (1 << len(pricing.service_cents)) * max(1, len(pricing.shipping_cents))
+    for values in pricing.option_cents.values():
+        count *= len(values)
+    return count
+
+
+def iter_sheet(bundles, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Header followed by the rows for each bundle in turn.
+    """
+    yield HEADER
+    for bundle in bundles:
+        names = {m.slug: m.name for m in bundle.shipping_methods}
+        yield from iter_price_sheet_rows(bundle, names, block_rows=block_rows)
+
+
+def stream_csv(bundles, batch=1000):
+    """
+    Generator of CSV text chunks, suitable for StreamingHttpResponse.
+    Raises PriceSheetError here, before the response starts.
+    """
+    check_sheet(bundles)
+    writer = csv.writer(Echo())
+    return batched((writer.writerow(row) for row in iter_sheet(bundles)), batch)
+
+
+def write_csv(bundles, fileobj):
+    check_sheet(bundles)
+    writer = csv.writer(fileobj)
+    for row in iter_sheet(bundles):
+        writer.writerow(row)
+
+
+def write_xlsx(bundles, path):
+    """
+    Write an .xlsx with openpyxl's write-only mode (rows go straight to disk).
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise PriceSheetError("XLSX export needs openpyxl (pip install openpyxl).")
+    check_sheet(bundles)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Price Sheet')
+    rows = iter_sheet(bundles)
+    sheet.append(next(rows))
+    for row in rows:
+        # Money as numbers so the sheet can be summed/filtered in Excel
+        sheet.append(row[:5] + [Decimal(value) for value in row[5:]])
+    workbook.save(path)
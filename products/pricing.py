@@ -0,0 +1,179 @@
+"""
+Pricing engine for print orders.
+
+A product's tiers, option modifiers, services and shipping prices are
+compiled once into plain integer-cent lookup tables (CompiledPricing), so a
+quote is a handful of dict lookups and integer arithmetic with no queries.
+The checkout in product_detail and the batch quote API both price through
+here, so they always agree.
+
+Rules: subtotal = tier + options + services + shipping - discount, where the
+newsletter discount is 10% of everything before it; VAT is 15% of the
+subtotal. Percentages round half up to the cent.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from types import MappingProxyType
+
+VAT_PERCENT = 15
+NEWSLETTER_DISCOUNT_PERCENT = 10
+
+CENT = Decimal('0.01')
+
+
+class PricingError(ValueError):
+    """Raised when a configuration cannot be priced (unknown tier, option...)."""
+
+
+def to_cents(amount) -> int:
+    return int(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents: int) -> Decimal:
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def percent_of(cents: int, percent: int) -> int:
+    """Integer percentage, rounded half up."""
+    return (cents * percent + 50) // 100
+
+
+@dataclass(frozen=True)
+class Quote:
+    quantity: int
+    options: dict
+    services: list
+    shipping_method: str | None
+    base_cents: int
+    modifiers_cents: int
+    shipping_cents: int
+    discount_cents: int
+
+    @property
+    def subtotal_cents(self) -> int:
+        return self.base_cents + self.modifiers_cents + self.shipping_cents - self.discount_cents
+
+    @property
+    def vat_cents(self) -> int:
+        return percent_of(self.subtotal_cents, VAT_PERCENT)
+
+    @property
+    def total_cents(self) -> int:
+        return self.subtotal_cents + self.vat_cents
+
+    # Decimal views for models/templates
+    @property
+    def base_price(self) -> Decimal:
+        return from_cents(self.base_cents)
+
+    @property
+    def modifiers(self) -> Decimal:
+        return from_cents(self.modifiers_cents)
+
+    @property
+    def shipping_price(self) -> Decimal:
+        return from_cents(self.shipping_cents)
+
+    @property
+    def discount_amount(self) -> Decimal:
+        return from_cents(self.discount_cents)
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def vat(self) -> Decimal:
+        return from_cents(self.vat_cents)
+
+    @property
+    def total(self) -> Decimal:
+        return from_cents(self.total_cents)
+
+    def as_dict(self) -> dict:
+        return {
+            'quantity': self.quantity,
+            'options': self.options,
+            'services': self.services,
+            'shipping_method': self.shipping_method,
+            'base_price': str(self.base_price),
+            'modifiers': str(self.modifiers),
+            'shipping_price': str(self.shipping_price),
+            'discount_amount': str(self.discount_amount),
+            'subtotal': str(self.subtotal),
+            'vat': str(self.vat),
+            'total': str(self.total),
+        }
+
+
+@dataclass(frozen=True)
+class CompiledPricing:
+    product_id: int
+    tier_cents: MappingProxyType
+    option_cents: MappingProxyType
+    service_cents: MappingProxyType
+    shipping_cents: MappingProxyType
+
+    @classmethod
+    def compile(cls, bundle):
+        """
+        Compile a ProductPricingBundle (see products.catalog).
+        """
+        option_cents = {}
+        for option_type, options in bundle.grouped_options.items():
+            option_cents[option_type] = MappingProxyType({o.value: to_cents(o.price_modifier) for o in options})
+        return cls(
+            product_id=bundle.product.pk,
+            tier_cents=MappingProxyType({t.quantity: to_cents(t.base_price) for t in bundle.tiers}),
+            option_cents=MappingProxyType(option_cents),
+            service_cents=MappingProxyType({s.label: to_cents(s.price) for s in bundle.services}),
+            shipping_cents=MappingProxyType({slug: to_cents(price) for slug, price in bundle.shipping_prices.items()}),
+        )
+
+    @property
+    def option_types(self):
+        return tuple(self.option_cents)
+
+    def quote(self, quantity, options=None, services=(), shipping_method=None, discount=False) -> Quote:
+        """
+        Price one configuration. ``options`` maps option type to value,
+        ``services`` lists service labels, ``discount`` applies the
+        newsletter discount.
+        """
+        try:
+            base = self.tier_cents[quantity]
+        except (KeyError, TypeError):
+            raise PricingError(f"No pricing tier for quantity {quantity!r}.")
+
+        modifiers = 0
+        options = dict(options or {})
+        for option_type, value in options.items():
+            values = self.option_cents.get(option_type)
+            if values is None or value not in values:
+                raise PricingError(f"Unknown option {option_type}: {value}.")
+            modifiers += values[value]
+
+        services = list(dict.fromkeys(services))
+        for label in services:
+            if label not in self.service_cents:
+                raise PricingError(f"Unknown service {label}.")
+            modifiers += self.service_cents[label]
+
+        shipping = 0
+        if shipping_method:
+            if shipping_method not in self.shipping_cents:
+                raise PricingError(f"Unknown shipping method {shipping_method}.")
+            shipping = self.shipping_cents[shipping_method]
+
+        discount_cents = percent_of(base + modifiers + shipping, NEWSLETTER_DISCOUNT_PERCENT) if discount else 0
+
+        return Quote(
+            quantity=quantity,
+            options=options,
+            services=services,
+            shipping_method=shipping_method or None,
+            base_cents=base,
+            modifiers_cents=modifiers,
+            shipping_cents=shipping,
+            discount_cents=discount_cents,
+        )
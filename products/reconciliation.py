@@ -0,0 +1,389 @@
+"""
+Bank statement reconciliation.
+
+Streams a CSV or OFX statement export, picks out incoming EFT payments and
+matches them to open orders (reference ``INV<short_ref>``, or the bare
+short_ref as shown on the order confirmation, when it is exactly an open
+order's) and pending design requests (reference ``Quote <id>``, as printed
+on the quote PDF).
+
+Open orders and design requests are loaded once per run into dicts keyed by
+reference, so each statement line is a couple of dict lookups however long
+the statement is. Exact matches are marked paid in bulk, in one
+transaction, and their payment notifications are queued in the outbox;
+everything else (no/unknown reference, wrong amount, paid twice) goes to
+the exceptions report for a human to look at.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Order
+from .pricing import to_cents, from_cents
+from . import outbox
+from . import rollups
+
+ORDER_REF_RE = re.compile(r'INV[\s\-#:]*([0-9A-F]{8,32})', re.IGNORECASE)
+BARE_REF_RE = re.compile(r'\b[0-9A-F]{8,32}\b', re.IGNORECASE)
+DESIGN_REF_RE = re.compile(r'QUOTE[\s\-#:]*(\d+)', re.IGNORECASE)
+THOUSANDS_RE = re.compile(r'-?\d{1,3},\d{3}')
+
+CSV_DATE_COLUMNS = ('date', 'transaction date', 'posting date', 'value date')
+CSV_DESCRIPTION_COLUMNS = ('description', 'reference', 'narrative', 'details', 'memo', 'payment reference')
+CSV_AMOUNT_COLUMNS = ('amount', 'transaction amount')
+CSV_CREDIT_COLUMNS = ('credit', 'credit amount', 'money in', 'deposit')
+
+UPDATE_CHUNK_SIZE = 500
+
+
+class StatementError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Transaction:
+    line: int
+    date: str
+    amount: Decimal
+    description: str
+    fit_id: str = ''
+
+
+@dataclass(frozen=True)
+class ReconciliationException:
+    transaction: Transaction
+    reason: str
+    reference: str = ''
+    expected: Decimal | None = None
+    suggestion: str = ''
+
+
+@dataclass
+class ReconciliationResult:
+    transactions: int = 0
+    credits: int = 0
+    matched_orders: list = field(default_factory=list)   # order pks
+    matched_designs: list = field(default_factory=list)  # design request pks
+    exceptions: list = field(default_factory=list)
+
+
+# ==========================
+# Statement parsing
+# ==========================
+
+def parse_amount(value) -> Decimal | None:
+    value = (value or '').strip().replace('R', '').replace(' ', '').replace('\u00a0', '')
+    if not value:
+        return None
+    negative = value.startswith('(') and value.endswith(')')
+    value = value.strip('()')
+    if ',' in value and '.' in value:
+        # Whichever comes last is the decimal point: 1,500.00 / 1.500,00
+        if value.rfind(',') > value.rfind('.'):
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    elif value.count(',') > 1 or THOUSANDS_RE.fullmatch(value):
+        # 1,500 / 1,500,000 are thousands, not R1.50
+        value = value.replace(',', '')
+    elif ',' in value:
+        value = value.replace(',', '.')
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def _column(fieldnames, candidates):
+    lookup = {name.strip().lower(): name for name in fieldnames if name}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def iter_csv_transactions(fileobj):
+    """
+    Yield Transactions from a CSV export with a header row. Recognises a
+    signed Amount column or a separate Credit column.
+    """
+    reader = csv.DictReader(fileobj)
+    if not reader.fieldnames:
+        return
+    date_col = _column(reader.fieldnames, CSV_DATE_COLUMNS)
+    description_cols = [
+        reader.fieldnames[i] for i, name in enumerate(reader.fieldnames)
+        if name and name.strip().lower() in CSV_DESCRIPTION_COLUMNS
+    ]
+    amount_col = _column(reader.fieldnames, CSV_AMOUNT_COLUMNS)
+    credit_col = _column(reader.fieldnames, CSV_CREDIT_COLUMNS)
+    if not description_cols or not (amount_col or credit_col):
+        raise StatementError(
+            f"Unrecognised CSV header {reader.fieldnames}: need a description/reference column and an amount or credit column."
+        )
+
+    for row in reader:
+        amount = parse_amount(row.get(credit_col)) if credit_col else None
+        if amount is None and amount_col:
+            amount = parse_amount(row.get(amount_col))
+        if amount is None:
+            continue
+        yield Transaction(
+            line=reader.line_num,
+            date=(row.get(date_col) or '').strip() if date_col else '',
+            amount=amount,
+            description=' '.join((row.get(col) or '').strip() for col in description_cols).strip(),
+        )
+
+
+OFX_TAG_RE = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_transactions(fileobj):
+    """
+    Yield Transactions from an OFX file (SGML v1 or XML v2), line by line.
+    """
+    current = None
+    for line_number, line in enumerate(fileobj, start=1):
+        for closing, tag, value in OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current = {'line': line_number}
+                elif current is not None:
+                    transaction_ = _ofx_transaction(current)
+                    current = None
+                    if transaction_ is not None:
+                        yield transaction_
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def _ofx_transaction(values):
+    amount = parse_amount(values.get('TRNAMT'))
+    if amount is None:
+        return None
+    posted = values.get('DTPOSTED', '')
+    try:
+        date = datetime.strptime(posted[:8], '%Y%m%d').date().isoformat()
+    except ValueError:
+        date = posted
+    return Transaction(
+        line=values['line'],
+        date=date,
+        amount=amount,
+        description=' '.join(filter(None, [values.get('NAME', ''), values.get('MEMO', '')])),
+        fit_id=values.get('FITID', ''),
+    )
+
+
+def iter_transactions(fileobj, fmt=None, name=''):
+    """
+    Stream transactions from a text file object; ``fmt`` is 'csv' or 'ofx'
+    (guessed from ``name`` when omitted).
+    """
+    if fmt is None:
+        fmt = 'ofx' if name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+    if fmt == 'ofx':
+        return iter_ofx_transactions(fileobj)
+    if fmt == 'csv':
+        return iter_csv_transactions(fileobj)
+    raise StatementError(f"Unknown statement format {fmt!r}")
+
+
+# ==========================
+# Open-item index
+# ==========================
+
+class OpenItems:
+    """
+    Hash indexes of everything awaiting payment, built once per run.
+    """
+    def __init__(self):
+        from designs.models import DesignRequest
+
+        # short_ref -> (pk, amount due in cents)
+        self.orders = {
+            short_ref: (pk, to_cents(total))
+            for pk, short_ref, total in (
+                Order.objects.filter(payment_status=Order.PaymentStatus.PENDING)
+                .exclude(status__in=[Order.Status.CANCELLED, Order.Status.REFUNDED])
+                .exclude(short_ref=None)
+                .values_list('pk', 'short_ref', 'total_price')
+                .iterator(chunk_size=2000)
+            )
+        }
+        # design request id -> amount due in cents (incl. rush fee and VAT)
+        self.designs = {
+            design.pk: to_cents(design.get_total_with_vat())
+            for design in DesignRequest.objects.filter(status='pending').prefetch_related('packages')
+        }
+        # amount in cents -> references, to suggest a match for unreferenced payments
+        self.by_amount = defaultdict(list)
+        for short_ref, (pk, cents) in self.orders.items():
+            self.by_amount[cents].append(f"INV{short_ref}")
+        for pk, cents in self.designs.items():
+            self.by_amount[cents].append(f"Quote {pk}")
+
+    def find_order(self, reference):
+        # Longest first, like track_order_result: a full reference must not match
+        # another order that happens to own its 8-character prefix
+        for candidate in sorted(Order.short_ref_candidates(reference), key=len, reverse=True):
+            if candidate in self.orders:
+                return candidate
+        return None
+
+    def find_bare_order(self, text):
+        # Only an exact open short_ref: a bare hex token could be anything
+        # (account numbers, dates), so no prefix matching here
+        for token in BARE_REF_RE.findall(text):
+            if token.upper() in self.orders:
+                return token.upper()
+        return None
+
+    def suggestion(self, cents):
+        refs = self.by_amount.get(cents, [])
+        return refs[0] if len(refs) == 1 else ''
+
+
+# ==========================
+# Matching
+# ==========================
+
+def reconcile(transactions, tolerance=Decimal('0.00'), dry_run=False):
+    """
+    Match a stream of Transactions and (unless ``dry_run``) mark exact
+    matches paid. Returns a ReconciliationResult.
+    """
+    result = ReconciliationResult()
+    items = OpenItems()
+    tolerance_cents = to_cents(tolerance)
+    paid_orders = {}   # short_ref -> Transaction that paid it
+    paid_designs = {}  # pk -> Transaction
+
+    for txn in transactions:
+        result.transactions += 1
+        if txn.amount <= 0:
+            continue
+        result.credits += 1
+        cents = to_cents(txn.amount)
+
+        def exception(reason, reference='', expected_cents=None):
+            result.exceptions.append(ReconciliationException(
+                transaction=txn,
+                reason=reason,
+                reference=reference,
+                expected=from_cents(expected_cents) if expected_cents is not None else None,
+                suggestion=items.suggestion(cents) if not reference else '',
+            ))
+
+        order_match = ORDER_REF_RE.search(txn.description)
+        design_match = DESIGN_REF_RE.search(txn.description)
+
+        order_ref = order_match.group(1) if order_match else None
+        if order_ref is None and not design_match:
+            order_ref = items.find_bare_order(txn.description)
+
+        if order_ref:
+            reference = f"INV{order_ref.upper()}"
+            short_ref = items.find_order(order_ref)
+            if short_ref is None:
+                exception("No open order for reference", reference)
+            elif short_ref in paid_orders:
+                exception(f"Order already matched on line {paid_orders[short_ref].line}", reference)
+            else:
+                pk, due = items.orders[short_ref]
+                if abs(cents - due) > tolerance_cents:
+                    exception("Underpaid" if cents < due else "Overpaid", reference, due)
+                else:
+                    paid_orders[short_ref] = txn
+                    result.matched_orders.append(pk)
+        elif design_match:
+            reference = f"Quote {design_match.group(1)}"
+            pk = int(design_match.group(1))
+            if pk not in items.designs:
+                exception("No pending design request for reference", reference)
+            elif pk in paid_designs:
+                exception(f"Design request already matched on line {paid_designs[pk].line}", reference)
+            else:
+                due = items.designs[pk]
+                if abs(cents - due) > tolerance_cents:
+                    exception("Underpaid" if cents < due else "Overpaid", reference, due)
+                else:
+                    paid_designs[pk] = txn
+                    result.matched_designs.append(pk)
+        else:
+            exception("No payment reference")
+
+    if not dry_run:
+        apply_matches(result.matched_orders, result.matched_designs)
+    return result
+
+
+def _chunks(items, size=UPDATE_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def apply_matches(order_ids, design_ids):
+    """
+    Mark matched orders/design requests paid in bulk and queue the same
+    notifications their post_save signals would have sent.
+    """
+    from accounts import analytics_cache
+    from designs.models import DesignRequest
+    from designs.signals import status_change_notifications
+    from .signals import order_notifications
+
+    with transaction.atomic():
+        queued = []
+        for chunk in _chunks(order_ids):
+            orders = list(
+                Order.objects.select_related('product')
+                .filter(pk__in=chunk, payment_status=Order.PaymentStatus.PENDING)
+            )
+            Order.objects.filter(pk__in=[o.pk for o in orders]).update(payment_status=Order.PaymentStatus.PAID)
+            rollups.mark_dirty(o.created_at for o in orders)
+            analytics_cache.invalidate_on_commit(o.user_id for o in orders)
+            for order in orders:
+                order.payment_status = Order.PaymentStatus.PAID
+                queued.extend(order_notifications(order))
+
+        for chunk in _chunks(design_ids):
+            designs = list(
+                DesignRequest.objects.select_related('user').prefetch_related('packages')
+                .filter(pk__in=chunk, status='pending')
+            )
+            DesignRequest.objects.filter(pk__in=[d.pk for d in designs]).update(status='paid')
+            analytics_cache.invalidate_on_commit(d.user_id for d in designs)
+            for design in designs:
+                design.status = 'paid'
+                queued.extend(status_change_notifications(design))
+
+        outbox.enqueue(*queued)
+
+
+REPORT_HEADER = ['Line', 'Date', 'Amount', 'Description', 'Reason', 'Reference', 'Expected', 'Suggested match']
+
+
+def write_exceptions_csv(exceptions, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(REPORT_HEADER)
+    for item in exceptions:
+        txn = item.transaction
+        writer.writerow([
+            txn.line, txn.date, f"{txn.amount:.2f}", txn.description, item.reason, item.reference,
+            f"{item.expected:.2f}" if item.expected is not None else '', item.suggestion,
+        ])
+
+
+def reconcile_file(path, fmt=None, tolerance=Decimal('0.00'), dry_run=False):
+    with io.open(path, newline='', encoding='utf-8-sig', errors='replace') as fh:
+        return reconcile(iter_transactions(fh, fmt, name=path), tolerance=tolerance, dry_run=dry_run)
@@ -0,0 +1,139 @@
+"""
+Daily order rollups.
+
+DailyOrderRollup and DailyProductRollup hold one row per day and group
+(status / payment status / payment method, or product), so platform
+analytics sum a few rows per day instead of scanning every order.
+
+Order saves and deletes mark the order's day dirty (RollupDirtyDay, one
+INSERT OR IGNORE); ``manage.py rollup_orders`` then rebuilds only those days,
+or every day from ``--since``. A day is rebuilt by replacing all of its
+rows from one grouped query, so running it again changes nothing. Bulk
+queryset updates bypass the signals and must call mark_dirty() themselves
+(or be followed by ``rollup_orders --since``).
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyOrderRollup, DailyProductRollup, Order, RollupDirtyDay
+
+# Prices include VAT at this rate
+VAT_RATE = Decimal('0.15')
+# Most days rebuilt in one query / transaction
+ROLLUP_BATCH_DAYS = 31
+
+CENT = Decimal('0.01')
+
+
+def order_day(created_at):
+    """The rollup day of an order placed at ``created_at``."""
+    return timezone.localdate(created_at)
+
+
+def mark_dirty(created_ats):
+    """
+    Queue the days of orders placed at ``created_ats`` for rebuilding.
+    """
+    days = {order_day(created_at) for created_at in created_ats if created_at}
+    RollupDirtyDay.objects.bulk_create([RollupDirtyDay(day=day) for day in days], ignore_conflicts=True)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _batches(days):
+    """
+    Sorted days split into runs of consecutive days, at most
+    ROLLUP_BATCH_DAYS long, so each is one indexed range query.
+    """
+    batch = []
+    for day in sorted(set(days)):
+        if batch and (day - batch[-1] != timedelta(days=1) or len(batch) == ROLLUP_BATCH_DAYS):
+            yield batch
+            batch = []
+        batch.append(day)
+    if batch:
+        yield batch
+
+
+def _vat(revenue):
+    return (revenue * VAT_RATE / (1 + VAT_RATE)).quantize(CENT)
+
+
+def _rebuild_batch(days):
+    # Clear the markers before reading the orders: a change committed after
+    # this point marks its day again (the marker is gone, so its INSERT is
+    # not ignored) and the day is rebuilt on the next run
+    RollupDirtyDay.objects.filter(day__in=days).delete()
+
+    orders = Order.objects.filter(
+        created_at__gte=_start_of(days[0]), created_at__lt=_start_of(days[-1] + timedelta(days=1)),
+    ).annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+
+    order_rows = [
+        DailyOrderRollup(vat=_vat(row['revenue']), **row)
+        for row in orders.values('day', 'status', 'payment_status', 'payment_method').annotate(
+            orders=Count('id'),
+            revenue=Sum('total_price'),
+            discounts=Sum('discount_amount'),
+            shipping=Sum('shipping_price'),
+        ).order_by()
+    ]
+    product_rows = [
+        DailyProductRollup(paid_revenue=row.pop('paid_revenue') or Decimal('0.00'), **row)
+        for row in orders.values('day', 'product_id').annotate(
+            orders=Count('id'),
+            quantity=Sum('quantity'),
+            revenue=Sum('total_price'),
+            paid_revenue=Sum('total_price', filter=Q(payment_status=Order.PaymentStatus.PAID)),
+        ).order_by()
+    ]
+
+    DailyOrderRollup.objects.filter(day__in=days).delete()
+    DailyProductRollup.objects.filter(day__in=days).delete()
+    DailyOrderRollup.objects.bulk_create(order_rows)
+    DailyProductRollup.objects.bulk_create(product_rows)
+
+
+def rebuild_days(days):
+    """
+    Replace the rollups of ``days`` from the orders table; returns the
+    number of days rebuilt.
+    """
+    rebuilt = 0
+    for batch in _batches(days):
+        with transaction.atomic():
+            _rebuild_batch(batch)
+        rebuilt += len(batch)
+    return rebuilt
+
+
+def rebuild_dirty():
+    """
+    Rebuild every day marked dirty (including days marked while running).
+    """
+    rebuilt = 0
+    while True:
+        days = list(RollupDirtyDay.objects.order_by('day').values_list('day', flat=True)[:ROLLUP_BATCH_DAYS * 10])
+        if not days:
+            return rebuilt
+        rebuilt += rebuild_days(days)
+
+
+def rebuild_since(day):
+    """
+    Rebuild every day from ``day`` to today, whether marked dirty or not.
+    """
+    today = timezone.localdate()
+    return rebuild_days(day + timedelta(days=n) for n in range((today - day).days + 1))
+
+
+def first_order_day():
+    first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    return order_day(first) if first else None
@@ -0,0 +1,208 @@
+"""
+Full-text search for the product catalog.
+
+SQLite uses an FTS5 virtual table (created in migration 0012, keyed by
+product id since 0020), PostgreSQL a table of weighted tsvectors behind a
+GIN index (migration 0019); the
+signals in products.signals keep either in step with Product/Category. Any
+other backend falls back to the old icontains match so search keeps working
+everywhere.
+"""
+import re
+
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'products_product_fts'
+PG_SEARCH_TABLE = 'products_product_search'
+
+# bm25 column weights: product_id (unindexed), name, description, category
+FTS_WEIGHTS = (0.0, 10.0, 1.0, 3.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())[:10]
+
+
+def fts_enabled() -> bool:
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _index_table():
+    return PG_SEARCH_TABLE if connection.vendor == 'postgresql' else FTS_TABLE
+
+
+def _fts_match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match,
+    the last word as a prefix so results update while the user types.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return ''
+    terms = [f'"{t}"' for t in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return ' '.join(terms)
+
+
+# Weighted like the FTS5 bm25 columns: name > category > description
+PG_DOCUMENT_SQL = (
+    "SELECT p.id, "
+    "setweight(to_tsvector(coalesce(p.name, '')), 'A') || "
+    "setweight(to_tsvector(coalesce(c.name, '')), 'B') || "
+    "setweight(to_tsvector(coalesce(p.description, '')), 'C') "
+    "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+)
+
+
+def search_product_ids(query, limit=None):
+    """
+    Return matching product IDs, best match first (all of them unless
+    ``limit`` is given).
+    """
+    if connection.vendor == 'sqlite':
+        match = _fts_match_expression(query)
+        if not match:
+            return []
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [match, -1 if limit is None else limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    from .models import Product
+
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    if connection.vendor == 'postgresql':
+        ts_query = ' & '.join(f"'{t}':*" for t in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT s.product_id FROM {PG_SEARCH_TABLE} s '
+                f'JOIN products_product p ON p.id = s.product_id '
+                f'WHERE s.document @@ to_tsquery(%s) '
+                f'ORDER BY ts_rank(s.document, to_tsquery(%s)) DESC, p.name LIMIT %s',
+                [ts_query, ts_query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    condition = models.Q()
+    for token in tokens:
+        condition &= models.Q(name__icontains=token) | models.Q(description__icontains=token)
+    ids = Product.objects.filter(condition).values_list('pk', flat=True)
+    return list(ids if limit is None else ids[:limit])
+
+
+def _pk_column(model):
+    return f'"{model._meta.db_table}"."{model._meta.pk.column}"'
+
+
+def match_condition(query):
+    """
+    A Q() for the products matching ``query``, as a subquery on the index,
+    so the SQL is the same size however many products match.
+    """
+    if connection.vendor == 'sqlite':
+        match = _fts_match_expression(query)
+        if not match:
+            return models.Q(pk__in=[])
+        return models.Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+    tokens = _tokens(query)
+    if not tokens:
+        return models.Q(pk__in=[])
+    if connection.vendor == 'postgresql':
+        ts_query = ' & '.join(f"'{t}':*" for t in tokens)
+        return models.Q(pk__in=RawSQL(
+            f'SELECT product_id FROM {PG_SEARCH_TABLE} WHERE document @@ to_tsquery(%s)', [ts_query],
+        ))
+
+    condition = models.Q()
+    for token in tokens:
+        condition &= models.Q(name__icontains=token) | models.Q(description__icontains=token)
+    return condition
+
+
+def rank_expression(query, model):
+    """
+    A per-product relevance for ``query`` to annotate ``model`` rows with
+    (lower is better; NULL for products that do not match), looked up in
+    the index by the row's id. The icontains fallback does not rank.
+    """
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        return RawSQL(
+            f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {_pk_column(model)}',
+            [_fts_match_expression(query)], output_field=models.FloatField(),
+        )
+    if connection.vendor == 'postgresql':
+        ts_query = ' & '.join(f"'{t}':*" for t in _tokens(query))
+        return RawSQL(
+            f'SELECT -ts_rank(document, to_tsquery(%s)) FROM {PG_SEARCH_TABLE} '
+            f'WHERE product_id = {_pk_column(model)}',
+            [ts_query], output_field=models.FloatField(),
+        )
+    return models.Value(0.0, output_field=models.FloatField())
+
+
+def index_products(product_ids):
+    """
+    (Re)index the given products. Missing IDs are simply removed.
+    """
+    if not fts_enabled() or not product_ids:
+        return
+    from .models import Product
+
+    product_ids = list(product_ids)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    remove_products(product_ids)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {PG_SEARCH_TABLE} (product_id, document) {PG_DOCUMENT_SQL} WHERE p.id IN ({placeholders})',
+                product_ids,
+            )
+        return
+
+    rows = Product.objects.filter(pk__in=product_ids).values_list(
+        'pk', 'name', 'description', 'category__name'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, product_id, name, description, category) VALUES (%s, %s, %s, %s, %s)',
+            [(pk, pk, name, description, category or '') for pk, name, description, category in rows],
+        )
+
+
+def remove_products(product_ids):
+    if not fts_enabled() or not product_ids:
+        return
+    product_ids = list(product_ids)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {_index_table()} WHERE product_id IN ({placeholders})', product_ids)
+
+
+def rebuild_index(chunk_size=1000) -> int:
+    """
+    Drop and repopulate the whole index. Returns the number of products indexed.
+    """
+    if not fts_enabled():
+        return 0
+    from .models import Product
+
+    ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {_index_table()}')
+        for start in range(0, len(ids), chunk_size):
+            index_products(ids[start:start + chunk_size])
+    return len(ids)
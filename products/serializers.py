@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+# Upper bound on configurations priced per request
+MAX_QUOTE_ITEMS = 500
+# ...and per request from anonymous callers
+MAX_ANON_QUOTE_ITEMS = 20
+
+
+class QuoteItemSerializer(serializers.Serializer):
+    product = serializers.SlugField(help_text="Product slug")
+    quantity = serializers.IntegerField(min_value=1)
+    options = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+    services = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    shipping_method = serializers.SlugField(required=False, allow_blank=True, default='')
+    discount_code = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    items = QuoteItemSerializer(many=True, allow_empty=False, max_length=MAX_QUOTE_ITEMS)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Checked before any item is validated
+        self.fields['items'].max_length = self.context.get('max_items', MAX_QUOTE_ITEMS)
@@ -1,44 +1,120 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Order
-from .utils import send_whatsapp_message
+from import_export.signals import post_import
+from .models import Order, Product, QuantityTier, Category, ProductOption, OptionalService, ShippingMethod
+from accounts.utils import render_order_confirmation_email
+from . import search
+from . import catalog
+from . import outbox
+from . import pdf_cache
+from . import rollups
 
-@receiver(pre_save, sender=Order)
-def track_order_status_change(sender, instance, **kwargs):
+SEARCH_FIELDS = {'name', 'description', 'category', 'category_id'}
+
+@receiver(post_save, sender=QuantityTier)
+@receiver(post_delete, sender=QuantityTier)
+def sync_product_price_range(sender, instance, **kwargs):
+    """
+    Keep Product.min_price/max_price in step with its quantity tiers.
+    """
+    Product.refresh_price_ranges([instance.product_id])
+
+@receiver(post_import)
+def sync_price_ranges_after_import(sender, model, **kwargs):
+    """
+    Admin imports may bulk-create tiers without firing post_save.
+    """
+    if model in (Product, QuantityTier):
+        Product.refresh_price_ranges()
+        catalog.bump_version()
+
+CATALOG_MODELS = (Category, Product, QuantityTier, ProductOption, OptionalService, ShippingMethod)
+
+# Product fields the storefront reads from the database, not the snapshot;
+# saving only these (reduce_stock on every order) leaves the version alone.
+# Cached in-stock facet counts catch up within FACET_CACHE_TIMEOUT.
+UNCACHED_PRODUCT_FIELDS = {'stock_quantity'}
+
+def bump_catalog_version(sender, update_fields=None, **kwargs):
     """
-    Check if the status has changed before saving.
+    Any catalog change invalidates every worker's snapshot and cached facets.
     """
-    if instance.pk:
-        try:
-            old_instance = Order.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-            instance._old_payment_status = old_instance.payment_status
-        except Order.DoesNotExist:
-            pass
+    if sender is Product and update_fields and UNCACHED_PRODUCT_FIELDS.issuperset(update_fields):
+        return
+    catalog.bump_version()
+
+for catalog_model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=catalog_model, dispatch_uid=f'catalog_version_save_{catalog_model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=catalog_model, dispatch_uid=f'catalog_version_delete_{catalog_model.__name__}')
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, update_fields=None, **kwargs):
+    """
+    Reindex a product when any searchable field may have changed.
+    """
+    if update_fields and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    search.index_products([instance.pk])
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    """
+    Category names are indexed with each product, so renames fan out.
+    """
+    if not created:
+        search.index_products(instance.products.values_list('pk', flat=True))
 
 @receiver(post_save, sender=Order)
 def send_order_notifications(sender, instance, created, **kwargs):
     """
-    Send WhatsApp notifications on creation or status change.
+    Queue WhatsApp notifications on status or payment change. Delivery
+    happens in run_outbox_worker, so this is one INSERT inside the order's
+    own transaction.
+
+    New orders are announced by checkout (order_created_notifications), not
+    here, so orders created in the admin, by imports or by fixtures do not
+    message the customer.
     """
-    # 1. New Order Notification
     if created:
-        msg = (
-            f"🎉 Hi {instance.full_name}, thanks for your order at BizPrint!\n\n"
-            f"Order #{str(instance.uuid)[:8]}\n"
-            f"📦 {instance.product.name}\n"
-            f"💰 Total: R{instance.total_price}\n\n"
-            f"We will notify you once production starts."
-        )
-        send_whatsapp_message(instance.phone, msg)
         return
+    outbox.enqueue(*order_notifications(instance))
 
-    # 2. Status Change Notification
-    if hasattr(instance, '_old_status') and instance._old_status != instance.status:
+def order_created_notifications(order):
+    """
+    Unsaved outbox messages confirming a new order: the confirmation email
+    and a WhatsApp message. Queued by checkout in the order's transaction.
+    """
+    queued = []
+    if order.email:
+        subject, html_body = render_order_confirmation_email(order)
+        queued.append(outbox.email(subject, [order.email], html_body))
+    msg = (
+        f"🎉 Hi {order.full_name}, thanks for your order at BizPrint!\n\n"
+        f"Order #{order.short_ref}\n"
+        f"📦 {order.product.name}\n"
+        f"💰 Total: R{order.total_price}\n\n"
+        f"We will notify you once production starts."
+    )
+    queued.append(_whatsapp(order, msg))
+    return queued
+
+def order_notifications(instance):
+    """
+    Unsaved outbox messages announcing an order's tracked changes. Also used
+    by bulk updates that bypass post_save.
+    """
+    queued = []
+
+    # 1. Status Change Notification
+    if instance.has_changed('status'):
         new_status = instance.get_status_display()
         
         msg = (
-            f"📢 Update on Order #{str(instance.uuid)[:8]}\n\n"
+            f"📢 Update on Order #{instance.short_ref}\n\n"
             f"Current Status: *{new_status}*\n\n"
         )
 
@@ -49,13 +125,32 @@ def send_order_notifications(sender, instance, created, **kwargs):
         elif instance.status == Order.Status.SHIPPED:
             msg += "🚚 Your order is on its way!"
         
-        send_whatsapp_message(instance.phone, msg)
+        queued.append(_whatsapp(instance, msg))
 
-    # 3. Payment Received Notification
-    if hasattr(instance, '_old_payment_status') and instance._old_payment_status != instance.payment_status:
+    # 2. Payment Received Notification
+    if instance.has_changed('payment_status'):
         if instance.payment_status == Order.PaymentStatus.PAID:
             msg = (
-                f"💰 Payment Received for Order #{str(instance.uuid)[:8]}.\n"
+                f"💰 Payment Received for Order #{instance.short_ref}.\n"
                 f"Thank you! We are now processing your order."
             )
-            send_whatsapp_message(instance.phone, msg)
+            queued.append(_whatsapp(instance, msg))
+
+    return queued
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def mark_rollup_day_dirty(sender, instance, **kwargs):
+    """
+    The order's day needs its rollups rebuilt (see products.rollups).
+    """
+    rollups.mark_dirty([instance.created_at])
+
+@receiver(post_delete, sender=Order)
+def discard_cached_invoice(sender, instance, **kwargs):
+    pdf_cache.discard('invoices', instance.pk)
+
+def _whatsapp(order, body):
+    if not order.phone:
+        return None
+    return outbox.whatsapp(order.phone, body)
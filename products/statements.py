@@ -0,0 +1,170 @@
+"""
+Customer account statements.
+
+A statement lists a customer's orders for a period with what was charged,
+what was paid and the running balance, after an opening balance carried
+forward from everything before the period. Orders are streamed with
+.values_list().iterator() into a series of small tables that are only built
+as the pages are laid out, so neither model instances nor the flowables for
+the whole statement are held at once; what remains is the finished pages
+ReportLab keeps until the file is written, and those are compressed.
+
+Only orders that are not cancelled or refunded are charged; an order counts
+as paid once its payment status is Paid.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from reportlab.lib.units import inch
+
+from .documents import Document, Fields, Items, Totals, render
+from .models import Order
+
+# Rows fetched per database round trip
+STATEMENT_CHUNK_SIZE = 2000
+# Rows per table flowable; about a page of compact rows
+STATEMENT_TABLE_ROWS = 40
+
+HEADER = ['Date', 'Reference', 'Description', 'Status', 'Charged (R)', 'Paid (R)', 'Balance (R)']
+COL_WIDTHS = (0.8*inch, 0.8*inch, 1.85*inch, 0.85*inch, 0.75*inch, 0.75*inch, 0.8*inch)
+
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+CHARGEABLE = ~Q(status__in=[Order.Status.CANCELLED, Order.Status.REFUNDED]) & ~Q(payment_status=Order.PaymentStatus.CANCELLED)
+
+
+def charge_expression():
+    return Case(When(CHARGEABLE, then='total_price'), default=ZERO)
+
+
+def payment_expression():
+    return Case(When(CHARGEABLE & Q(payment_status=Order.PaymentStatus.PAID), then='total_price'), default=ZERO)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _end_of(day):
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def opening_balance(user_id, date_from):
+    """
+    Amount outstanding from orders placed before ``date_from`` (one query).
+    """
+    if date_from is None:
+        return Decimal('0.00')
+    totals = Order.objects.filter(user_id=user_id, created_at__lt=_start_of(date_from)).aggregate(
+        charged=Coalesce(Sum(charge_expression()), ZERO),
+        paid=Coalesce(Sum(payment_expression()), ZERO),
+    )
+    return totals['charged'] - totals['paid']
+
+
+def statement_rows(user_id, date_from=None, date_to=None):
+    """
+    (created_at, short_ref, product name, quantity, status, charge, payment)
+    per order in the period, oldest first, streamed.
+    """
+    orders = Order.objects.filter(user_id=user_id)
+    if date_from:
+        orders = orders.filter(created_at__gte=_start_of(date_from))
+    if date_to:
+        orders = orders.filter(created_at__lte=_end_of(date_to))
+    return (
+        orders.annotate(charge=charge_expression(), payment=payment_expression())
+        .order_by('created_at', 'id')
+        .values_list('created_at', 'short_ref', 'product__name', 'quantity', 'status', 'charge', 'payment')
+        .iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+    )
+
+
+@dataclass
+class StatementTotals:
+    opening: Decimal = Decimal('0.00')
+    charged: Decimal = Decimal('0.00')
+    paid: Decimal = Decimal('0.00')
+    orders: int = 0
+
+    @property
+    def closing(self):
+        return self.opening + self.charged - self.paid
+
+
+def _activity_blocks(user_id, date_from, date_to, totals):
+    status_labels = dict(Order.Status.choices)
+    tz = timezone.get_current_timezone()
+    balance = totals.opening
+
+    heading = "Account Activity"
+    rows = [['', '', 'Balance brought forward', '', '', '', f"{balance:.2f}"]]
+    for created_at, short_ref, product, quantity, status, charge, payment in statement_rows(user_id, date_from, date_to):
+        if len(rows) == STATEMENT_TABLE_ROWS:
+            yield Items(HEADER, rows, COL_WIDTHS, heading=heading, right_columns=(4, 5, 6), compact=True, space_after=0)
+            heading, rows = '', []
+        balance += charge - payment
+        totals.charged += charge
+        totals.paid += payment
+        totals.orders += 1
+        rows.append([
+            created_at.astimezone(tz).strftime('%d %b %Y'),
+            short_ref or '',
+            f"{product} x {quantity}"[:40],
+            status_labels.get(status, status),
+            f"{charge:.2f}" if charge else '',
+            f"{payment:.2f}" if payment else '',
+            f"{balance:.2f}",
+        ])
+    yield Items(HEADER, rows, COL_WIDTHS, heading=heading, right_columns=(4, 5, 6), compact=True)
+
+
+def _statement_blocks(user, date_from, date_to):
+    profile = getattr(user, 'profile', None)
+    client_info = [
+        ['Name:', user.get_full_name() or user.username],
+        ['Email:', user.email],
+    ]
+    if profile is not None and profile.phone:
+        client_info.append(['Phone:', profile.phone])
+
+    period = f"{date_from:%d %B %Y}" if date_from else "Account opened"
+    period += f" to {date_to or timezone.localdate():%d %B %Y}"
+    yield Fields([
+        ['Statement Date:', f"{timezone.localdate():%d %B %Y}"],
+        ['Period:', period],
+    ])
+    yield Fields(client_info, style='client', heading="Account Holder:", space_after=30)
+
+    totals = StatementTotals(opening=opening_balance(user.pk, date_from))
+    yield from _activity_blocks(user.pk, date_from, date_to, totals)
+    # Only known once every row has been laid out
+    yield Totals([
+        ['Opening Balance:', f"R {totals.opening:.2f}"],
+        [f"Charged ({totals.orders} orders):", f"R {totals.charged:.2f}"],
+        ['Paid:', f"-R {totals.paid:.2f}"],
+        ['', ''],  # Spacer row
+        ['Amount Due:', f"R {totals.closing:.2f}"],
+    ])
+
+
+def customer_statement_document(user, date_from=None, date_to=None):
+    """
+    Declarative statement; its blocks are generated as it is rendered.
+    """
+    return Document("STATEMENT", _statement_blocks(user, date_from, date_to))
+
+
+def generate_customer_statement_pdf(user_id, date_from=None, date_to=None):
+    """
+    Generate a customer's account statement PDF (takes a user id so it can
+    be queued on the render pool without pickling querysets).
+    """
+    from django.contrib.auth.models import User
+
+    user = User.objects.select_related('profile').get(pk=user_id)
+    return render(customer_statement_document(user, date_from, date_to), compress=True)
@@ -0,0 +1,22 @@
+"""
+Helpers for streaming CSV/text exports through StreamingHttpResponse.
+"""
+from itertools import islice
+
+
+class Echo:
+    """File-like object whose write() returns the line, for streaming csv."""
+    def write(self, value):
+        return value
+
+
+def batched(lines, batch):
+    """
+    Join ``lines`` into chunks of up to ``batch`` lines each.
+    """
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, batch))
+        if not chunk:
+            return
+        yield ''.join(chunk)
@@ -1,3 +1,1058 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+import timeit
+import uuid
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from types import MappingProxyType
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import NewsletterSubscriber
+from benchmarks.measure import Result, measure
+from benchmarks.report import compare, load_json
+from . import (
+    catalog, catalog_import, documents, invoice_export, order_export, outbox, pdf_cache, pdf_service, rollups, search,
+    whatsapp,
+)
+from .facets import compute_facets, get_facets
+from .models import (
+    Category, DailyOrderRollup, DailyProductRollup, OptionalService, Order, OutboxMessage, Product, ProductOption,
+    QuantityTier, RollupDirtyDay, ShippingMethod,
+)
+from .price_sheets import MAX_SERVICES
+from .pricing import CompiledPricing, PricingError, percent_of, to_cents
+from .pagination import paginate_keyset, paginate_sequence
+from .pdf_utils import order_invoice_fingerprint
+from .serializers import MAX_ANON_QUOTE_ITEMS
+from .reconciliation import iter_csv_transactions, parse_amount, reconcile
+
+
+def make_product(**kwargs):
+    kwargs.setdefault('name', 'Business Cards')
+    kwargs.setdefault('image', 'product_images/cards.png')
+    return Product.objects.create(**kwargs)
+
+
+def make_order(product, **kwargs):
+    kwargs.setdefault('quantity', 100)
+    kwargs.setdefault('base_price', Decimal('250.00'))
+    kwargs.setdefault('total_price', kwargs['base_price'])
+    kwargs.setdefault('options', {})
+    kwargs.setdefault('shipping_price', Decimal('0.00'))
+    kwargs.setdefault('discount_amount', Decimal('0.00'))
+    return Order.objects.create(product=product, **kwargs)
+
+
+# ==========================
+# Pricing
+# ==========================
+
+def compiled(tiers, options=None, services=None, shipping=None):
+    return CompiledPricing(
+        product_id=1,
+        tier_cents=MappingProxyType(tiers),
+        option_cents=MappingProxyType({k: MappingProxyType(v) for k, v in (options or {}).items()}),
+        service_cents=MappingProxyType(services or {}),
+        shipping_cents=MappingProxyType(shipping or {}),
+    )
+
+
+class PricingTests(SimpleTestCase):
+    def test_cents_conversion(self):
+        self.assertEqual(to_cents('250.00'), 25000)
+        self.assertEqual(to_cents(Decimal('0.125')), 13)
+        self.assertEqual(to_cents(Decimal('19.994')), 1999)
+
+    def test_percent_rounds_half_up(self):
+        self.assertEqual(percent_of(10, 15), 2)     # 1.5c
+        self.assertEqual(percent_of(30, 15), 5)     # 4.5c
+        self.assertEqual(percent_of(1005, 10), 101)  # 100.5c
+        self.assertEqual(percent_of(1001, 15), 150)  # 150.15c
+
+    def test_quote_totals(self):
+        pricing = compiled(
+            {100: 25000},
+            options={'Finish': {'Matte': 0, 'Glossy': 1050}},
+            services={'Design': 15000},
+            shipping={'courier': 9999},
+        )
+        quote = pricing.quote(100, {'Finish': 'Glossy'}, ['Design', 'Design'], 'courier', discount=True)
+        self.assertEqual(quote.services, ['Design'])
+        self.assertEqual(quote.modifiers_cents, 16050)
+        self.assertEqual(quote.discount_cents, 5105)   # 10% of 510.49, half up
+        self.assertEqual(quote.subtotal_cents, 45944)
+        self.assertEqual(quote.vat_cents, 6892)        # 15% of 459.44 = 68.916
+        self.assertEqual(quote.total, Decimal('528.36'))
+        self.assertEqual(quote.as_dict()['vat'], '68.92')
+
+    def test_unpriceable_configurations(self):
+        pricing = compiled({100: 25000}, options={'Finish': {'Matte': 0}})
+        for kwargs in ({'quantity': 50}, {'quantity': 100, 'options': {'Finish': 'Foil'}},
+                       {'quantity': 100, 'services': ['Design']}, {'quantity': 100, 'shipping_method': 'drone'}):
+            with self.assertRaises(PricingError):
+                pricing.quote(**kwargs)
+
+
+class BatchQuoteAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        product = make_product(slug='business-cards')
+        QuantityTier.objects.create(product=product, quantity=100, base_price=Decimal('250.00'))
+        ProductOption.objects.create(product=product, option_type='Finish', value='Glossy', price_modifier=Decimal('10.50'))
+        ShippingMethod.objects.create(name='Courier', slug='courier', price=Decimal('99.99'))
+        NewsletterSubscriber.objects.create(email='club@example.com', discount_code='BIZ-TEST')
+        catalog.clear_local()
+
+    def post(self, items):
+        return self.client.post(reverse('products:api_batch_quote'), {'items': items}, content_type='application/json')
+
+    def test_quotes_keep_request_order(self):
+        response = self.post([
+            {'product': 'business-cards', 'quantity': 100, 'options': {'Finish': 'Glossy'},
+             'shipping_method': 'courier', 'discount_code': 'biz-test'},
+            {'product': 'business-cards', 'quantity': 7},
+            {'product': 'no-such-product', 'quantity': 100},
+        ])
+        self.assertEqual(response.status_code, 200)
+        first, second, third = response.json()['results']
+        self.assertEqual((first['discount_amount'], first['subtotal'], first['vat'], first['total']),
+                         ('36.05', '324.44', '48.67', '373.11'))
+        self.assertEqual(second['error'], 'No pricing tier for quantity 7.')
+        self.assertEqual(third['error'], 'Unknown product.')
+
+    def test_anonymous_batch_cap(self):
+        items = [{'product': 'business-cards', 'quantity': 100}] * (MAX_ANON_QUOTE_ITEMS + 1)
+        self.assertEqual(self.post(items).status_code, 400)
+
+        self.client.force_login(User.objects.create_user('corporate', password='pw'))
+        self.assertEqual(self.post(items).status_code, 200)
+
+    @override_settings(QUOTE_API_ANON_RATE='2/min')
+    def test_anonymous_rate_limit(self):
+        items = [{'product': 'business-cards', 'quantity': 100}]
+        self.assertEqual([self.post(items).status_code for _ in range(3)], [200, 200, 429])
+
+
+# ==========================
+# Catalog snapshot version
+# ==========================
+
+class CatalogVersionTests(TestCase):
+    def test_stock_moves_keep_version(self):
+        product = make_product(stock_quantity=10)
+        version = catalog.current_version()
+        product.reduce_stock(3)
+        product.increase_stock(1)
+        self.assertEqual(catalog.current_version(), version)
+
+    def test_catalog_edit_bumps_version(self):
+        product = make_product()
+        version = catalog.current_version()
+        product.name = 'Flyers'
+        product.save()
+        self.assertGreater(catalog.current_version(), version)
+
+
+# ==========================
+# Search
+# ==========================
+
+class SearchTests(TestCase):
+    def test_best_match_first(self):
+        flyer = make_product(name='A5 Flyers', description='Glossy flyers')
+        card = make_product(name='Business Cards', description='Cards that look like flyers')
+        self.assertEqual(search.search_product_ids('flyer'), [flyer.pk, card.pk])
+        self.assertEqual(search.search_product_ids('business car'), [card.pk])
+
+    def test_results_are_not_capped(self):
+        Product.objects.bulk_create([
+            Product(name=f'Sticker {n}', slug=f'sticker-{n}', image='product_images/sticker.png')
+            for n in range(600)
+        ])
+        search.rebuild_index()
+        self.assertEqual(len(search.search_product_ids('sticker')), 600)
+        self.assertEqual(len(search.search_product_ids('sticker', limit=10)), 10)
+
+    def test_catalog_search_sql_does_not_grow_with_matches(self):
+        Product.objects.bulk_create([
+            Product(name=f'Label {n}', slug=f'label-{n}', image='product_images/label.png', description='Sticker paper')
+            for n in range(599)
+        ])
+        make_product(name='Sticker Sheet')
+        search.rebuild_index()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('products:product_list'), {'search': 'sticker'})
+        self.assertEqual(response.context['result_count'], 600)
+        # Best match first, then the page continues from its cursor
+        self.assertEqual(response.context['products'][0].name, 'Sticker Sheet')
+        self.assertLess(max(len(query['sql']) for query in queries), 4000)
+
+        page = response.context['page']
+        response = self.client.get(reverse('products:product_list'), {'search': 'sticker', 'cursor': page.next_cursor})
+        self.assertFalse(set(response.context['products']) & set(page.object_list))
+
+
+# ==========================
+# Price sheets
+# ==========================
+
+class PriceSheetAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.product = make_product()
+        QuantityTier.objects.create(product=self.product, quantity=100, base_price=Decimal('250.00'))
+
+    def download_csv(self):
+        catalog.clear_local()
+        return self.client.post(reverse('admin:products_product_changelist'), {
+            'action': 'download_price_sheet_csv', '_selected_action': [self.product.pk],
+        })
+
+    def test_csv_download(self):
+        response = self.download_csv()
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[1], 'Business Cards,100,,,,250.00,37.50,287.50')
+
+    def test_too_many_services_is_rejected_before_streaming(self):
+        OptionalService.objects.bulk_create([
+            OptionalService(product=self.product, label=f'Service {n}', price=Decimal('10.00'))
+            for n in range(MAX_SERVICES + 1)
+        ])
+        response = self.download_csv()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.streaming)
+
+
+# ==========================
+# Order short references
+# ==========================
+
+class ShortRefTests(TestCase):
+    def setUp(self):
+        self.product = make_product()
+
+    def test_short_ref_is_uuid_prefix(self):
+        order = make_order(self.product)
+        self.assertEqual(order.short_ref, order.uuid.hex.upper()[:8])
+
+    def test_prefix_collision_takes_longer_ref(self):
+        first = make_order(self.product, uuid=uuid.UUID('ab12cd34' + '0' * 24))
+        second = make_order(self.product, uuid=uuid.UUID('ab12cd34' + 'ef' + '1' * 22))
+        third = make_order(self.product, uuid=uuid.UUID('ab12cd34' + 'ef' + '2' * 22))
+        self.assertEqual(first.short_ref, 'AB12CD34')
+        self.assertEqual(second.short_ref, 'AB12CD34EF')
+        self.assertEqual(third.short_ref, 'AB12CD34EF22')
+
+    def test_lost_race_retries_once(self):
+        taken = make_order(self.product)
+        order = Order(product=self.product, quantity=1, base_price=Decimal('10.00'), total_price=Decimal('10.00'),
+                      options={}, shipping_price=Decimal('0.00'), discount_amount=Decimal('0.00'))
+        with mock.patch.object(Order, '_generate_short_ref', side_effect=[taken.short_ref, 'FEDCBA9876']):
+            order.save()
+        self.assertEqual(order.short_ref, 'FEDCBA9876')
+
+    def test_reference_candidates(self):
+        self.assertEqual(Order.short_ref_candidates('INVab12cd34-ef'), ['AB12CD34', 'AB12CD34EF'])
+        self.assertEqual(Order.short_ref_candidates('ab12'), [])
+        self.assertEqual(Order.short_ref_candidates('ZZ12CD34'), [])
+
+    def test_admin_search_by_reference(self):
+        order = make_order(self.product, uuid=uuid.UUID('ab12cd34' + '0' * 24))
+        make_order(self.product, uuid=uuid.UUID('ab12cd34' + 'ef' + '1' * 22))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        url = reverse('admin:products_order_changelist')
+        for term in ('inv-ab12cd34', 'INV AB12CD34', str(order.uuid)):
+            response = self.client.get(url, {'q': term})
+            self.assertEqual(list(response.context['cl'].result_list), [order], term)
+        # Anything else is an ordinary admin search
+        response = self.client.get(url, {'q': self.product.name})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+# ==========================
+# Order export
+# ==========================
+
+class OrderExportTests(TestCase):
+    def test_csv_and_ndjson_streams(self):
+        product = make_product()
+        ProductOption.objects.create(product=product, option_type='Finish', value='Glossy')
+        orders = [make_order(product, options={'Finish': 'Glossy', 'Corners': 'Round'}) for _ in range(3)]
+
+        lines = ''.join(order_export.stream_csv(Order.objects.order_by('pk'), batch=2)).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0].split(',')[-3:], ['option: Finish', 'other_options', 'other_services'])
+        self.assertTrue(lines[1].startswith(orders[0].short_ref))
+
+        records = ''.join(order_export.stream_ndjson(Order.objects.order_by('pk'))).splitlines()
+        self.assertEqual(len(records), 3)
+        self.assertIn('"other_options": "Corners: Round"', records[0])
+
+
+# ==========================
+# Bank statement reconciliation
+# ==========================
+
+class ParseAmountTests(TestCase):
+    def test_plain_and_currency_amounts(self):
+        self.assertEqual(parse_amount('250.00'), Decimal('250.00'))
+        self.assertEqual(parse_amount('R 1 250.50'), Decimal('1250.50'))
+        self.assertEqual(parse_amount('(100.00)'), Decimal('-100.00'))
+
+    def test_comma_thousands_separator(self):
+        self.assertEqual(parse_amount('1,500'), Decimal('1500'))
+        self.assertEqual(parse_amount('1,500,000'), Decimal('1500000'))
+        self.assertEqual(parse_amount('1,500.25'), Decimal('1500.25'))
+
+    def test_comma_decimal_separator(self):
+        self.assertEqual(parse_amount('1,50'), Decimal('1.50'))
+        self.assertEqual(parse_amount('250,00'), Decimal('250.00'))
+        self.assertEqual(parse_amount('1.500,25'), Decimal('1500.25'))
+
+    def test_blank_or_garbage(self):
+        self.assertIsNone(parse_amount(''))
+        self.assertIsNone(parse_amount(None))
+        self.assertIsNone(parse_amount('n/a'))
+
+
+class ReconcileTests(TestCase):
+    def setUp(self):
+        self.product = make_product()
+
+    def statement(self, *rows):
+        lines = ['Date,Description,Amount'] + [f'2025-01-10,{description},{amount}' for description, amount in rows]
+        return iter_csv_transactions(io.StringIO('\n'.join(lines) + '\n'))
+
+    def test_exact_match_marks_order_paid(self):
+        order = make_order(self.product, total_price=Decimal('1500.00'))
+        result = reconcile(self.statement((f'EFT INV{order.short_ref}', '"1,500.00"')))
+        self.assertEqual(result.matched_orders, [order.pk])
+        self.assertEqual(result.exceptions, [])
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, Order.PaymentStatus.PAID)
+
+    def test_longest_reference_wins(self):
+        short = make_order(self.product, short_ref='AB12CD34', total_price=Decimal('100.00'))
+        long = make_order(self.product, short_ref='AB12CD34EF', total_price=Decimal('200.00'))
+        result = reconcile(self.statement(('INVAB12CD34EF', '200.00')), dry_run=True)
+        self.assertEqual(result.matched_orders, [long.pk])
+        self.assertNotIn(short.pk, result.matched_orders)
+
+    def test_bare_short_ref_matches_open_order(self):
+        order = make_order(self.product, total_price=Decimal('250.00'))
+        other = make_order(self.product, total_price=Decimal('90.00'))
+        result = reconcile(self.statement(
+            (f'EFT {order.short_ref.lower()} ACC 12345678', '250.00'),
+            # Not an open order's reference: left for a human
+            (f'EFT {other.short_ref}FF', '90.00'),
+        ))
+        self.assertEqual(result.matched_orders, [order.pk])
+        self.assertEqual(result.exceptions[0].reason, 'No payment reference')
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, Order.PaymentStatus.PAID)
+
+    def test_wrong_amount_and_missing_reference_are_exceptions(self):
+        order = make_order(self.product, total_price=Decimal('250.00'))
+        result = reconcile(self.statement(
+            (f'INV{order.short_ref}', '200.00'),
+            ('Cash deposit', '250.00'),
+        ), dry_run=True)
+        self.assertEqual(result.matched_orders, [])
+        underpaid, unreferenced = result.exceptions
+        self.assertEqual(underpaid.reason, 'Underpaid')
+        self.assertEqual(underpaid.expected, Decimal('250.00'))
+        self.assertEqual(unreferenced.reason, 'No payment reference')
+        self.assertEqual(unreferenced.suggestion, f'INV{order.short_ref}')
+
+    def test_paid_twice(self):
+        order = make_order(self.product, total_price=Decimal('250.00'))
+        result = reconcile(self.statement(
+            (f'INV{order.short_ref}', '250.00'),
+            (f'INV{order.short_ref}', '250.00'),
+        ), dry_run=True)
+        self.assertEqual(result.matched_orders, [order.pk])
+        self.assertEqual(result.exceptions[0].reason, 'Order already matched on line 2')
+
+
+# ==========================
+# WhatsApp transport
+# ==========================
+
+class WhatsAppTransportTests(SimpleTestCase):
+    @override_settings(TWILIO_ACCOUNT_SID='your_sid_here', TWILIO_AUTH_TOKEN='your_token_here')
+    def test_placeholder_credentials_use_console(self):
+        with mock.patch.object(whatsapp, 'twilio_installed', return_value=True):
+            self.assertIsInstance(whatsapp.build_transport(), whatsapp.ConsoleTransport)
+
+    @override_settings(TWILIO_ACCOUNT_SID=' ', TWILIO_AUTH_TOKEN='')
+    def test_blank_credentials_use_console(self):
+        self.assertIsInstance(whatsapp.build_transport(), whatsapp.ConsoleTransport)
+
+    @override_settings(TWILIO_ACCOUNT_SID='AC123', TWILIO_AUTH_TOKEN='secret')
+    def test_missing_twilio_package_uses_console(self):
+        with mock.patch.object(whatsapp, 'twilio_installed', return_value=False):
+            self.assertIsInstance(whatsapp.build_transport(), whatsapp.ConsoleTransport)
+            with override_settings(WHATSAPP_TRANSPORT='twilio'), self.assertRaises(ImproperlyConfigured):
+                whatsapp.build_transport()
+
+
+# ==========================
+# Documents
+# ==========================
+
+class DocumentRenderTests(SimpleTestCase):
+    def test_blocks_are_pulled_as_pages_are_laid_out(self):
+        pulled = []
+
+        def blocks():
+            for i in range(300):
+                pulled.append(i)
+                yield documents.Note(f'Line {i}')
+
+        pages = []
+        with mock.patch.object(documents._StreamingDocTemplate, 'afterPage', autospec=True,
+                               side_effect=lambda doc: pages.append(len(pulled))):
+            pdf = documents.render(documents.Document('STATEMENT', blocks()))
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(len(pulled), 300)
+        self.assertGreater(len(pages), 2)
+        # Only what fits on the first page (plus the look-ahead) was read
+        self.assertLess(pages[0], 300 // len(pages) + documents.LOOKAHEAD)
+
+    def test_logo_is_embedded_without_reencoding(self):
+        logo = documents.logo_image()
+        if logo is None:
+            self.skipTest('logo image missing')
+        # JPEG data is copied into the PDF as is
+        self.assertIsNotNone(logo.jpeg_fh())
+
+        def best_of(runs=5):
+            return min(timeit.repeat(lambda: documents.render(documents.Document('INVOICE')), number=1, repeat=runs))
+
+        documents.warm_up()
+        with_logo = best_of()
+        with mock.patch.object(documents, 'logo_image', return_value=None):
+            without_logo = best_of()
+        # Re-encoding the logo per document made invoices about 3x slower
+        self.assertLess(with_logo, without_logo * 2)
+
+
+# ==========================
+# Checkout
+# ==========================
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.product = make_product(slug='business-cards')
+        QuantityTier.objects.create(product=self.product, quantity=100, base_price=Decimal('250.00'))
+        ProductOption.objects.create(product=self.product, option_type='Finish', value='Glossy', price_modifier=Decimal('10.50'))
+        catalog.clear_local()
+        self.client.force_login(User.objects.create_user('buyer', email='buyer@example.com', password='pw'))
+
+    def checkout(self, **data):
+        data = {'quantity': 100, 'full_name': 'Buyer', 'phone': '+27820000000', 'address': '1 Main Rd', **data}
+        return self.client.post(reverse('products:product_detail', args=['business-cards']), data)
+
+    def test_checkout_queues_confirmation(self):
+        response = self.checkout(Finish='Glossy')
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('products:order_success', args=[order.uuid]), fetch_redirect_response=False)
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('channel', flat=True)),
+            sorted([OutboxMessage.Channel.EMAIL, OutboxMessage.Channel.WHATSAPP]),
+        )
+
+    def test_checkout_stores_shipping_charged(self):
+        ShippingMethod.objects.create(name='Courier', slug='courier', price=Decimal('99.99'))
+        self.checkout(shipping_method='courier')
+        order = Order.objects.get()
+        self.assertEqual(order.shipping_price, Decimal('99.99'))
+        self.assertEqual(order.total_price, Decimal('402.49'))  # (250 + 99.99) + 15% VAT
+
+    def test_stale_option_fails_checkout(self):
+        response = self.checkout(Finish='Matte')
+        self.assertRedirects(response, reverse('products:product_detail', args=['business-cards']),
+                             fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+        message, = get_messages(response.wsgi_request)
+        self.assertEqual(str(message), 'Unknown option Finish: Matte.')
+
+    def test_orders_created_elsewhere_are_not_announced(self):
+        order = make_order(self.product, email='buyer@example.com', phone='+27820000000')
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        order.status = Order.Status.IN_PROD
+        order.save()
+        self.assertEqual(OutboxMessage.objects.get().channel, OutboxMessage.Channel.WHATSAPP)
+
+
+# ==========================
+# Catalog import
+# ==========================
+
+class CatalogImportLimitTests(TestCase):
+    def record(self, **fields):
+        return {'name': 'Flyers', 'tiers': [{'qty': 100, 'price': 250}], **fields}
+
+    def rejected(self, **fields):
+        report = catalog_import.import_catalog([(1, self.record(**fields)), (2, self.record(name='Posters'))])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Posters'])
+        (line, message), = report.errors
+        self.assertEqual(line, 1)
+        return message
+
+    def test_prices_must_fit_their_columns(self):
+        self.assertEqual(self.rejected(tiers=[{'qty': 100, 'price': '1000000'}]), "Tier price too large: '1000000'")
+        self.assertEqual(self.rejected(options=[{'type': 'Finish', 'value': 'Gloss', 'price': 10000}]),
+                         "Option price too large: 10000")
+        self.assertEqual(self.rejected(services=[{'label': 'Design', 'price': '12345.67'}]),
+                         "Service price too large: '12345.67'")
+
+    def test_largest_prices_are_accepted(self):
+        catalog_import.import_catalog([(1, self.record(
+            tiers=[{'qty': 100, 'price': '999999.99'}],
+            options=[{'type': 'Finish', 'value': 'Gloss', 'price': '9999.99'}],
+        ))])
+        self.assertEqual(QuantityTier.objects.get().base_price, Decimal('999999.99'))
+        self.assertEqual(ProductOption.objects.get().price_modifier, Decimal('9999.99'))
+
+    def test_text_must_fit_its_columns(self):
+        self.assertTrue(self.rejected(options=[{'type': 'F' * 51, 'value': 'Gloss'}]).startswith('Option type longer than 50'))
+        self.assertTrue(self.rejected(options=[{'type': 'Finish', 'value': 'G' * 101}]).startswith('Option value longer than 100'))
+        self.assertTrue(self.rejected(services=[{'label': 'D' * 101, 'price': 10}]).startswith('Service label longer than 100'))
+        self.assertTrue(self.rejected(category='C' * 101).startswith('Category longer than 100'))
+        self.assertTrue(self.rejected(tiers=[{'qty': 2 ** 31, 'price': 1}]).startswith('Bad tier quantity'))
+
+
+class CatalogImportTests(TestCase):
+    RECORD = {
+        'name': 'Flyers', 'category': 'Marketing', 'image': 'product_images/flyers.png',
+        'tiers': [{'qty': 100, 'price': 250}, {'qty': 500, 'price': 900}],
+        'options': [{'type': 'Finish', 'value': 'Gloss', 'price': 20}],
+        'services': [{'label': 'Design', 'price': 150}],
+    }
+
+    def run_import(self, *records, **kwargs):
+        return catalog_import.import_catalog(list(enumerate(records, start=1)), **kwargs)
+
+    def test_creates_then_upserts_without_duplicates(self):
+        report = self.run_import(self.RECORD)
+        product = Product.objects.get(slug='flyers')
+        self.assertEqual(product.category.name, 'Marketing')
+        self.assertEqual((product.min_price, product.max_price), (Decimal('250.00'), Decimal('900.00')))
+        self.assertEqual(report.counts['products']['created'], 1)
+
+        report = self.run_import({**self.RECORD, 'tiers': [{'qty': 100, 'price': 199}, {'qty': 500, 'price': 900}]})
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(QuantityTier.objects.get(quantity=100).base_price, Decimal('199.00'))
+        product.refresh_from_db()
+        self.assertEqual(product.min_price, Decimal('199.00'))
+        self.assertEqual(search.search_product_ids('flyers'), [product.pk])
+
+        # Unchanged records write nothing
+        self.run_import(self.RECORD)
+        report = self.run_import(self.RECORD)
+        self.assertEqual((report.changes, report.summary()), ([], 'products: 1 unchanged'))
+
+    def test_missing_children_are_deleted(self):
+        self.run_import(self.RECORD)
+        self.run_import({**self.RECORD, 'tiers': [{'qty': 100, 'price': 250}], 'options': [], 'services': []})
+        product = Product.objects.get(slug='flyers')
+        self.assertEqual(list(product.quantity_tiers.values_list('quantity', flat=True)), [100])
+        self.assertFalse(product.options.exists())
+        self.assertFalse(product.services.exists())
+        # A feed without images keeps the uploaded one
+        self.run_import({**self.RECORD, 'image': None})
+        self.assertEqual(Product.objects.get(slug='flyers').image.name, 'product_images/flyers.png')
+
+    def test_dry_run_reports_without_writing(self):
+        report = self.run_import(self.RECORD, {'name': ''}, dry_run=True)
+        self.assertTrue(report.dry_run)
+        self.assertEqual(report.counts['products']['created'], 1)
+        self.assertEqual(report.errors, [(2, 'Missing name')])
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+
+# ==========================
+# Stored price range
+# ==========================
+
+class PriceRangeTests(TestCase):
+    def test_tier_changes_update_range(self):
+        product = make_product()
+        tier = QuantityTier.objects.create(product=product, quantity=100, base_price=Decimal('250.00'))
+        QuantityTier.objects.create(product=product, quantity=500, base_price=Decimal('900.00'))
+        product.refresh_from_db()
+        self.assertEqual((product.min_price, product.max_price), (Decimal('250.00'), Decimal('900.00')))
+
+        tier.delete()
+        product.refresh_from_db()
+        self.assertEqual((product.min_price, product.max_price), (Decimal('900.00'), Decimal('900.00')))
+
+    def test_bulk_changes_need_refresh(self):
+        product = make_product()
+        QuantityTier.objects.bulk_create([QuantityTier(product=product, quantity=100, base_price=Decimal('99.00'))])
+        self.assertEqual(Product.refresh_price_ranges([product.pk]), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.min_price, Decimal('99.00'))
+
+    def test_list_filters_and_sorts_on_stored_price(self):
+        for name, price in (('Cheap', '50.00'), ('Mid', '150.00'), ('Dear', '500.00')):
+            QuantityTier.objects.create(product=make_product(name=name, slug=name.lower()), quantity=100, base_price=Decimal(price))
+        make_product(name='Unpriced', slug='unpriced')
+        catalog.clear_local()
+
+        response = self.client.get(reverse('products:product_list'), {'sort': 'price_low', 'price_min': '100'})
+        # Products without tiers are always listed, last
+        self.assertEqual([p.name for p in response.context['products']], ['Mid', 'Dear', 'Unpriced'])
+        response = self.client.get(reverse('products:product_list'), {'sort': 'price_high', 'price_max': '200'})
+        self.assertEqual([p.name for p in response.context['products']], ['Mid', 'Cheap', 'Unpriced'])
+
+
+# ==========================
+# Keyset pagination
+# ==========================
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Seven products sharing three names, so pages break inside ties
+        self.products = [make_product(name=f'Card {n % 3}', slug=f'card-{n}') for n in range(7)]
+        self.expected = sorted(self.products, key=lambda p: (p.name, p.id))
+
+    def walk(self, ordering=('name', 'id')):
+        pages, cursor = [], None
+        while True:
+            page = paginate_keyset(Product.objects.all(), list(ordering), cursor=cursor, page_size=3)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_pages_cover_every_row_once(self):
+        pages = self.walk()
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([p for page in pages for p in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor_returns_same_page(self):
+        first, second, third = self.walk()
+        back = paginate_keyset(Product.objects.all(), ['name', 'id'], cursor=third.prev_cursor, page_size=3)
+        self.assertEqual(back.object_list, second.object_list)
+        self.assertEqual(back.next_cursor, second.next_cursor)
+
+    def test_descending_and_sequence_cursors_agree(self):
+        pages = self.walk(('-name', 'id'))
+        self.assertEqual([p for page in pages for p in page],
+                         sorted(self.products, key=lambda p: (-int(p.name[-1]), p.id)))
+
+        page = paginate_keyset(Product.objects.all(), ['name', 'id'], page_size=3)
+        same = paginate_sequence(self.expected, ['name', 'id'], cursor=page.next_cursor, page_size=3)
+        self.assertEqual(same.object_list, self.walk()[1].object_list)
+
+    def test_garbled_cursor_restarts(self):
+        page = paginate_keyset(Product.objects.all(), ['name', 'id'], cursor='not-a-cursor', page_size=3)
+        self.assertEqual(page.object_list, self.expected[:3])
+
+
+# ==========================
+# Facets
+# ==========================
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cards = Category.objects.create(name='Cards')
+        for name, price, stock in (('A', '100.00', 5), ('B', '300.00', 0), ('C', '3000.00', 1)):
+            product = make_product(name=name, slug=name.lower(), category=self.cards,
+                                   track_inventory=True, stock_quantity=stock)
+            QuantityTier.objects.create(product=product, quantity=100, base_price=Decimal(price))
+        make_product(name='D', slug='d')
+        catalog.clear_local()
+
+    def test_counts_from_one_query(self):
+        with self.assertNumQueries(1):
+            facets = compute_facets(Product.objects.all())
+        self.assertEqual((facets['total'], facets['in_stock']), (4, 2))
+        self.assertEqual(facets['categories'], {self.cards.pk: 3})
+        self.assertEqual([b['count'] for b in facets['price_buckets']], [1, 1, 0, 0, 1])
+
+    def test_cached_per_normalized_search(self):
+        get_facets(Product.objects.all(), 'Business  Cards')
+        with self.assertNumQueries(0):
+            facets = get_facets(Product.objects.none(), ' business cards')
+        self.assertEqual(facets['total'], 4)
+
+    def test_catalog_edit_invalidates(self):
+        self.assertEqual(get_facets(Product.objects.all())['total'], 4)
+        make_product(name='E', slug='e')
+        catalog.clear_local()
+        self.assertEqual(get_facets(Product.objects.all())['total'], 5)
+
+
+# ==========================
+# Product detail loading
+# ==========================
+
+class ProductDetailLoadingTests(TestCase):
+    def setUp(self):
+        self.product = make_product(slug='business-cards')
+        QuantityTier.objects.create(product=self.product, quantity=100, base_price=Decimal('250.00'))
+        QuantityTier.objects.create(product=self.product, quantity=500, base_price=Decimal('900.00'))
+        for value in ('Glossy', 'Matte'):
+            ProductOption.objects.create(product=self.product, option_type='Finish', value=value, price_modifier=Decimal('10.00'))
+        OptionalService.objects.create(product=self.product, label='Design', price=Decimal('150.00'))
+        catalog.clear_local()
+
+    def test_bundle_loads_in_fixed_queries(self):
+        with self.assertNumQueries(5):
+            bundle = catalog.ProductPricingBundle.load('business-cards')
+        with self.assertNumQueries(0):
+            self.assertEqual(bundle.tier(500).base_price, Decimal('900.00'))
+            self.assertEqual([o.value for o in bundle.grouped_options['Finish']], ['Glossy', 'Matte'])
+            self.assertEqual(bundle.service('Design').price, Decimal('150.00'))
+            bundle.pricing.quote(100, options={'Finish': 'Matte'}, services=['Design'])
+
+    @override_settings(CATALOG_VERSION_CHECK_INTERVAL=60)
+    def test_page_is_served_from_snapshot(self):
+        url = reverse('products:product_detail', args=['business-cards'])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['product'], self.product)
+        self.assertFalse([q for q in queries if 'products_' in q['sql']])
+
+    @override_settings(CATALOG_VERSION_CHECK_INTERVAL=0)
+    def test_snapshot_follows_version(self):
+        url = reverse('products:product_detail', args=['business-cards'])
+        self.client.get(url)
+        # Another worker's edit: only the shared version moves
+        Product.objects.filter(pk=self.product.pk).update(name='Premium Cards')
+        self.assertEqual(self.client.get(url).context['product'].name, 'Business Cards')
+        catalog.bump_version()
+        self.assertEqual(self.client.get(url).context['product'].name, 'Premium Cards')
+
+    def test_unknown_slug_is_404(self):
+        url = reverse('products:product_detail', args=['no-such-product'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_user('buyer', password='pw'))
+        self.assertEqual(self.client.post(url, {'quantity': 100}).status_code, 404)
+
+
+# ==========================
+# Outbox
+# ==========================
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.message, = outbox.enqueue(outbox.email('Hello', ['client@example.com'], '<p>Hi</p>'))
+
+    def failing(self, messages):
+        return {m.pk: ('SMTPException: down', '') for m in messages}
+
+    def test_claim_leases_message(self):
+        claimed, = outbox.claim(10)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertGreater(claimed.available_at, timezone.now())
+        # Leased: neither this nor another worker can take it again yet
+        self.assertEqual(outbox.claim(10), [])
+
+    def test_batch_sends_and_records(self):
+        self.assertEqual(outbox.process_batch(), {'sent': 1, 'retry': 0, 'dead': 0})
+        self.assertEqual([m.subject for m in mail.outbox], ['Hello'])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutboxMessage.Status.SENT)
+        self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+    @override_settings(OUTBOX_BACKOFF_BASE=30, OUTBOX_MAX_ATTEMPTS=2)
+    def test_failure_backs_off_then_dies(self):
+        with mock.patch.dict(outbox.SENDERS, {OutboxMessage.Channel.EMAIL: self.failing}):
+            before = timezone.now()
+            self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 1, 'dead': 0})
+            self.message.refresh_from_db()
+            self.assertEqual(self.message.last_error, 'SMTPException: down')
+            delay = (self.message.available_at - before).total_seconds()
+            self.assertTrue(15 <= delay <= 31, delay)
+            self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+            OutboxMessage.objects.update(available_at=timezone.now())
+            self.assertEqual(outbox.process_batch(), {'sent': 0, 'retry': 0, 'dead': 1})
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.Status.DEAD, 2))
+
+    @override_settings(OUTBOX_BACKOFF_BASE=30, OUTBOX_BACKOFF_MAX=100)
+    def test_backoff_doubles_up_to_cap(self):
+        with mock.patch('random.uniform', return_value=1.0):
+            self.assertEqual([outbox.backoff_seconds(n) for n in range(1, 5)], [30, 60, 100, 100])
+
+
+# ==========================
+# PDF cache
+# ==========================
+
+@override_settings(PDF_RENDER_WORKERS=0)
+class PdfCacheTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        user = User.objects.create_user('buyer', password='pw')
+        self.client.force_login(user)
+        self.order = make_order(make_product(), user=user, full_name='Buyer')
+        self.url = reverse('products:download_invoice_pdf', args=[self.order.uuid])
+
+    def test_fingerprint_follows_printed_fields(self):
+        key = pdf_cache.digest(order_invoice_fingerprint(self.order))
+        self.order.payment_status = Order.PaymentStatus.PAID  # not printed
+        self.assertEqual(pdf_cache.digest(order_invoice_fingerprint(self.order)), key)
+        self.order.full_name = 'Someone Else'
+        self.assertNotEqual(pdf_cache.digest(order_invoice_fingerprint(self.order)), key)
+
+    def test_rendered_once_then_served_from_disk(self):
+        with mock.patch('products.views.generate_order_invoice_pdf', return_value=b'%PDF-1.4 one') as generate:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.4 one')
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_matching_etag_is_304(self):
+        with mock.patch('products.views.generate_order_invoice_pdf', return_value=b'%PDF-1.4 one') as generate:
+            etag = self.client.get(self.url)['ETag']
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            Order.objects.filter(pk=self.order.pk).update(full_name='Renamed')
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(generate.call_count, 2)
+        # The superseded file was removed
+        self.assertEqual(len(os.listdir(pdf_cache.cache_dir('invoices'))), 1)
+
+
+# ==========================
+# PDF render service
+# ==========================
+
+class PdfServiceTests(SimpleTestCase):
+    def pool(self, slots):
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda *args: Future()
+        return mock.patch.object(pdf_service, '_pool', return_value=(executor, slots))
+
+    @override_settings(PDF_RENDER_WORKERS=0)
+    def test_inline_mode(self):
+        self.assertEqual(pdf_service.render(bytes, 3), b'\x00\x00\x00')
+        with self.assertRaises(ZeroDivisionError):
+            pdf_service.render(divmod, 1, 0)
+
+    @override_settings(PDF_RENDER_WORKERS=1, PDF_RENDER_QUEUE_TIMEOUT=0)
+    def test_admission_limit(self):
+        slots = threading.BoundedSemaphore(2)
+        with self.pool(slots):
+            first = pdf_service.submit(bytes, 1)
+            pdf_service.submit(bytes, 1)
+            with self.assertRaises(pdf_service.RenderBusy):
+                pdf_service.submit(bytes, 1)
+            # A finished job frees its slot
+            first.set_result(b'%PDF')
+            pdf_service.submit(bytes, 1)
+
+    def test_job_time_limit(self):
+        previous = signal.signal(signal.SIGALRM, pdf_service._on_alarm)
+        self.addCleanup(signal.signal, signal.SIGALRM, previous)
+        with self.assertRaises(pdf_service.RenderTimeout):
+            pdf_service._run_job(time.sleep, (5,), 0.05)
+        self.assertEqual(pdf_service._run_job(bytes, (2,), 1), b'\x00\x00')
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+
+# ==========================
+# Invoice export
+# ==========================
+
+@override_settings(PDF_RENDER_WORKERS=0)
+class InvoiceExportTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        product = make_product()
+        self.orders = [make_order(product, full_name=f'Customer {n}') for n in range(3)]
+        Order.objects.filter(pk=self.orders[2].pk).update(created_at=timezone.now() - timedelta(days=40))
+
+    def export(self, render):
+        with mock.patch.object(invoice_export, 'generate_order_invoice_pdf', side_effect=render):
+            data = b''.join(invoice_export.stream_invoices_zip(
+                invoice_export.select_orders(date_from=timezone.localdate() - timedelta(days=7)), window=2,
+            ))
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        index = list(csv.DictReader(io.StringIO(archive.read('index.csv').decode())))
+        return archive, index
+
+    def test_period_zip_with_index(self):
+        archive, index = self.export(lambda order: f'%PDF {order.full_name}'.encode())
+        first, second = self.orders[:2]
+        self.assertEqual(archive.namelist(), [
+            invoice_export.invoice_filename(first), invoice_export.invoice_filename(second), 'index.csv',
+        ])
+        self.assertEqual(archive.read(invoice_export.invoice_filename(second)), b'%PDF Customer 1')
+        self.assertEqual([row['Invoice'] for row in index], [first.short_ref, second.short_ref])
+
+    def test_failures_are_listed_not_fatal(self):
+        def render(order):
+            if order.pk == self.orders[0].pk:
+                raise pdf_service.RenderTimeout('Rendering took longer than 30s')
+            return b'%PDF'
+
+        archive, index = self.export(render)
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertEqual((index[0]['File'], index[0]['Error']), ('', 'RenderTimeout: Rendering took longer than 30s'))
+        self.assertEqual(index[1]['Error'], '')
+
+    def test_cached_invoices_are_not_rendered_again(self):
+        order = self.orders[0]
+        pdf_cache.get_or_render('invoices', order.pk, order_invoice_fingerprint(order), lambda: b'%PDF cached')
+        rendered = []
+        archive, _ = self.export(lambda order: rendered.append(order.pk) or b'%PDF')
+        self.assertEqual(rendered, [self.orders[1].pk])
+        self.assertEqual(archive.read(invoice_export.invoice_filename(order)), b'%PDF cached')
+
+
+# ==========================
+# Benchmarks
+# ==========================
+
+class BenchmarkTests(TestCase):
+    PDF = b'%PDF-1.4 /Type /Pages /Type /Page /Type /Page'
+
+    def test_measure_counts_pages_queries_and_memory(self):
+        def render():
+            list(Product.objects.all())
+            return self.PDF
+
+        result = measure('pdf', 'fake', render, {'size': 1}, repeat=3)
+        self.assertEqual((result.pages, result.bytes, result.queries, result.repeat), (2, len(self.PDF), 1, 3))
+        self.assertTrue(0 < result.min_ms <= result.median_ms <= result.p95_ms)
+        self.assertGreater(result.peak_kb, 0)
+
+    def test_regression_gate(self):
+        result = Result(suite='pdf', case='fake', median_ms=15.0)
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+            json.dump({'results': [{**result.as_dict(), 'median_ms': 10.0}]}, fh)
+        self.addCleanup(os.remove, fh.name)
+        self.assertEqual(compare([result], load_json(fh.name)), [('pdf:fake', 10.0, 15.0, 50.0)])
+
+        suites = {'pdf': lambda **kwargs: [result]}
+        with mock.patch('products.management.commands.run_benchmarks.SUITES', suites):
+            call_command('run_benchmarks', compare=fh.name, max_regression=60, stdout=io.StringIO(), stderr=io.StringIO())
+            with self.assertRaisesMessage(CommandError, 'regressed more than 40%: pdf:fake'):
+                call_command('run_benchmarks', compare=fh.name, max_regression=40, stdout=io.StringIO(), stderr=io.StringIO())
+
+
+# ==========================
+# Daily rollups
+# ==========================
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.product = make_product()
+        self.today = timezone.localdate()
+
+    def totals(self):
+        return list(DailyOrderRollup.objects.order_by('day', 'status', 'payment_status').values_list(
+            'day', 'status', 'payment_status', 'orders', 'revenue', 'vat',
+        ))
+
+    def test_saves_mark_day_dirty_and_rebuild_clears_it(self):
+        make_order(self.product, total_price=Decimal('115.00'))
+        self.assertEqual(list(RollupDirtyDay.objects.values_list('day', flat=True)), [self.today])
+        self.assertEqual(rollups.rebuild_dirty(), 1)
+        self.assertFalse(RollupDirtyDay.objects.exists())
+        self.assertEqual(self.totals(), [(self.today, 'received', 'pending', 1, Decimal('115.00'), Decimal('15.00'))])
+
+    def test_rebuild_is_idempotent(self):
+        make_order(self.product, total_price=Decimal('100.00'))
+        make_order(self.product, total_price=Decimal('200.00'))
+        rollups.rebuild_dirty()
+        before = self.totals()
+        self.assertEqual(rollups.rebuild_days([self.today]), 1)
+        rollups.rebuild_days([self.today])
+        self.assertEqual(self.totals(), before)
+        self.assertEqual(DailyProductRollup.objects.get().orders, 2)
+
+    def test_changed_day_is_replaced(self):
+        order = make_order(self.product, total_price=Decimal('100.00'))
+        rollups.rebuild_dirty()
+
+        order.payment_status = Order.PaymentStatus.PAID
+        order.save()
+        rollups.rebuild_dirty()
+        self.assertEqual([row[2] for row in self.totals()], ['paid'])
+        self.assertEqual(DailyProductRollup.objects.get().paid_revenue, Decimal('100.00'))
+
+        order.delete()
+        rollups.rebuild_dirty()
+        self.assertEqual(self.totals(), [])
+
+    def test_bulk_updates_need_rebuild_since(self):
+        order = make_order(self.product, total_price=Decimal('100.00'))
+        rollups.rebuild_dirty()
+        Order.objects.filter(pk=order.pk).update(total_price=Decimal('150.00'))
+        self.assertEqual(rollups.rebuild_dirty(), 0)
+        self.assertEqual(rollups.rebuild_since(self.today - timedelta(days=2)), 3)
+        self.assertEqual(self.totals()[0][4], Decimal('150.00'))
+
+
+# ==========================
+# Unique slugs
+# ==========================
+
+class UniqueSlugTests(TestCase):
+    def test_collisions_within_batch(self):
+        categories = Category.assign_unique_slugs([
+            Category(name='Flyers'), Category(name='flyers!'), Category(name='Posters', slug='flyers-3'),
+            Category(name='Flyers'),
+        ])
+        self.assertEqual([c.slug for c in categories], ['flyers', 'flyers-2', 'flyers-3', 'flyers-4'])
+
+    def test_collisions_with_database_in_one_query(self):
+        Category.objects.create(name='Flyers')
+        Category.objects.create(name='Flyers')
+        Category.objects.create(name='Flyers Premium')
+        with self.assertNumQueries(1):
+            categories = Category.assign_unique_slugs([Category(name='Flyers'), Category(name='Banners')])
+        self.assertEqual([c.slug for c in categories], ['flyers-3', 'banners'])
+        Category.objects.bulk_create(categories)
+        self.assertEqual(Category.objects.create(name='Flyers').slug, 'flyers-4')
+
+    def test_suffix_stays_within_max_length(self):
+        maxlen = Category._meta.get_field('slug').max_length
+        first, second = Category.assign_unique_slugs([Category(name='x' * 80), Category(name='x' * 80)])
+        self.assertEqual(first.slug, 'x' * maxlen)
+        self.assertEqual(second.slug, 'x' * (maxlen - 2) + '-2')
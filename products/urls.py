@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 app_name = 'products'
 
@@ -21,12 +21,16 @@ urlpatterns = [
     path('track/', views.track_order_form, name='track_order'),
     path('track/result/', views.track_order_result, name='track_order_result'),
     path('my-orders/', views.my_orders, name='my_orders'),
+    path('my-orders/statement/', views.download_statement_pdf, name='download_statement_pdf'),
 
     path('cancel-order/<uuid:order_id>/', views.cancel_order, name='cancel_order'),
 
     path('upload-payment/<uuid:order_id>/', views.upload_payment_proof, name='upload_payment_proof'),
 
     path('contact/', views.contact_support, name='contact_support'),
+
+    # API
+    path('api/quotes/', api.BatchQuoteView.as_view(), name='api_batch_quote'),
     
     # Legal pages
     path('privacy-policy/', views.privacy_policy, name='privacy_policy'),
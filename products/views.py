@@ -1,23 +1,43 @@
 from urllib.parse import urlencode
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, Http404
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
+from django.utils import timezone
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.db import models
-from decimal import Decimal
-from collections import defaultdict
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from decimal import Decimal, InvalidOperation
+from datetime import date
 from django.core.mail import send_mail
 from django.conf import settings
 
-from .models import Product, ProductOption, QuantityTier, OptionalService, Order, Category, ShippingMethod
-from accounts.utils import send_order_confirmation_email
-from .pdf_utils import generate_order_invoice_pdf
+from .models import Product, Order
+from .pdf_utils import generate_order_invoice_pdf, order_invoice_fingerprint
+from .statements import generate_customer_statement_pdf
+from .pdf_cache import pdf_response
+from . import outbox
+from . import pdf_service
+from . import search
+from .signals import order_created_notifications
+from .pagination import paginate_keyset, paginate_sequence
+from .catalog import get_catalog, ProductPricingBundle
+from .pricing import PricingError
+from .facets import get_facets
 
 from accounts.models import CustomerProfile, NewsletterSubscriber
 
+# Hard page sizes for listings (keyset paginated, see products.pagination)
+CATALOG_PAGE_SIZE = 24
+ORDERS_PAGE_SIZE = 20
+
+# Sort keys for products without tiers so they land after priced ones
+UNPRICED_HIGH = Decimal('99999999.99')
+UNPRICED_LOW = Decimal('-1')
+PRICE_SORT_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
 def privacy_policy(request):
     return render(request, 'products/privacy_policy.html')
 
@@ -37,16 +57,25 @@ def faq(request):
     return render(request, 'products/faq.html')
 
 def home(request):
-    products = Product.objects.all()[:3]
-    categories = Category.objects.all()
+    snapshot = get_catalog()
     return render(request, 'products/home.html', {
-        'products': products,
-        'categories': categories
+        'products': snapshot.products[:3],
+        'categories': snapshot.categories
     })    
 
+def _parse_price(value):
+    """Parse a price query parameter, ignoring blank or malformed input."""
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
 def product_list(request):
+    snapshot = get_catalog()
     products = Product.objects.all()
-    categories = Category.objects.all()
+    categories = snapshot.categories
     
     # Advanced Search and Filtering
     search_query = request.GET.get('search', '')
@@ -56,12 +85,13 @@ def product_list(request):
     sort_by = request.GET.get('sort', '')
     in_stock_only = request.GET.get('in_stock', '')
     
-    # Search by name or description
+    # Full-text search, filtered (and below, ranked) by subqueries on the index
     if search_query:
-        products = products.filter(
-            models.Q(name__icontains=search_query) | 
-            models.Q(description__icontains=search_query)
-        )
+        products = products.filter(search.match_condition(search_query))
+
+    # Sidebar counts for the current search (one grouped query, cached)
+    facets = get_facets(products, search_query)
+    category_facets = [(category, facets['categories'].get(category.id, 0)) for category in categories]
     
     # Filter by category
     if category_filter:
@@ -69,44 +99,50 @@ def product_list(request):
     
     # Filter by stock status
     if in_stock_only:
-        products = [p for p in products if p.is_in_stock or not p.track_inventory]
+        products = products.filter(
+            models.Q(track_inventory=False) | models.Q(stock_quantity__gt=0)
+        )
     
-    # Get products with their starting prices for price filtering
-    products_with_prices = []
-    for product in products:
-        starting_price = product.starting_price
-        if starting_price:
-            # Price range filtering
-            if price_min and starting_price < Decimal(price_min):
-                continue
-            if price_max and starting_price > Decimal(price_max):
-                continue
-            products_with_prices.append((product, starting_price))
-        else:
-            products_with_prices.append((product, None))
+    # Price range filtering on the stored starting price; products without
+    # tiers have no price and are always listed
+    price_min_value = _parse_price(price_min)
+    if price_min_value is not None:
+        products = products.filter(models.Q(min_price__isnull=True) | models.Q(min_price__gte=price_min_value))
+    price_max_value = _parse_price(price_max)
+    if price_max_value is not None:
+        products = products.filter(models.Q(min_price__isnull=True) | models.Q(min_price__lte=price_max_value))
     
-    # Sorting
+    # Sorting (unpriced products always sort last). Every ordering ends in
+    # 'id' so it can drive keyset pagination.
     if sort_by == 'price_low':
-        products_with_prices.sort(key=lambda x: x[1] if x[1] else Decimal('999999'))
+        products = products.annotate(sort_price=Coalesce('min_price', models.Value(UNPRICED_HIGH), output_field=PRICE_SORT_FIELD))
+        ordering = ['sort_price', 'name', 'id']
     elif sort_by == 'price_high':
-        products_with_prices.sort(key=lambda x: x[1] if x[1] else Decimal('0'), reverse=True)
-    elif sort_by == 'name':
-        products_with_prices.sort(key=lambda x: x[0].name)
+        products = products.annotate(sort_price=Coalesce('min_price', models.Value(UNPRICED_LOW), output_field=PRICE_SORT_FIELD))
+        ordering = ['-sort_price', 'name', 'id']
     elif sort_by == 'newest':
-        products_with_prices.sort(key=lambda x: x[0].id, reverse=True)
-    
-    products = [p[0] for p in products_with_prices]
+        ordering = ['-id']
+    elif search_query and sort_by != 'name':
+        products = products.annotate(search_rank=search.rank_expression(search_query, Product))
+        ordering = ['search_rank', 'id']
+    else:
+        ordering = ['name', 'id']
+
+    result_count = products.count()
+    page = paginate_keyset(products, ordering, cursor=request.GET.get('cursor'), page_size=CATALOG_PAGE_SIZE)
     
     # Get price range for the filter
-    all_prices = [p.starting_price for p in Product.objects.all() if p.starting_price]
+    all_prices = [p.min_price for p in snapshot.products if p.min_price is not None]
     price_range = {
         'min': min(all_prices) if all_prices else 0,
         'max': max(all_prices) if all_prices else 1000
     }
     
     context = {
-        'products': products,
+        'products': page.object_list,
+        'page': page,
         'categories': categories,
+        'category_facets': category_facets,
         'search_query': search_query,
         'selected_category': category_filter,
         'price_min': price_min,
@@ -114,22 +150,30 @@ def product_list(request):
         'sort_by': sort_by,
         'in_stock_only': in_stock_only,
         'price_range': price_range,
-        'result_count': len(products)
+        'facets': facets,
+        'result_count': result_count
     }
     
     return render(request, 'products/product_list.html', context)
 
 def products_by_category(request, slug):
-    category = get_object_or_404(Category, slug=slug)
-    products = category.products.all()
+    snapshot = get_catalog()
+    category = snapshot.category(slug)
+    if category is None:
+        raise Http404("No Category matches the given query.")
+    page = paginate_sequence(
+        snapshot.category_products(category), ['name', 'id'],
+        cursor=request.GET.get('cursor'), page_size=CATALOG_PAGE_SIZE,
+    )
 
     return render(request, 'products/products_by_category.html', {
         'category': category,
-        'products': products
+        'products': page.object_list,
+        'page': page,
     })
 
 def all_categories(request):
-    categories = Category.objects.all()
+    categories = get_catalog().categories
 
     return render(request, 'products/all_categories.html', {
         'categories': categories
@@ -137,20 +181,34 @@ def all_categories(request):
 
 # @login_required
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-    quantity_tiers = product.quantity_tiers.all().order_by('quantity')
-    options = ProductOption.objects.filter(product=product)
-    services = product.services.all()
-
-    grouped_options = defaultdict(list)
-    for opt in options:
-        grouped_options[opt.option_type].append(opt)
-    grouped_options = dict(grouped_options)
-
-    # Fetch available shipping options from DB
-    shipping_methods = ShippingMethod.objects.all()
-    # Create a dict for easy lookup in template/view: slug -> price
-    shipping_options = {method.slug: method.price for method in shipping_methods}
+    """
+    Product page and checkout. A checkout is priced by the pricing engine
+    (products.pricing) against the current database rows:
+
+    - an option value the product no longer has (a stale page, an edited
+      catalog) fails the checkout with a message instead of being priced
+      at zero; services are only taken from the product's current list;
+    - the order stores the shipping it was charged in shipping_price
+      (total_price always included it, shipping_price used to stay 0).
+    """
+    if request.method == "POST":
+        # Price orders against the database, not a possibly seconds-old snapshot
+        try:
+            bundle = ProductPricingBundle.load(slug)
+        except Product.DoesNotExist:
+            raise Http404("No Product matches the given query.")
+    else:
+        bundle = get_catalog().product(slug)
+        if bundle is None:
+            raise Http404("No Product matches the given query.")
+    product = bundle.product
+    quantity_tiers = bundle.tiers
+    services = bundle.services
+    grouped_options = bundle.grouped_options
+
+    shipping_methods = bundle.shipping_methods
+    # Dict for easy lookup in template/view: slug -> price
+    shipping_options = bundle.shipping_prices
 
     # Check for pending order data (restoring session)
     pending_data = {}
@@ -177,51 +235,42 @@ def product_detail(request, slug):
             messages.error(request, "Invalid quantity selected.")
             return redirect('products:product_detail', slug=slug)
 
-        base_price = QuantityTier.objects.get(product=product, quantity=quantity).base_price
-
         selected_options = {}
         for opt_type in grouped_options:
             selected = request.POST.get(opt_type)
             if selected:
                 selected_options[opt_type] = selected
 
-        selected_services = []
-        total_modifiers = Decimal('0.00')
-        for service in services:
-            if request.POST.get(service.label):
-                selected_services.append(service.label)
-                total_modifiers += service.price
-
-        for opt_type, opt_value in selected_options.items():
-            opt_obj = ProductOption.objects.filter(
-                product=product,
-                option_type=opt_type,
-                value=opt_value
-            ).first()
-            if opt_obj:
-                total_modifiers += opt_obj.price_modifier
+        selected_services = [service.label for service in services if request.POST.get(service.label)]
 
-        # Get selected shipping method and price
+        # Get selected shipping method (unknown methods ship free, as before)
         selected_shipping_slug = request.POST.get("shipping_method", "standard")
-        shipping_price = shipping_options.get(selected_shipping_slug, Decimal("0.00"))
+        if selected_shipping_slug not in shipping_options:
+            selected_shipping_slug = None
 
         # Optional: check discount code
         discount_code = request.POST.get("discount_code", "").strip().upper()
-        discount_amount = Decimal("0.00")
+        discount_valid = bool(discount_code) and NewsletterSubscriber.objects.filter(discount_code=discount_code).exists()
 
-        if discount_code:
-            try:
-                subscriber = NewsletterSubscriber.objects.get(discount_code=discount_code)
-                discount_amount = (base_price + total_modifiers + shipping_price) * Decimal("0.10")
-                messages.success(request, f"Discount code applied: -R{discount_amount:.2f}")
-            except NewsletterSubscriber.DoesNotExist:
-                messages.warning(request, "Invalid discount code.")
+        try:
+            quote = bundle.pricing.quote(
+                quantity,
+                options=selected_options,
+                services=selected_services,
+                shipping_method=selected_shipping_slug,
+                discount=discount_valid,
+            )
+        except PricingError as e:
+            # e.g. "Unknown option Finish: Matte." for a stale option
+            messages.error(request, str(e))
+            return redirect('products:product_detail', slug=slug)
+
+        if discount_valid:
+            messages.success(request, f"Discount code applied: -R{quote.discount_amount:.2f}")
+        elif discount_code:
+            messages.warning(request, "Invalid discount code.")
 
         uploaded_file = request.FILES.get("file")
-        
-        subtotal = base_price + total_modifiers + shipping_price - discount_amount
-        vat = subtotal * Decimal("0.15")
-        grand_total = subtotal + vat
 
         # Get contact details from form, fallback to profile if needed
         full_name = request.POST.get("full_name")
@@ -242,24 +291,26 @@ def product_detail(request, slug):
         if not address and hasattr(request.user, 'profile'):
             address = request.user.profile.address
 
-        order = Order.objects.create(
-            user=request.user,
-            product=product,
-            quantity=quantity,
-            base_price=base_price,
-            options=selected_options,
-            services=selected_services,
-            file=uploaded_file,
-            total_price=grand_total,
-            full_name=full_name,
-            email=email,
-            phone=phone,
-            address=address,
-            discount_amount=discount_amount,
-            discount_code=discount_code if discount_amount > 0 else ""
-        )
-
-        send_order_confirmation_email(order)
+        # The confirmation is queued in the outbox and must commit with the order
+        with transaction.atomic():
+            order = Order.objects.create(
+                user=request.user,
+                product=product,
+                quantity=quantity,
+                base_price=quote.base_price,
+                options=selected_options,
+                services=selected_services,
+                file=uploaded_file,
+                shipping_price=quote.shipping_price,
+                total_price=quote.total,
+                full_name=full_name,
+                email=email,
+                phone=phone,
+                address=address,
+                discount_amount=quote.discount_amount,
+                discount_code=discount_code if quote.discount_cents > 0 else ""
+            )
+            outbox.enqueue(*order_created_notifications(order))
 
         messages.success(request, "Your order was placed successfully.")
         return HttpResponseRedirect(reverse("products:order_success", args=[order.uuid]))
@@ -292,27 +343,13 @@ def track_order_result(request):
     vat = None
 
     if ref:
-        # First check if it looks like a full UUID (contains hyphens and is ~36 chars)
-        if len(ref) >= 32 and '-' in ref:
-            try:
-                # Try to find order by full UUID
-                order = Order.objects.get(uuid=ref, user=request.user)
-                vat = order.total_price * Decimal("0.15") / Decimal("1.15")
-                subtotal = order.total_price - vat
-            except (Order.DoesNotExist, ValidationError, ValueError):
-                order = None
-        
-        # If no order found yet, try partial match with first 8 characters
-        if not order and len(ref) >= 8:
-            partial_ref = ref[:8].lower()
-            # Get all user orders and filter in Python to avoid UUID validation
-            user_orders = Order.objects.filter(user=request.user)
-            for user_order in user_orders:
-                if str(user_order.uuid).lower().startswith(partial_ref):
-                    order = user_order
-                    vat = order.total_price * Decimal("0.15") / Decimal("1.15")
-                    subtotal = order.total_price - vat
-                    break
+        # Full uuid, 8-char reference or INV banking reference: one indexed lookup
+        candidates = Order.short_ref_candidates(ref)
+        if candidates:
+            order = Order.objects.filter(user=request.user, short_ref__in=candidates).order_by('-short_ref').first()
+        if order:
+            vat = order.total_price * Decimal("0.15") / Decimal("1.15")
+            subtotal = order.total_price - vat
 
     return render(request, 'products/track_result.html', {
         'order': order,
@@ -367,21 +404,47 @@ def order_invoice(request, order_id):
 @login_required
 def download_invoice_pdf(request, order_id):
     """Download invoice as PDF"""
-    order = get_object_or_404(Order, uuid=order_id, user=request.user)
-    
-    # Generate PDF
-    pdf = generate_order_invoice_pdf(order)
-    
-    # Create HTTP response
+    order = get_object_or_404(Order.objects.select_related('product'), uuid=order_id, user=request.user)
+
+    # Rendered once per distinct invoice content, then served from disk
+    return pdf_response(
+        request, 'invoices', order.pk, order_invoice_fingerprint(order),
+        lambda: pdf_service.render(generate_order_invoice_pdf, order),
+        filename=f"BizPrint_Invoice_{order.short_ref}.pdf",
+    )
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+@login_required
+def download_statement_pdf(request):
+    """Download an account statement (?from=YYYY-MM-DD&to=YYYY-MM-DD)"""
+    date_from = _parse_date(request.GET.get('from'))
+    date_to = _parse_date(request.GET.get('to'))
+    try:
+        pdf = pdf_service.render(
+            generate_customer_statement_pdf, request.user.pk, date_from, date_to,
+            timeout=getattr(settings, 'PDF_STATEMENT_TIMEOUT', 120),
+        )
+    except pdf_service.PdfRenderError as e:
+        response = HttpResponse(str(e), status=503, content_type='text/plain')
+        response['Retry-After'] = '5'
+        return response
+
     response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="BizPrint_Invoice_{str(order.uuid)[:8].upper()}.pdf"'
-    
+    response['Content-Disposition'] = f'attachment; filename="BizPrint_Statement_{timezone.localdate():%Y-%m-%d}.pdf"'
     return response
 
 @login_required
 def my_orders(request):
-    orders = request.user.orders.all().order_by('-created_at')
-    return render(request, 'products/my_orders.html', {'orders': orders})
+    page = paginate_keyset(
+        request.user.orders.select_related('product'), ['-created_at', '-id'],
+        cursor=request.GET.get('cursor'), page_size=ORDERS_PAGE_SIZE,
+    )
+    return render(request, 'products/my_orders.html', {'orders': page.object_list, 'page': page})
 
 @login_required
 def cancel_order(request, order_id):
@@ -0,0 +1,248 @@
+"""
+WhatsApp delivery client.
+
+One process-wide client holds a single Twilio REST client (and so one pooled
+HTTP session), a bounded thread pool for concurrent sends and a token bucket
+that keeps us under the provider's messages-per-second limit. Every send
+returns a DeliveryResult instead of printing, so callers (the outbox worker)
+can record the outcome per message.
+
+The transport is pluggable via settings.WHATSAPP_TRANSPORT:
+    'twilio'  - real delivery (needs TWILIO_* settings and the twilio package)
+    'console' - print the message (default when the credentials are blank or
+                still the placeholders, or twilio isn't installed)
+    'fake'    - in-memory, with optional latency/failure rate, for offline
+                load tests (WHATSAPP_FAKE_LATENCY, WHATSAPP_FAKE_FAILURE_RATE)
+"""
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# The sample values shipped in settings.py, not real credentials
+PLACEHOLDER_CREDENTIALS = {'your_sid_here', 'your_token_here'}
+
+
+def normalize_number(to_number):
+    """
+    Strip formatting and make the number E.164 (local 0XX numbers are SA, +27).
+    """
+    to_number = to_number.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+    if to_number.startswith("0"):
+        to_number = "+27" + to_number[1:]
+    elif not to_number.startswith("+"):
+        to_number = "+" + to_number
+    return to_number
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    key: object      # caller's id for the message (e.g. OutboxMessage pk)
+    to: str
+    sid: str = ''    # provider message id
+    error: str = ''
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` tokens per second, bursts up to
+    ``capacity``. acquire() blocks until a token is free.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ==========================
+# Transports
+# ==========================
+
+class TwilioTransport:
+    def __init__(self, account_sid, auth_token, from_number, pool_size=4, timeout=10):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        if http_client.session is not None:
+            from requests.adapters import HTTPAdapter
+            # Enough keep-alive connections for every worker thread
+            http_client.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+        self.from_number = from_number
+
+    def send(self, to_number, body):
+        message = self.client.messages.create(from_=self.from_number, body=body, to=f"whatsapp:{to_number}")
+        return message.sid
+
+
+class ConsoleTransport:
+    def send(self, to_number, body):
+        print(f"⚠️ [Mock WhatsApp] To: {to_number} | Body: {body}")
+        return ''
+
+
+class FakeTransport:
+    """
+    Offline stand-in that simulates provider latency and failures and keeps
+    what it "sent" in ``sent``.
+    """
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_number, body):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("Fake transport failure")
+        sid = f"FAKE{uuid.uuid4().hex}"
+        with self._lock:
+            self.sent.append((sid, to_number, body))
+        return sid
+
+
+def _credential(name):
+    value = (getattr(settings, name, None) or '').strip()
+    return '' if value in PLACEHOLDER_CREDENTIALS else value
+
+
+def twilio_installed() -> bool:
+    try:
+        import twilio  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_transport():
+    name = getattr(settings, 'WHATSAPP_TRANSPORT', None)
+    account_sid = _credential('TWILIO_ACCOUNT_SID')
+    auth_token = _credential('TWILIO_AUTH_TOKEN')
+    if name is None:
+        name = 'twilio' if account_sid and auth_token and twilio_installed() else 'console'
+
+    if name == 'fake':
+        return FakeTransport(
+            latency=getattr(settings, 'WHATSAPP_FAKE_LATENCY', 0.0),
+            failure_rate=getattr(settings, 'WHATSAPP_FAKE_FAILURE_RATE', 0.0),
+        )
+    if name == 'console':
+        return ConsoleTransport()
+    if name == 'twilio':
+        # Asked for explicitly, so fail loudly rather than print
+        if not (account_sid and auth_token):
+            raise ImproperlyConfigured("WHATSAPP_TRANSPORT='twilio' needs TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN.")
+        if not twilio_installed():
+            raise ImproperlyConfigured("WHATSAPP_TRANSPORT='twilio' needs the twilio package (pip install twilio).")
+        return TwilioTransport(
+            account_sid,
+            auth_token,
+            getattr(settings, 'TWILIO_WHATSAPP_NUMBER', 'whatsapp:+14155238886'),  # Twilio Sandbox Default
+            pool_size=getattr(settings, 'WHATSAPP_MAX_WORKERS', 4),
+        )
+    raise ValueError(f"Unknown WHATSAPP_TRANSPORT {name!r}")
+
+
+# ==========================
+# Client
+# ==========================
+
+class WhatsAppClient:
+    def __init__(self, transport, rate_per_second=None, burst=None, max_workers=4):
+        self.transport = transport
+        self.limiter = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='whatsapp')
+            return self._executor
+
+    def send(self, to_number, body, key=None) -> DeliveryResult:
+        """
+        Send one message (blocking on the rate limiter). Never raises.
+        """
+        to_number = normalize_number(to_number or '')
+        if self.limiter is not None:
+            self.limiter.acquire()
+        started = time.monotonic()
+        try:
+            sid = self.transport.send(to_number, body) or ''
+        except Exception as e:
+            return DeliveryResult(key, to_number, error=f"{type(e).__name__}: {e}", elapsed=time.monotonic() - started)
+        return DeliveryResult(key, to_number, sid=sid, elapsed=time.monotonic() - started)
+
+    def send_many(self, messages):
+        """
+        Send ``(key, to_number, body)`` tuples concurrently on the pool.
+        Returns DeliveryResults in input order.
+        """
+        messages = list(messages)
+        if len(messages) <= 1 or self.max_workers <= 1:
+            return [self.send(to, body, key=key) for key, to, body in messages]
+        return list(self._pool().map(lambda m: self.send(m[1], m[2], key=m[0]), messages))
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> WhatsAppClient:
+    """
+    The shared client for this process, built from settings on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WhatsAppClient(
+                build_transport(),
+                rate_per_second=getattr(settings, 'WHATSAPP_RATE_PER_SECOND', 10),
+                burst=getattr(settings, 'WHATSAPP_RATE_BURST', None),
+                max_workers=getattr(settings, 'WHATSAPP_MAX_WORKERS', 4),
+            )
+        return _client
+
+
+def reset_client():
+    """Drop the shared client (e.g. after changing settings in tests)."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()